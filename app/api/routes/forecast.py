@@ -1,34 +1,147 @@
-import boto3
 import os
 import numpy as np
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from app.database.database import get_db
+import orjson
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database.database import get_async_db, get_async_engine, get_engine
+from app.database.instrumentation import pool_metrics
+from app.database.models import ForecastTypeEnum, MarketTypeEnum
+from app.ml_models.config import DEFAULT_MODEL_NAME
+from app.ml_models.inference.batching import MicroBatcher
 from app.ml_models.inference.predict import PredictionService
-from datetime import time
+from app.ml_models.registry import load_model
+from app.utils.cache import forecast_cache
+from app.utils.metrics import MODEL_PREDICT_SECONDS, timer
 
 router = APIRouter()
 
-lambda_client = boto3.client("lambda", region_name=os.getenv("AWS_REGION", "eu-west-1"))
-s3_client = boto3.client("s3")
-
 LAMBDA_FUNCTION_NAME = os.getenv("SCRAPER_LAMBDA_NAME")
 S3_BUCKET = os.getenv("S3_BUCKET_NAME")
+# Browser/CDN freshness for served forecasts; writes invalidate server-side
+FORECAST_MAX_AGE_SECONDS = int(os.getenv("FORECAST_MAX_AGE_SECONDS", "30"))
+
+
+_lambda_client = None
+
+
+def get_lambda_client():
+    global _lambda_client
+    if _lambda_client is None:
+        import boto3
+
+        _lambda_client = boto3.client("lambda", region_name=os.getenv("AWS_REGION", "eu-west-1"))
+    return _lambda_client
+
+
+def reset_lambda_client() -> None:
+    """Drop a client inherited from a parent process (e.g. a preloading gunicorn master)"""
+    global _lambda_client
+    _lambda_client = None
 
 
 @router.post("/forecast/trigger_scraper")
 def trigger_lambda_scraper():
     """Invoke Lambda function to scrape new data from EirGrid."""
     try:
-        response = lambda_client.invoke(FunctionName=LAMBDA_FUNCTION_NAME, InvocationType="Event")
+        response = get_lambda_client().invoke(FunctionName=LAMBDA_FUNCTION_NAME, InvocationType="Event")
         return {"message": "Scraper Lambda function triggered", "response": response}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to invoke Lambda: {str(e)}")
 
 
+def _predict_with_default_model(features: np.ndarray) -> np.ndarray:
+    model = load_model(DEFAULT_MODEL_NAME)
+    with timer(MODEL_PREDICT_SECONDS, model=DEFAULT_MODEL_NAME):
+        return model.predict(features)
+
+
+predict_batcher = MicroBatcher(_predict_with_default_model)
+
+
+async def _batched_predict(rows: np.ndarray) -> np.ndarray:
+    try:
+        return await predict_batcher.submit(rows)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
 @router.post("/forecast/predict")
-def predict_forecast(features: list[float], db: Session = Depends(get_db)):
+async def predict_forecast(features: list[float]):
     """Make a real-time forecast prediction using the trained model."""
-    service = PredictionService(db)
-    prediction = service.predict(np.array(features).reshape(1, -1))
-    return {"predicted_value": prediction.tolist()}
\ No newline at end of file
+    prediction = await _batched_predict(np.array(features).reshape(1, -1))
+    return {"predicted_value": prediction.tolist()}
+
+
+@router.post("/forecast/predict_batch")
+async def predict_forecast_batch(features: list[list[float]]):
+    """Predict many feature rows in one call; returns one value per row."""
+    if not features:
+        return {"predicted_values": []}
+    try:
+        rows = np.array(features, dtype=np.float64)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="All feature rows must have the same length")
+    predictions = await _batched_predict(rows)
+    return {"predicted_values": predictions.tolist()}
+
+
+@router.get("/forecast/predict/stats")
+def predict_batching_stats():
+    """Queue depth and batch-size metrics for the prediction batcher."""
+    return predict_batcher.metrics()
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in candidates or "*" in candidates
+
+
+@router.get("/forecasts/{forecast_type}")
+async def get_forecasts(
+    forecast_type: ForecastTypeEnum,
+    request: Request,
+    market_type: Optional[MarketTypeEnum] = None,
+    region: Optional[str] = None,
+    source: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(24, ge=1, le=10000),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Stored forecasts by market, region, source and time range, served from cache."""
+    params = orjson.dumps(
+        [getattr(market_type, "value", None), region, source, start, end, limit]
+    ).decode()
+
+    async def load() -> bytes:
+        # PredictionService is sync; run_sync drives it over the async connection
+        forecasts = await db.run_sync(
+            lambda session: PredictionService(session).get_forecasts(
+                forecast_type, market_type, region, source, start, end, limit
+            )
+        )
+        return orjson.dumps({"forecast_type": forecast_type.value, "forecasts": forecasts})
+
+    cached = await forecast_cache.aget_or_load(forecast_type.value, params, load)
+    headers = {"ETag": cached.etag, "Cache-Control": f"max-age={FORECAST_MAX_AGE_SECONDS}"}
+    if _etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+
+@router.get("/forecast/cache/stats")
+def forecast_cache_stats():
+    """Hit counts per cache tier for the forecast read endpoints."""
+    return forecast_cache.stats()
+
+
+@router.get("/forecast/db/stats")
+def database_pool_stats():
+    """Connection pool occupancy, saturation and slow-query counts."""
+    return pool_metrics(get_engine(), get_async_engine().sync_engine)
@@ -1,62 +1,186 @@
 import os
 import json
+import random
+import time
 import boto3
 import requests
 import logging
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from requests.adapters import HTTPAdapter
+
+from app.data_sources.raw_store import raw_key
+from app.utils.metrics import SCRAPER_FETCH_ERRORS, SCRAPER_FETCH_SECONDS, log_event, timer
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-EIRGRID_API_URL = "https://www.eirgrid.ie/api/graph-data"
+EIRGRID_API_URL = os.getenv("EIRGRID_API_URL", "https://www.eirgrid.ie/api/graph-data")
 
-# Active endpoint for scraping demand only
+# label -> EirGrid area
 ENDPOINTS = {
-    "demand": "demandactual"
+    "demand": "demandactual",
+    "demand_forecast": "demandforecast",
+    "wind_actual": "windactual",
+    "wind_forecast": "windforecast",
+    "fuel_mix": "fuelmix",
+    "co2_emission": "co2emission",
+    "co2_intensity": "co2intensity",
+    "interconnector": "interconnector",
 }
 
-# Endpointsfor future use
-# ENDPOINTS = {
-#     "demandactual": "demand_actual",
-#     "demandforecast": "demand_forecast",
-#     "windactual": "wind_actual",
-#     "windforecast": "wind_forecast",
-#     "fuelmix": "fuel_mix",
-#     "co2emission": "co2_emission",
-#     "co2intensity": "co2_intensity",
-#     "interconnector": "interconnector",
-# }
-
-def fetch_data_from_eirgrid(endpoints: dict) -> dict:
-    """
-    Fetch JSON data from multiple EirGrid areas.
-    """
-    date_str = datetime.utcnow().strftime("%d %b %Y")
-    all_data = {}
+DEFAULT_TIMEOUT = 10
+# Per-area read timeouts in seconds; heavier areas get longer reads
+AREA_TIMEOUTS = {
+    "fuelmix": 20,
+    "interconnector": 20,
+}
+
+MAX_WORKERS = int(os.getenv("EIRGRID_MAX_WORKERS", "8"))
+MAX_RETRIES = int(os.getenv("EIRGRID_MAX_RETRIES", "4"))
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8.0
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+_session: Optional[requests.Session] = None
+
 
-    for label, area in endpoints.items():
-        logger.info(f"Fetching {label} data from EirGrid")
+def get_session(pool_size: int = MAX_WORKERS) -> requests.Session:
+    """Shared keep-alive session, reused across warm Lambda invocations"""
+    global _session
+    if _session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _session = session
+    return _session
+
+
+def _backoff(attempt: int) -> float:
+    """Full-jitter exponential backoff"""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2**attempt))
+
+
+def fetch_area(
+    session: requests.Session, label: str, area: str, day: date
+) -> Tuple[str, date, Optional[dict]]:
+    """Fetch one area for one day, retrying transient failures"""
+    params = {"area": area, "region": "ALL", "date": day.strftime("%d %b %Y")}
+    timeout = (5, AREA_TIMEOUTS.get(area, DEFAULT_TIMEOUT))
+
+    for attempt in range(MAX_RETRIES + 1):
         try:
-            response = requests.get(
-                EIRGRID_API_URL,
-                params={"area": area, "region": "ALL", "date": date_str},
-                timeout=10
-            )
+            with timer(SCRAPER_FETCH_SECONDS, source="eirgrid", report=area):
+                response = session.get(EIRGRID_API_URL, params=params, timeout=timeout)
+            if response.status_code in RETRY_STATUS and attempt < MAX_RETRIES:
+                raise requests.HTTPError(f"HTTP {response.status_code}", response=response)
             response.raise_for_status()
-            all_data[label] = response.json()
-        except Exception as e:
-            logger.error(f"Failed to fetch {label}: {str(e)}")
-
-    return all_data
+        except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+            status = getattr(getattr(e, "response", None), "status_code", None)
+            retryable = status is None or status in RETRY_STATUS
+            if not retryable or attempt == MAX_RETRIES:
+                SCRAPER_FETCH_ERRORS.labels(source="eirgrid", report=area).inc()
+                logger.error(f"Failed to fetch {label} for {day}: {str(e)}")
+                return label, day, None
+            time.sleep(_backoff(attempt))
+            continue
 
+        try:
+            return label, day, response.json()
+        except ValueError as e:
+            # A malformed body won't improve on retry
+            SCRAPER_FETCH_ERRORS.labels(source="eirgrid", report=area).inc()
+            logger.error(f"Invalid JSON for {label} on {day}: {str(e)}")
+            return label, day, None
+
+    return label, day, None
+
+
+def fetch_data_for_range(
+    endpoints: dict,
+    start_date: date,
+    end_date: date,
+    max_workers: int = MAX_WORKERS,
+) -> Dict[date, dict]:
+    """
+    Fetch every area for every day in [start_date, end_date] concurrently.
 
-def upload_to_s3(bucket_name: str, data: dict, region: str = "eu-west-1") -> str:
+    Returns {day: {label: payload}}; failed fetches are logged and omitted.
+    """
+    days = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+    session = get_session(max_workers)
+    results: Dict[date, dict] = {day: {} for day in days}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(fetch_area, session, label, area, day)
+            for day in days
+            for label, area in endpoints.items()
+        ]
+        for future in as_completed(futures):
+            label, day, payload = future.result()
+            if payload is not None:
+                results[day][label] = payload
+
+    fetched = sum(len(v) for v in results.values())
+    logger.info(f"Fetched {fetched}/{len(futures)} EirGrid area-days from {start_date} to {end_date}")
+    return results
+
+
+def fetch_data_from_eirgrid(endpoints: dict, day: Optional[date] = None) -> dict:
+    """
+    Fetch JSON data from multiple EirGrid areas.
+    """
+    day = day or datetime.utcnow().date()
+    return fetch_data_for_range(endpoints, day, day)[day]
+
+
+def backfill(
+    bucket_name: str,
+    start_date: date,
+    end_date: date,
+    endpoints: dict = ENDPOINTS,
+    region: str = "eu-west-1",
+    days_per_batch: int = 31,
+    max_workers: int = MAX_WORKERS,
+) -> List[str]:
+    """Fetch a historical date range in batches and upload one object per day"""
+    keys = []
+    batch_start = start_date
+    while batch_start <= end_date:
+        batch_end = min(batch_start + timedelta(days=days_per_batch - 1), end_date)
+        for day, data in fetch_data_for_range(endpoints, batch_start, batch_end, max_workers).items():
+            if data:
+                keys.append(upload_to_s3(bucket_name, data, region=region, data_date=day))
+        batch_start = batch_end + timedelta(days=1)
+    logger.info(f"Backfilled {len(keys)} days from {start_date} to {end_date}")
+    return keys
+
+
+_s3_clients: Dict[str, object] = {}
+
+
+def get_s3_client(region: str = "eu-west-1"):
+    """One S3 client per region, reused across calls and warm Lambda invocations"""
+    if region not in _s3_clients:
+        _s3_clients[region] = boto3.client("s3", region_name=region)
+    return _s3_clients[region]
+
+
+def upload_to_s3(
+    bucket_name: str, data: dict, region: str = "eu-west-1", data_date: Optional[date] = None
+) -> str:
     """
     Upload collected data as a JSON file to S3.
+
+    Keys are partitioned by day (raw/yyyy=/mm=/dd=/); backfilled days pass
+    `data_date` so each day gets a stable key.
     """
-    s3 = boto3.client("s3", region_name=region)
-    filename = f"raw/market_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-    logger.info(f"Uploading raw data to S3 at {filename}")
+    s3 = get_s3_client(region)
+    filename = raw_key(datetime.now(), data_date=data_date)
+    log_event("eirgrid.upload", key=filename)
 
     s3.put_object(
         Bucket=bucket_name,
@@ -68,15 +192,51 @@ def upload_to_s3(bucket_name: str, data: dict, region: str = "eu-west-1") -> str
     return filename
 
 
-def handler(event=None, context=None):
-    logger.info("Starting EirGrid scraper Lambda")
+def feed_timeseries_store(data: dict) -> None:
+    """Keep the in-process time-series store current where NumPy/pandas are installed"""
+    try:
+        from app.data_sources.timeseries_store import ingest_eirgrid
+    except ImportError:  # the scraper Lambda bundle ships without them
+        return
+    ingest_eirgrid(data)
 
+
+def handler(event=None, context=None):
+    started = time.perf_counter()
     try:
         BUCKET_NAME = os.environ["BUCKET_NAME"]
         AWS_REGION = os.environ.get("AWS_REGION", "eu-west-1")
 
+        event = event or {}
+        if "start_date" in event:
+            # Historical backfill: {"start_date": "2024-01-01", "end_date": "2024-12-31"}
+            start_date = date.fromisoformat(event["start_date"])
+            end_date = date.fromisoformat(event.get("end_date", event["start_date"]))
+            keys = backfill(BUCKET_NAME, start_date, end_date, region=AWS_REGION)
+            log_event("eirgrid.backfill", days=len(keys), seconds=round(time.perf_counter() - started, 3))
+            return {
+                "statusCode": 200,
+                "body": json.dumps(f"Backfilled {len(keys)} days to S3")
+            }
+
         data = fetch_data_from_eirgrid(ENDPOINTS)
         s3_key = upload_to_s3(BUCKET_NAME, data, region=AWS_REGION)
+        feed_timeseries_store(data)
+
+        if os.getenv("PARQUET_BASE_URI"):
+            # pyarrow is only bundled where the Parquet store is configured
+            from app.data_sources.parquet_store import (
+                EIRGRID_DATASET, eirgrid_payload_to_table, write_table
+            )
+            write_table(eirgrid_payload_to_table(data), EIRGRID_DATASET)
+
+        log_event(
+            "eirgrid.invocation",
+            areas=len(data),
+            failed=len(ENDPOINTS) - len(data),
+            key=s3_key,
+            seconds=round(time.perf_counter() - started, 3),
+        )
 
         return {
             "statusCode": 200,
@@ -0,0 +1,324 @@
+"""
+Columnar Parquet storage for raw market data and generated features.
+
+Each dataset lives under {PARQUET_BASE_URI}/{dataset}/ and is hive-partitioned
+by day (yyyy=2024/mm=1/dd=5: integer partitions, so unlike the raw JSON
+keys they are not zero-padded). Readers get
+partition pruning and row-group predicate pushdown on time ranges, plus
+column projection. compact() rewrites a day's small files into one.
+
+    python -m app.data_sources.parquet_store compact --dataset eirgrid --start 2024-01-01
+"""
+import argparse
+import json
+import logging
+import os
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pyarrow import fs
+
+logger = logging.getLogger(__name__)
+
+def _default_base_uri() -> str:
+    """PARQUET_BASE_URI, else the parquet/ prefix of the data bucket, else a local dir"""
+    if os.getenv("PARQUET_BASE_URI"):
+        return os.environ["PARQUET_BASE_URI"]
+    bucket = os.getenv("S3_BUCKET_NAME") or os.getenv("BUCKET_NAME")
+    if bucket:
+        return f"s3://{bucket}/parquet"
+    return os.path.join("app", "data", "parquet")
+
+
+PARQUET_BASE_URI = _default_base_uri()
+
+EIRGRID_DATASET = "eirgrid"
+SEMO_DATASET = "semo"
+FEATURES_DATASET = "features"
+
+PARTITIONING = ds.partitioning(
+    pa.schema([("yyyy", pa.int32()), ("mm", pa.int32()), ("dd", pa.int32())]), flavor="hive"
+)
+
+EIRGRID_SCHEMA = pa.schema(
+    [
+        ("effective_time", pa.timestamp("us")),
+        ("series", pa.dictionary(pa.int8(), pa.string())),
+        ("field_name", pa.dictionary(pa.int16(), pa.string())),
+        ("region", pa.dictionary(pa.int8(), pa.string())),
+        ("value", pa.float64()),
+        ("collected_at", pa.timestamp("us")),
+    ]
+)
+
+SEMO_SCHEMA = pa.schema(
+    [
+        ("effective_time", pa.timestamp("us")),
+        ("report", pa.dictionary(pa.int8(), pa.string())),
+        ("value", pa.float64()),
+        ("collected_at", pa.timestamp("us")),
+    ]
+)
+
+DATASET_SCHEMAS = {EIRGRID_DATASET: EIRGRID_SCHEMA, SEMO_DATASET: SEMO_SCHEMA}
+
+# Every dataset is partitioned on this column
+TIME_COLUMN = "effective_time"
+
+EIRGRID_TIME_FORMAT = "%d-%b-%Y %H:%M:%S"
+
+
+def parquet_enabled() -> bool:
+    """Whether scrapers should also write Parquet (PARQUET_BASE_URI is set)"""
+    return bool(os.getenv("PARQUET_BASE_URI"))
+
+
+def get_filesystem(base_uri: str = PARQUET_BASE_URI) -> Tuple[fs.FileSystem, str]:
+    """Resolve a local path or s3:// URI into a filesystem and root path"""
+    if "://" in base_uri:
+        return fs.FileSystem.from_uri(base_uri)
+    os.makedirs(base_uri, exist_ok=True)
+    return fs.LocalFileSystem(), os.path.abspath(base_uri)
+
+
+def eirgrid_payload_to_table(data: Dict[str, dict], collected_at: Optional[datetime] = None) -> pa.Table:
+    """
+    Flatten a scrape ({label: {"Rows": [...]}}) into one typed long table.
+
+    Each EirGrid row becomes (effective_time, series, field_name, region, value).
+    """
+    collected_at = collected_at or datetime.utcnow()
+    frames = []
+    for label, payload in data.items():
+        rows = (payload or {}).get("Rows") or []
+        if not rows:
+            continue
+        frame = pd.DataFrame.from_records(rows, columns=["EffectiveTime", "FieldName", "Region", "Value"])
+        frame["series"] = label
+        frames.append(frame)
+
+    if not frames:
+        return EIRGRID_SCHEMA.empty_table()
+
+    frame = pd.concat(frames, ignore_index=True)
+    times = pd.to_datetime(frame["EffectiveTime"], format=EIRGRID_TIME_FORMAT, errors="coerce")
+    if times.isna().all():
+        times = pd.to_datetime(frame["EffectiveTime"], errors="coerce")
+    values = pd.to_numeric(frame["Value"], errors="coerce")
+
+    valid = times.notna()
+    table = pd.DataFrame(
+        {
+            "effective_time": times[valid].to_numpy(dtype="datetime64[us]"),
+            "series": frame["series"][valid].astype(str),
+            "field_name": frame["FieldName"][valid].fillna("").astype(str),
+            "region": frame["Region"][valid].fillna("ALL").astype(str),
+            "value": values[valid].to_numpy(dtype=np.float64),
+            "collected_at": np.datetime64(collected_at, "us"),
+        }
+    )
+    return pa.Table.from_pandas(table, schema=EIRGRID_SCHEMA, preserve_index=False)
+
+
+def semo_to_table(parsed: Dict[str, np.ndarray], report: str, collected_at: Optional[datetime] = None) -> pa.Table:
+    """Columnar SEMO page (forecast_time/value arrays) as a typed table"""
+    n_rows = len(parsed["forecast_time"])
+    collected_at = np.datetime64(collected_at or datetime.utcnow(), "us")
+    return pa.table(
+        {
+            "effective_time": pa.array(parsed["forecast_time"], pa.timestamp("us")),
+            "report": pa.array([report] * n_rows).dictionary_encode().cast(SEMO_SCHEMA.field("report").type),
+            "value": pa.array(parsed["value"], pa.float64()),
+            "collected_at": pa.array(np.full(n_rows, collected_at), pa.timestamp("us")),
+        },
+        schema=SEMO_SCHEMA,
+    )
+
+
+def _with_partition_columns(table: pa.Table) -> pa.Table:
+    times = table.column(TIME_COLUMN)
+    return (
+        table.append_column("yyyy", pc.cast(pc.year(times), pa.int32()))
+        .append_column("mm", pc.cast(pc.month(times), pa.int32()))
+        .append_column("dd", pc.cast(pc.day(times), pa.int32()))
+    )
+
+
+def write_table(table: pa.Table, dataset: str, base_uri: str = PARQUET_BASE_URI) -> int:
+    """Append a table to a dataset, one new file per touched day partition"""
+    if table.num_rows == 0:
+        return 0
+    filesystem, root = get_filesystem(base_uri)
+    ds.write_dataset(
+        _with_partition_columns(table),
+        f"{root}/{dataset}",
+        filesystem=filesystem,
+        format="parquet",
+        partitioning=PARTITIONING,
+        basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+        file_options=ds.ParquetFileFormat().make_write_options(compression="zstd"),
+    )
+    return table.num_rows
+
+
+def write_frame(frame: pd.DataFrame, dataset: str, base_uri: str = PARQUET_BASE_URI) -> int:
+    """Append a DataFrame with an effective_time column to a dataset"""
+    if frame.empty:
+        return 0
+    frame = frame.copy()
+    frame[TIME_COLUMN] = pd.to_datetime(frame[TIME_COLUMN]).astype("datetime64[us]")
+    return write_table(pa.Table.from_pandas(frame, preserve_index=False), dataset, base_uri)
+
+
+def _time_filter(start: Optional[datetime], end: Optional[datetime]):
+    """Filter on the partition columns (pruning) and effective_time (row groups)"""
+    expression = None
+
+    def combine(condition):
+        nonlocal expression
+        expression = condition if expression is None else expression & condition
+
+    if start is not None:
+        combine(_compare_day(start, after=True))
+        combine(ds.field(TIME_COLUMN) >= pa.scalar(start, pa.timestamp("us")))
+    if end is not None:
+        combine(_compare_day(end, after=False))
+        combine(ds.field(TIME_COLUMN) < pa.scalar(end, pa.timestamp("us")))
+    return expression
+
+
+def _compare_day(moment: datetime, after: bool):
+    """Partitions on/after (or on/before) moment's day, as plain comparisons that prune"""
+    year, month, day = ds.field("yyyy"), ds.field("mm"), ds.field("dd")
+    if after:
+        return (
+            (year > moment.year)
+            | ((year == moment.year) & (month > moment.month))
+            | ((year == moment.year) & (month == moment.month) & (day >= moment.day))
+        )
+    return (
+        (year < moment.year)
+        | ((year == moment.year) & (month < moment.month))
+        | ((year == moment.year) & (month == moment.month) & (day <= moment.day))
+    )
+
+
+def open_dataset(dataset: str, base_uri: str = PARQUET_BASE_URI) -> Optional[ds.Dataset]:
+    filesystem, root = get_filesystem(base_uri)
+    path = f"{root}/{dataset}"
+    if filesystem.get_file_info(path).type == fs.FileType.NotFound:
+        return None
+    return ds.dataset(path, filesystem=filesystem, format="parquet", partitioning=PARTITIONING)
+
+
+def read_table(
+    dataset: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    columns: Optional[Sequence[str]] = None,
+    filter=None,
+    base_uri: str = PARQUET_BASE_URI,
+) -> pa.Table:
+    """Read [start, end) from a dataset, reading only the needed partitions and columns"""
+    source = open_dataset(dataset, base_uri)
+    if source is None:
+        return pa.table({})
+    expression = _time_filter(start, end)
+    if filter is not None:
+        expression = filter if expression is None else expression & filter
+    return source.to_table(columns=list(columns) if columns else None, filter=expression)
+
+
+def read_frame(
+    dataset: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    columns: Optional[Sequence[str]] = None,
+    filter=None,
+    base_uri: str = PARQUET_BASE_URI,
+) -> pd.DataFrame:
+    table = read_table(dataset, start, end, columns, filter, base_uri)
+    frame = table.to_pandas()
+    if TIME_COLUMN in frame:
+        frame = frame.sort_values(TIME_COLUMN, kind="stable").reset_index(drop=True)
+    return frame
+
+
+def compact(dataset: str, day: date, base_uri: str = PARQUET_BASE_URI) -> int:
+    """
+    Rewrite one day partition's small files as a single sorted file.
+
+    Returns the number of files replaced (0 if already compact).
+    """
+    filesystem, root = get_filesystem(base_uri)
+    partition = f"{root}/{dataset}/yyyy={day.year}/mm={day.month}/dd={day.day}"
+    selector = fs.FileSelector(partition, allow_not_found=True)
+    files = [f.path for f in filesystem.get_file_info(selector) if f.path.endswith(".parquet")]
+    if len(files) <= 1:
+        return 0
+
+    # The files hold no partition columns; read them as plain files (inferring
+    # hive partitioning would add yyyy/mm/dd as dictionaries, which the
+    # dataset's int32 partitioning can't read back) in the dataset's schema
+    schema = DATASET_SCHEMAS.get(dataset) or pa.unify_schemas(
+        [pq.read_schema(path, filesystem=filesystem) for path in files]
+    )
+    table = ds.dataset(files, schema=schema, filesystem=filesystem, format="parquet").to_table().cast(schema)
+    if TIME_COLUMN in table.column_names:
+        table = table.sort_by(TIME_COLUMN)
+
+    compacted = f"{partition}/part-{uuid.uuid4().hex}-compacted.parquet"
+    pq.write_table(table, compacted, filesystem=filesystem, compression="zstd")
+    for path in files:
+        filesystem.delete_file(path)
+    logger.info(f"Compacted {len(files)} files in {dataset} {day}")
+    return len(files)
+
+
+def compact_range(dataset: str, start: date, end: date, base_uri: str = PARQUET_BASE_URI) -> int:
+    replaced = 0
+    day = start
+    while day <= end:
+        replaced += compact(dataset, day, base_uri)
+        day += timedelta(days=1)
+    return replaced
+
+
+def convert_raw_objects(s3, bucket: str, objects: Iterable[dict], base_uri: str = PARQUET_BASE_URI) -> int:
+    """Convert raw JSON scrapes (see raw_store) into the eirgrid dataset"""
+    tables: List[pa.Table] = []
+    for obj in objects:
+        body = s3.get_object(Bucket=bucket, Key=obj["Key"])["Body"].read()
+        modified = obj.get("LastModified")
+        collected_at = modified.replace(tzinfo=None) if modified else None
+        tables.append(eirgrid_payload_to_table(json.loads(body), collected_at))
+    if not tables:
+        return 0
+    return write_table(pa.concat_tables(tables), EIRGRID_DATASET, base_uri)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Maintain Parquet market data datasets")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    compact_parser = subparsers.add_parser("compact", help="Merge small files per day partition")
+    compact_parser.add_argument("--dataset", default=EIRGRID_DATASET)
+    compact_parser.add_argument("--start", type=date.fromisoformat, required=True)
+    compact_parser.add_argument("--end", type=date.fromisoformat, default=None)
+    args = parser.parse_args(argv)
+
+    replaced = compact_range(args.dataset, args.start, args.end or date.today())
+    logger.info(f"Compacted {replaced} files in {args.dataset}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
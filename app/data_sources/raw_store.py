@@ -0,0 +1,212 @@
+"""
+Date-partitioned layout and incremental discovery for raw scrapes in S3.
+
+Raw objects live under raw/yyyy=YYYY/mm=MM/dd=DD/ so readers list only the
+days they need. A manifest of already-processed keys and ETags, plus a
+watermark on the newest partition day seen, lets repeated runs list only
+recent partitions and touch only new or changed objects. ETags for days
+before the listing window are pruned, so the manifest stays small.
+"""
+import json
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from boto3.s3.transfer import TransferConfig
+
+logger = logging.getLogger(__name__)
+
+RAW_PREFIX = "raw/"
+MANIFEST_PREFIX = "manifests/"
+# Days before the watermark that are re-listed (and whose ETags are kept)
+MANIFEST_LOOKBACK_DAYS = 1
+
+PARTITION_PATTERN = re.compile(r"yyyy=(\d{4})/mm=(\d{2})/dd=(\d{2})/")
+LEGACY_PATTERN = re.compile(r"market_data_(\d{4})(\d{2})(\d{2})")
+
+# Multipart settings for large downloads
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=4,
+)
+
+
+def partition_prefix(day: date, prefix: str = RAW_PREFIX) -> str:
+    return f"{prefix}yyyy={day.year:04d}/mm={day.month:02d}/dd={day.day:02d}/"
+
+
+def raw_key(collected_at: datetime, data_date: Optional[date] = None, prefix: str = RAW_PREFIX) -> str:
+    """Key for a raw scrape, partitioned by the day the data is for"""
+    if data_date:
+        return f"{partition_prefix(data_date, prefix)}market_data_{data_date.strftime('%Y%m%d')}_backfill.json"
+    return (
+        f"{partition_prefix(collected_at.date(), prefix)}"
+        f"market_data_{collected_at.strftime('%Y%m%d_%H%M%S')}.json"
+    )
+
+
+def key_day(key: str) -> Optional[date]:
+    """Day a raw key belongs to, from its partition or legacy filename"""
+    match = PARTITION_PATTERN.search(key) or LEGACY_PATTERN.search(key)
+    if not match:
+        return None
+    return date(*(int(part) for part in match.groups()))
+
+
+def iter_objects(s3, bucket: str, prefix: str) -> Iterator[dict]:
+    """Yield every object under a prefix, following list_objects_v2 pagination"""
+    paginator = s3.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        yield from page.get("Contents", [])
+
+
+def list_raw_objects(
+    s3,
+    bucket: str,
+    start_day: date,
+    end_day: date,
+    prefix: str = RAW_PREFIX,
+    suffix: str = ".json",
+) -> List[dict]:
+    """
+    List raw objects for days in [start_day, end_day].
+
+    Reads only the matching day partitions, plus the day-prefixed keys of
+    the older flat layout (raw/market_data_YYYYMMDD_*) so history written
+    before partitioning stays visible.
+    """
+    objects = []
+    day = start_day
+    while day <= end_day:
+        for day_prefix in (partition_prefix(day, prefix), f"{prefix}market_data_{day.strftime('%Y%m%d')}"):
+            objects.extend(o for o in iter_objects(s3, bucket, day_prefix) if o["Key"].endswith(suffix))
+        day += timedelta(days=1)
+    return objects
+
+
+@dataclass
+class Manifest:
+    """Processed keys with their ETags, and the newest partition day seen"""
+
+    etags: Dict[str, str] = field(default_factory=dict)
+    watermark: Optional[date] = None
+
+    def is_new(self, obj: dict) -> bool:
+        return self.etags.get(obj["Key"]) != obj["ETag"]
+
+    def filter_new(self, objects: Iterable[dict]) -> List[dict]:
+        return [o for o in objects if self.is_new(o)]
+
+    def mark(self, objects: Iterable[dict], lookback_days: int = MANIFEST_LOOKBACK_DAYS) -> None:
+        """
+        Record processed objects, then drop ETags for days that will not be
+        listed again (before the watermark minus `lookback_days`). Rescanning
+        older partitions with an explicit start_day re-processes them.
+        """
+        for obj in objects:
+            self.etags[obj["Key"]] = obj["ETag"]
+            day = key_day(obj["Key"])
+            if day and (self.watermark is None or day > self.watermark):
+                self.watermark = day
+
+        if self.watermark is not None:
+            oldest = self.watermark - timedelta(days=lookback_days)
+            stale = [key for key in self.etags if (key_day(key) or oldest) < oldest]
+            for key in stale:
+                del self.etags[key]
+
+    def start_day(self, default: date, lookback_days: int = MANIFEST_LOOKBACK_DAYS) -> date:
+        """First partition worth listing: the watermark minus a safety margin"""
+        if self.watermark is None:
+            return default
+        return self.watermark - timedelta(days=lookback_days)
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "etags": self.etags,
+                "watermark": self.watermark.isoformat() if self.watermark else None,
+            }
+        )
+
+    @classmethod
+    def from_json(cls, body: str) -> "Manifest":
+        data = json.loads(body)
+        watermark = data.get("watermark")
+        return cls(
+            etags=data.get("etags", {}),
+            watermark=date.fromisoformat(watermark) if watermark else None,
+        )
+
+    @classmethod
+    def load_file(cls, path: str) -> "Manifest":
+        if not os.path.exists(path):
+            return cls()
+        with open(path) as f:
+            return cls.from_json(f.read())
+
+    def save_file(self, path: str) -> None:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.to_json())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load_s3(cls, s3, bucket: str, name: str) -> "Manifest":
+        try:
+            body = s3.get_object(Bucket=bucket, Key=f"{MANIFEST_PREFIX}{name}.json")["Body"].read()
+        except s3.exceptions.NoSuchKey:
+            return cls()
+        return cls.from_json(body)
+
+    def save_s3(self, s3, bucket: str, name: str) -> None:
+        s3.put_object(
+            Bucket=bucket,
+            Key=f"{MANIFEST_PREFIX}{name}.json",
+            Body=self.to_json(),
+            ContentType="application/json",
+        )
+
+
+def discover_new_objects(
+    s3,
+    bucket: str,
+    manifest: Manifest,
+    default_start: date,
+    start_day: Optional[date] = None,
+    end_day: Optional[date] = None,
+    prefix: str = RAW_PREFIX,
+) -> List[dict]:
+    """
+    Objects added or changed since the manifest was last updated.
+
+    Lists from the manifest watermark (or `default_start` on a first run);
+    pass `start_day` to rescan older partitions, e.g. after a backfill.
+    """
+    end_day = end_day or datetime.now(timezone.utc).date()
+    start_day = start_day or manifest.start_day(default_start)
+    return manifest.filter_new(list_raw_objects(s3, bucket, start_day, end_day, prefix))
+
+
+def download_objects(
+    s3,
+    bucket: str,
+    objects: Iterable[dict],
+    local_dir: str,
+    max_workers: int = 8,
+) -> List[str]:
+    """Download objects in parallel (multipart for large ones) into local_dir"""
+    os.makedirs(local_dir, exist_ok=True)
+
+    def download(obj: dict) -> str:
+        local_path = os.path.join(local_dir, os.path.basename(obj["Key"]))
+        s3.download_file(bucket, obj["Key"], local_path, Config=TRANSFER_CONFIG)
+        return local_path
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(download, objects))
@@ -1,8 +1,19 @@
+import argparse
+import os
+import queue
+import threading
+import numpy as np
+import pandas as pd
 import requests
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional
 from sqlalchemy.orm import Session
-from app.database.database import get_db
-from app.database.models import PriceForecast
+from app.database.bulk import bulk_load
+from app.database.database import SessionLocal
+from app.database.models import ForecastTypeEnum, PriceForecast, MarketTypeEnum
+from app.data_sources.timeseries_store import ingest_semo
+from app.utils.cache import forecast_cache
+from app.utils.metrics import SCRAPER_FETCH_ERRORS, SCRAPER_FETCH_SECONDS, db_operation, timer
 import logging
 
 logger = logging.getLogger(__name__)
@@ -16,91 +27,259 @@ ENDPOINTS = {
     "bm_095": "BM-095",  # Market Cost View
 }
 
+PAGE_SIZE = 5000
+REQUEST_TIMEOUT = 30
+# Parsed pages buffered between the fetch threads and the DB writer
+MAX_BUFFERED_PAGES = 8
+# How often a producer blocked on a full queue checks whether the writer stopped
+PUT_TIMEOUT_SECONDS = 1.0
 
-def fetch_report(endpoint: str, start_date: str, end_date: str, page_size: int = 5000):
+_session: Optional[requests.Session] = None
+
+
+def get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        _session = requests.Session()
+    return _session
+
+
+def iter_report_pages(
+    endpoint: str, start_date: str, end_date: str, page_size: int = PAGE_SIZE
+) -> Iterator[List[dict]]:
+    """Yield a report's items one page at a time, following SEMO pagination"""
     url = f"{BASE_URL}/{endpoint}"
-    params = {
-        "StartTime": f">={start_date}",
-        "EndTime": f"<={end_date}",
-        "sort_by": "StartTime",
-        "order_by": "ASC",
-        "Jurisdiction": "All",
-        "page_size": page_size,
+    session = get_session()
+    page = 1
+    while True:
+        params = {
+            "StartTime": f">={start_date}",
+            "EndTime": f"<={end_date}",
+            "sort_by": "StartTime",
+            "order_by": "ASC",
+            "Jurisdiction": "All",
+            "page_size": page_size,
+            "page": page,
+        }
+        with timer(SCRAPER_FETCH_SECONDS, source="semo", report=endpoint):
+            response = session.get(url, params=params, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        payload = response.json()
+        items = payload.get("items", [])
+        if items:
+            yield items
+
+        total_pages = (payload.get("pagination") or {}).get("totalPages")
+        if not items or (total_pages is not None and page >= total_pages):
+            break
+        if total_pages is None and len(items) < page_size:
+            break
+        page += 1
+
+
+def fetch_report(endpoint: str, start_date: str, end_date: str, page_size: int = PAGE_SIZE):
+    """Fetch every page of a report into one list (prefer iter_report_pages for long ranges)"""
+    items = []
+    for page in iter_report_pages(endpoint, start_date, end_date, page_size):
+        items.extend(page)
+    return items
+
+
+def parse_items(data: list, value_field: str, report: str) -> Dict[str, np.ndarray]:
+    """
+    Parse report items into columnar arrays of forecast_time and value.
+
+    Unparseable items are dropped with a single summary warning, and
+    duplicate start times keep the last item so each page upserts cleanly.
+    """
+    frame = pd.DataFrame.from_records(data, columns=["StartTime", value_field])
+    times = pd.to_datetime(frame["StartTime"], errors="coerce", utc=True).dt.tz_localize(None)
+    values = pd.to_numeric(frame[value_field], errors="coerce")
+
+    valid = times.notna() & values.notna()
+    skipped = int((~valid).sum())
+    if skipped:
+        logger.warning(f"{report}: skipped {skipped} of {len(frame)} unparseable items")
+
+    parsed = pd.DataFrame({"forecast_time": times[valid], "value": values[valid]})
+    parsed = parsed.drop_duplicates(subset="forecast_time", keep="last")
+    return {
+        "forecast_time": parsed["forecast_time"].to_numpy(dtype="datetime64[us]"),
+        "value": parsed["value"].to_numpy(dtype=np.float64),
     }
-    response = requests.get(url, params=params)
-    response.raise_for_status()
-    return response.json().get("items", [])
+
+
+@db_operation("semo.store_prices")
+def store_prices(db: Session, parsed: Dict[str, np.ndarray], source: str) -> int:
+    """Bulk upsert parsed BM prices into price_forecasts"""
+    n_rows = len(parsed["forecast_time"])
+    if n_rows == 0:
+        return 0
+    return bulk_load(
+        db,
+        PriceForecast,
+        {
+            "timestamp": np.full(n_rows, np.datetime64(datetime.utcnow(), "us")),
+            "forecast_time": parsed["forecast_time"],
+            "market_type": [MarketTypeEnum.BM.value] * n_rows,
+            "region": ["ALL"] * n_rows,
+            "source": [source] * n_rows,
+            "predicted_price": parsed["value"],
+        },
+        conflict_columns=PriceForecast.NATURAL_KEY,
+        update_columns=("timestamp", "predicted_price"),
+    )
 
 
 def parse_and_store_imbalance_price_report(db: Session, data: list):
-    for item in data:
-        try:
-            timestamp = datetime.fromisoformat(item["StartTime"])
-            price = float(item["ImbalancePriceAmountEUR"])
-            forecast = PriceForecast(
-                forecast_time=timestamp,
-                predicted_price=price,
-                actual_price=None,
-                market_type="BM",
-                region="ALL",
-                source="SEMO-BM025",
-            )
-            db.add(forecast)
-        except Exception as e:
-            logger.warning(f"BM-025 parse error: {e} | item: {item}")
+    parsed = parse_items(data, "ImbalancePriceAmountEUR", "BM-025")
+    return store_prices(db, parsed, "SEMO-BM025")
 
 
 def parse_and_store_system_price(db: Session, data: list):
-    for item in data:
-        try:
-            timestamp = datetime.fromisoformat(item["StartTime"])
-            price = float(item["PriceAmountEUR"])
-            forecast = PriceForecast(
-                forecast_time=timestamp,
-                predicted_price=price,
-                actual_price=None,
-                market_type="BM",
-                region="ALL",
-                source="SEMO-BM026",
-            )
-            db.add(forecast)
-        except Exception as e:
-            logger.warning(f"BM-026 parse error: {e} | item: {item}")
+    parsed = parse_items(data, "PriceAmountEUR", "BM-026")
+    return store_prices(db, parsed, "SEMO-BM026")
+
+
+def log_market_cost(parsed: Dict[str, np.ndarray]):
+    if len(parsed["value"]):
+        logger.info(
+            f"BM-095 market cost {parsed['forecast_time'][0]} to {parsed['forecast_time'][-1]}: "
+            f"{parsed['value'].sum():.2f} EUR over {len(parsed['value'])} periods"
+        )
 
 
 def parse_and_store_market_cost_view(db: Session, data: list):
-    for item in data:
+    log_market_cost(parse_items(data, "TotalMarketCost", "BM-095"))
+    return 0
+
+
+# report -> (value field, price_forecasts source or None if not stored in the DB)
+REPORTS = {
+    "bm_025": ("ImbalancePriceAmountEUR", "SEMO-BM025"),
+    "bm_026": ("PriceAmountEUR", "SEMO-BM026"),
+    "bm_095": ("TotalMarketCost", None),
+}
+
+
+def _store_page(db: Session, name: str, items: list, write_parquet: bool) -> int:
+    value_field, source = REPORTS[name]
+    parsed = parse_items(items, value_field, ENDPOINTS[name])
+    ingest_semo(parsed, ENDPOINTS[name])
+    if write_parquet:
+        from app.data_sources.parquet_store import SEMO_DATASET, semo_to_table, write_table
+
+        write_table(semo_to_table(parsed, ENDPOINTS[name]), SEMO_DATASET)
+    if source is None:
+        log_market_cost(parsed)
+        return 0
+    return store_prices(db, parsed, source)
+
+
+_DONE = object()
+
+
+def _put(pages: queue.Queue, item: tuple, stop: threading.Event) -> bool:
+    """Queue an item, giving up (False) once the writer has stopped"""
+    while not stop.is_set():
         try:
-            timestamp = datetime.fromisoformat(item["StartTime"])
-            cost = float(item.get("TotalMarketCost", 0))
-            logger.info(f"BM-095 market cost {timestamp}: {cost} EUR")
-        except Exception as e:
-            logger.warning(f"BM-095 parse error: {e} | item: {item}")
+            pages.put(item, timeout=PUT_TIMEOUT_SECONDS)
+            return True
+        except queue.Full:
+            continue
+    return False
+
 
+def _produce_pages(
+    name: str,
+    start: str,
+    end: str,
+    pages: queue.Queue,
+    page_size: int,
+    stop: threading.Event,
+    errors: List[Exception],
+):
+    try:
+        for items in iter_report_pages(ENDPOINTS[name], start, end, page_size):
+            if not _put(pages, (name, items), stop):
+                return
+    except Exception as e:
+        SCRAPER_FETCH_ERRORS.labels(source="semo", report=ENDPOINTS[name]).inc()
+        logger.error(f"Failed to fetch {ENDPOINTS[name]}: {e}")
+        errors.append(e)
+    finally:
+        _put(pages, (name, _DONE), stop)
 
-def run_semo_scraper():
-    db_gen = get_db()
-    db = next(db_gen)
 
-    today = datetime.utcnow().date()
-    start = today - timedelta(days=1)
-    end = today
+def run_semo_scraper(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    page_size: int = PAGE_SIZE,
+) -> Dict[str, int]:
+    """
+    Stream BM-025/026/095 for [start, end] into the database.
 
-    logger.info("Fetching SEMO BM-025 imbalance price data...")
-    bm_025_data = fetch_report(ENDPOINTS["bm_025"], start.isoformat(), end.isoformat())
-    parse_and_store_imbalance_price_report(db, bm_025_data)
+    The three reports are fetched concurrently, one thread each, into a
+    bounded queue of pages; this thread parses and bulk-loads each page as
+    it arrives, so memory stays flat however long the date range is. If the
+    writer fails, the fetch threads stop at their next page; if a fetch
+    fails, the other reports are still written and the first fetch error is
+    raised once the queue is drained. With
+    PARQUET_BASE_URI set, every parsed page is also appended to the semo
+    Parquet dataset. Returns rows written to the database per report.
+    """
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=1)
 
-    logger.info("Fetching SEMO BM-026 system price data...")
-    bm_026_data = fetch_report(ENDPOINTS["bm_026"], start.isoformat(), end.isoformat())
-    parse_and_store_system_price(db, bm_026_data)
+    pages: queue.Queue = queue.Queue(maxsize=MAX_BUFFERED_PAGES)
+    stop = threading.Event()
+    errors: List[Exception] = []
+    for name in REPORTS:
+        logger.info(f"Fetching SEMO {ENDPOINTS[name]} from {start} to {end}...")
+        threading.Thread(
+            target=_produce_pages,
+            args=(name, start.isoformat(), end.isoformat(), pages, page_size, stop, errors),
+            name=f"semo-{name}",
+            daemon=True,
+        ).start()
 
-    logger.info("Fetching SEMO BM-095 cost view data...")
-    bm_095_data = fetch_report(ENDPOINTS["bm_095"], start.isoformat(), end.isoformat())
-    parse_and_store_market_cost_view(db, bm_095_data)
+    written = {name: 0 for name in REPORTS}
+    remaining = len(REPORTS)
+    write_parquet = bool(os.getenv("PARQUET_BASE_URI"))
+    db = SessionLocal()
+    try:
+        while remaining:
+            name, items = pages.get()
+            if items is _DONE:
+                remaining -= 1
+                continue
+            written[name] += _store_page(db, name, items, write_parquet)
+            db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+        # Unblock producers still waiting on a full queue
+        stop.set()
+        while True:
+            try:
+                pages.get_nowait()
+            except queue.Empty:
+                break
 
-    db.commit()
-    logger.info("SEMO data successfully scraped and saved.")
+    # Lets API workers sharing the cache (REDIS_URL) drop stale price responses
+    forecast_cache.invalidate(ForecastTypeEnum.PRICE.value)
+    if errors:
+        logger.error(f"SEMO scrape incomplete, wrote {written}")
+        raise errors[0]
+    logger.info(f"SEMO data successfully scraped and saved: {written}")
+    return written
 
 
 if __name__ == "__main__":
-    run_semo_scraper()
+    parser = argparse.ArgumentParser(description="Ingest SEMO balancing market reports")
+    parser.add_argument("--start", type=date.fromisoformat, default=None)
+    parser.add_argument("--end", type=date.fromisoformat, default=None)
+    args = parser.parse_args()
+    run_semo_scraper(args.start, args.end)
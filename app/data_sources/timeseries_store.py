@@ -0,0 +1,354 @@
+"""
+Process-local store of recent market series in fixed-size NumPy ring buffers.
+
+Each series (demand, wind, imbalance and system prices, ...) keeps the last
+TIMESERIES_STORE_DAYS of values on the 15-minute grid, indexed by absolute
+period number, so appending a period is O(1) and a range read is one or two
+contiguous slices. Finer inputs (5-minute prices) are averaged into their
+period; coarser inputs (30-minute prices) occupy the first period of their
+interval, which the mean-based resampling to 30-minute/hourly accounts for.
+
+Scrapers feed the store as they ingest and the feature engine reads
+history from it, falling back to the Parquet store (and refilling the
+buffers) when the range is not covered or the data is older than
+TIMESERIES_STORE_MAX_AGE_SECONDS. Snapshots are a single .npy file plus a
+JSON header, restored memory-mapped copy-on-write so restarts are instant:
+
+    store = get_store()
+    store.append("demand", times, values)
+    times, values = store.range("demand", start, end, freq="30min")
+    store.snapshot("/var/cache/balancing/timeseries")
+"""
+import json
+import logging
+import os
+import threading
+import time
+import warnings
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+TIMESERIES_STORE_DAYS = int(os.getenv("TIMESERIES_STORE_DAYS", "14"))
+# Older than this and readers go back to the Parquet store (the scrape cadence)
+TIMESERIES_STORE_MAX_AGE_SECONDS = float(os.getenv("TIMESERIES_STORE_MAX_AGE_SECONDS", "900"))
+TIMESERIES_SNAPSHOT_PATH = os.getenv("TIMESERIES_SNAPSHOT_PATH")
+
+PERIOD_MINUTES = 15
+PERIODS_PER_DAY = 24 * 60 // PERIOD_MINUTES
+PERIOD = np.timedelta64(PERIOD_MINUTES, "m")
+
+# SEMO report -> store series
+SEMO_SERIES = {"BM-025": "imbalance_price", "BM-026": "system_price"}
+
+
+def to_periods(times) -> np.ndarray:
+    """Absolute 15-minute period numbers (since the epoch) for naive UTC times"""
+    minutes = np.asarray(times, dtype="datetime64[m]").astype(np.int64)
+    return minutes // PERIOD_MINUTES
+
+
+def period_times(first: int, n_periods: int) -> np.ndarray:
+    minutes = np.arange(first, first + n_periods, dtype=np.int64) * PERIOD_MINUTES
+    return minutes.astype("datetime64[m]").astype("datetime64[us]")
+
+
+def _freq_periods(freq: str) -> int:
+    interval = pd.Timedelta(pd.tseries.frequencies.to_offset(freq))
+    step = interval // pd.Timedelta(minutes=PERIOD_MINUTES)
+    if step < 1 or interval % pd.Timedelta(minutes=PERIOD_MINUTES):
+        raise ValueError(f"freq must be a multiple of {PERIOD_MINUTES} minutes, got {freq}")
+    return int(step)
+
+
+class RingSeries:
+    """
+    One series over the last `capacity` periods.
+
+    `head` is one past the newest period written; slots from head - capacity
+    to head are live, everything older has been overwritten. `filled_from`
+    is the earliest period ever written, so a live scrape of the last hour
+    does not make the store look like it holds the days before it.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        values: Optional[np.ndarray] = None,
+        head: int = 0,
+        filled_from: Optional[int] = None,
+        updated_at: float = 0.0,
+    ):
+        self.capacity = capacity
+        self.values = values if values is not None else np.full(capacity, np.nan)
+        self.head = head
+        self.filled_from = filled_from
+        self.updated_at = updated_at
+
+    @property
+    def oldest(self) -> int:
+        return self.head - self.capacity
+
+    def _advance(self, new_head: int) -> None:
+        """Move head forward, clearing the slots it passes over"""
+        if new_head <= self.head:
+            return
+        if new_head - self.head >= self.capacity or self.head == 0:
+            self.values[:] = np.nan
+        else:
+            self.values[np.arange(self.head, new_head) % self.capacity] = np.nan
+        self.head = new_head
+
+    def write(self, periods: np.ndarray, values: np.ndarray) -> int:
+        """Write values by period (means where several share one); returns periods kept"""
+        if len(periods) == 0:
+            return 0
+        self._advance(int(periods.max()) + 1)
+        keep = (periods >= self.oldest) & ~np.isnan(values)
+        periods, values = periods[keep], values[keep]
+        if len(periods) == 0:
+            return 0
+
+        unique, inverse = np.unique(periods, return_inverse=True)
+        if len(unique) < len(periods):
+            values = np.bincount(inverse, weights=values) / np.bincount(inverse)
+        self.values[unique % self.capacity] = values
+        earliest = int(unique[0])
+        self.filled_from = earliest if self.filled_from is None else min(self.filled_from, earliest)
+        self.updated_at = time.time()
+        return len(unique)
+
+    def read(self, first: int, n_periods: int) -> np.ndarray:
+        """Copy of periods [first, first + n_periods); NaN outside the live window"""
+        out = np.full(n_periods, np.nan)
+        lo, hi = max(first, self.oldest), min(first + n_periods, self.head)
+        if lo >= hi:
+            return out
+        start, stop = lo % self.capacity, (hi - 1) % self.capacity + 1
+        if start < stop:
+            out[lo - first : hi - first] = self.values[start:stop]
+        else:  # wraps around the end of the buffer
+            split = self.capacity - start
+            out[lo - first : lo - first + split] = self.values[start:]
+            out[lo - first + split : hi - first] = self.values[:stop]
+        return out
+
+
+class TimeSeriesStore:
+    """Named ring-buffer series sharing one retention window; thread-safe"""
+
+    def __init__(self, days: int = TIMESERIES_STORE_DAYS):
+        self.capacity = days * PERIODS_PER_DAY
+        self._series: Dict[str, RingSeries] = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._series
+
+    def names(self):
+        return list(self._series)
+
+    def append(self, name: str, times, values) -> int:
+        """Write (times, values) into a series, creating it on first use"""
+        periods = to_periods(times)
+        values = np.asarray(values, dtype=np.float64)
+        with self._lock:
+            series = self._series.get(name)
+            if series is None:
+                series = self._series[name] = RingSeries(self.capacity)
+            return series.write(periods, values)
+
+    def range(
+        self, name: str, start: datetime, end: datetime, freq: str = "15min"
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (times, values) for [start, end) at `freq` (15min, 30min, h, ...).
+
+        Resampling averages the 15-minute values in each interval, ignoring
+        missing ones; `start` is floored to the interval.
+        """
+        step = _freq_periods(freq)
+        first = int(to_periods(np.datetime64(start, "m"))) // step * step
+        n_periods = -(-(int(to_periods(np.datetime64(end, "m"))) - first) // step) * step
+        series = self._series.get(name)
+        values = series.read(first, n_periods) if series else np.full(n_periods, np.nan)
+        if step > 1:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN intervals
+                values = np.nanmean(values.reshape(-1, step), axis=1)
+        return period_times(first, n_periods)[::step], values
+
+    def frame(
+        self, names: Sequence[str], start: datetime, end: datetime, freq: str = "15min"
+    ) -> pd.DataFrame:
+        """Wide frame of several series over [start, end), indexed by effective_time"""
+        columns = {}
+        times = None
+        for name in names:
+            times, columns[name] = self.range(name, start, end, freq)
+        frame = pd.DataFrame(columns, index=pd.DatetimeIndex(times, name="effective_time"))
+        return frame.loc[(frame.index >= pd.Timestamp(start)) & (frame.index < pd.Timestamp(end))]
+
+    def covers(
+        self, names: Iterable[str], start: datetime, max_age: float = TIMESERIES_STORE_MAX_AGE_SECONDS
+    ) -> bool:
+        """Whether every series holds data back to `start` and was written recently"""
+        first = int(to_periods(np.datetime64(start, "m")))
+        now = time.time()
+        for name in names:
+            series = self._series.get(name)
+            if (
+                series is None
+                or series.filled_from is None
+                or max(series.filled_from, series.oldest) > first
+                or now - series.updated_at > max_age
+            ):
+                return False
+        return True
+
+    def append_frame(self, frame: pd.DataFrame) -> int:
+        """Write every column of a time-indexed frame as a series"""
+        times = frame.index.to_numpy(dtype="datetime64[us]")
+        return sum(
+            self.append(str(name), times, frame[name].to_numpy(dtype=np.float64)) for name in frame.columns
+        )
+
+    def snapshot(self, path: str) -> None:
+        """
+        Write all series to a new .npy file and point `path`.json at it.
+
+        The header is replaced last and atomically, so concurrent writers
+        (e.g. several workers shutting down) and readers never see a
+        header that does not match its data file.
+        """
+        data_file = f"{os.path.basename(path)}.{os.getpid()}-{time.time_ns()}.npy"
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            names = list(self._series)
+            header = {
+                "data_file": data_file,
+                "capacity": self.capacity,
+                "period_minutes": PERIOD_MINUTES,
+                "series": names,
+                "head": [self._series[name].head for name in names],
+                "filled_from": [self._series[name].filled_from for name in names],
+                "updated_at": [self._series[name].updated_at for name in names],
+            }
+            array = np.lib.format.open_memmap(
+                os.path.join(directory, data_file),
+                mode="w+",
+                dtype=np.float64,
+                shape=(len(names), self.capacity),
+            )
+            for row, name in enumerate(names):
+                array[row] = self._series[name].values
+            array.flush()
+            del array
+
+        previous = _snapshot_data_file(path)
+        tmp = f"{path}.json.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(header, f)
+        os.replace(tmp, f"{path}.json")
+        if previous and previous != data_file:
+            # Readers that already mapped it keep their mapping after the unlink
+            try:
+                os.remove(os.path.join(directory, previous))
+            except FileNotFoundError:
+                pass
+        logger.info(f"Saved {len(names)} series snapshot to {path}")
+
+    @classmethod
+    def restore(cls, path: str) -> "TimeSeriesStore":
+        """
+        Open a snapshot memory-mapped copy-on-write: pages load lazily and
+        new writes never touch the file.
+        """
+        with open(f"{path}.json") as f:
+            header = json.load(f)
+        if header["period_minutes"] != PERIOD_MINUTES:
+            raise ValueError(f"Snapshot uses {header['period_minutes']}-minute periods")
+        store = cls(days=header["capacity"] // PERIODS_PER_DAY)
+        store.capacity = header["capacity"]
+        directory = os.path.dirname(os.path.abspath(path))
+        array = np.load(os.path.join(directory, header["data_file"]), mmap_mode="c")
+        for row, name in enumerate(header["series"]):
+            store._series[name] = RingSeries(
+                store.capacity,
+                array[row],
+                header["head"][row],
+                header["filled_from"][row],
+                header["updated_at"][row],
+            )
+        logger.info(f"Restored {len(header['series'])} series from {path}")
+        return store
+
+
+def _snapshot_data_file(path: str) -> Optional[str]:
+    try:
+        with open(f"{path}.json") as f:
+            return json.load(f).get("data_file")
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def ingest_eirgrid(
+    data: Dict[str, dict], store: Optional[TimeSeriesStore] = None, region: str = "ALL"
+) -> int:
+    """Feed one EirGrid scrape ({label: {"Rows": [...]}}) into the store"""
+    store = store or get_store()
+    written = 0
+    for label, payload in data.items():
+        rows = (payload or {}).get("Rows") or []
+        if not rows:
+            continue
+        frame = pd.DataFrame.from_records(rows, columns=["EffectiveTime", "Region", "Value"])
+        frame = frame[frame["Region"].fillna(region) == region]
+        times = pd.to_datetime(frame["EffectiveTime"], format="%d-%b-%Y %H:%M:%S", errors="coerce")
+        values = pd.to_numeric(frame["Value"], errors="coerce")
+        valid = times.notna()
+        written += store.append(
+            label,
+            times[valid].to_numpy(dtype="datetime64[us]"),
+            values[valid].to_numpy(dtype=np.float64),
+        )
+    return written
+
+
+def ingest_semo(parsed: Dict[str, np.ndarray], report: str, store: Optional[TimeSeriesStore] = None) -> int:
+    """Feed parsed SEMO prices (see semo_scraper.parse_items) into the store"""
+    name = SEMO_SERIES.get(report)
+    if name is None:
+        return 0
+    return (store or get_store()).append(name, parsed["forecast_time"], parsed["value"])
+
+
+_store: Optional[TimeSeriesStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> TimeSeriesStore:
+    """The process-wide store, restored from TIMESERIES_SNAPSHOT_PATH when one exists"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                store = None
+                if TIMESERIES_SNAPSHOT_PATH and os.path.exists(f"{TIMESERIES_SNAPSHOT_PATH}.json"):
+                    try:
+                        store = TimeSeriesStore.restore(TIMESERIES_SNAPSHOT_PATH)
+                    except Exception as e:
+                        logger.warning(f"Could not restore time-series snapshot: {e}")
+                _store = store or TimeSeriesStore()
+    return _store
+
+
+def save_snapshot() -> None:
+    """Snapshot the process-wide store if TIMESERIES_SNAPSHOT_PATH is set"""
+    if TIMESERIES_SNAPSHOT_PATH and _store is not None:
+        _store.snapshot(TIMESERIES_SNAPSHOT_PATH)
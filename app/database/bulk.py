@@ -0,0 +1,156 @@
+import csv
+import io
+import logging
+from typing import Dict, Iterable, Sequence
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.utils.metrics import DB_ROUND_TRIPS, ROWS_INGESTED, current_operation
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def _insert_for_dialect(dialect_name: str):
+    """Return the dialect-specific insert() that supports ON CONFLICT"""
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"Bulk upsert is not supported on {dialect_name}")
+    return insert
+
+
+def upsert_rows(
+    db: Session,
+    model,
+    rows: Iterable[dict],
+    conflict_columns: Sequence[str],
+    update_columns: Sequence[str],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> int:
+    """
+    Write rows with INSERT ... ON CONFLICT DO UPDATE in fixed-size chunks.
+
+    Each chunk is a single multi-row statement; the caller owns the
+    transaction and decides when to commit. Rows repeating a conflict key
+    within a chunk collapse to the last one (Postgres rejects a statement
+    that would update the same row twice); across chunks the later
+    statement wins, so the last row is kept either way.
+    """
+    insert = _insert_for_dialect(db.get_bind().dialect.name)
+    table = model.__table__
+
+    written = 0
+    chunk: Dict[tuple, dict] = {}
+    for row in rows:
+        chunk[tuple(row[name] for name in conflict_columns)] = row
+        if len(chunk) >= chunk_size:
+            written += _execute_upsert(db, insert, table, chunk.values(), conflict_columns, update_columns)
+            chunk = {}
+    if chunk:
+        written += _execute_upsert(db, insert, table, chunk.values(), conflict_columns, update_columns)
+
+    return written
+
+
+def _execute_upsert(db, insert, table, chunk: Iterable[dict], conflict_columns, update_columns) -> int:
+    chunk = list(chunk)
+    stmt = insert(table).values(chunk)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(conflict_columns),
+        set_={name: stmt.excluded[name] for name in update_columns},
+    )
+    db.execute(stmt)
+    ROWS_INGESTED.labels(table=table.name).inc(len(chunk))
+    return len(chunk)
+
+
+def bulk_load(
+    db: Session,
+    model,
+    columns: Dict[str, Sequence],
+    conflict_columns: Sequence[str],
+    update_columns: Sequence[str],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> int:
+    """
+    Idempotently load columnar data (column name -> equal-length array).
+
+    On Postgres each chunk is streamed with COPY into a temporary staging
+    table and merged with INSERT ... SELECT ... ON CONFLICT; elsewhere it
+    falls back to chunked multi-row upserts. Enum columns take their
+    string values. Of rows sharing a conflict key only the last is kept.
+    """
+    columns = {name: _to_python(values) for name, values in columns.items()}
+    names = list(columns)
+    n_rows = len(columns[names[0]]) if names else 0
+    if n_rows == 0:
+        return 0
+    columns = _keep_last(columns, conflict_columns)
+    n_rows = len(columns[names[0]])
+
+    if db.get_bind().dialect.name != "postgresql":
+        rows = (dict(zip(names, values)) for values in zip(*columns.values()))
+        return upsert_rows(db, model, rows, conflict_columns, update_columns, chunk_size)
+
+    written = 0
+    for start in range(0, n_rows, chunk_size):
+        chunk = {name: columns[name][start : start + chunk_size] for name in names}
+        written += _copy_upsert(db, model.__table__.name, chunk, conflict_columns, update_columns)
+    return written
+
+
+def _keep_last(columns: Dict[str, list], conflict_columns: Sequence[str]) -> Dict[str, list]:
+    """Drop all but the last row for each conflict key, keeping row order otherwise"""
+    last = {key: i for i, key in enumerate(zip(*(columns[name] for name in conflict_columns)))}
+    n_rows = len(columns[next(iter(columns))])
+    if len(last) == n_rows:
+        return columns
+    keep = sorted(last.values())
+    return {name: [values[i] for i in keep] for name, values in columns.items()}
+
+
+def _to_python(values) -> list:
+    """Convert NumPy arrays to lists of Python scalars (datetime64 -> datetime)"""
+    if isinstance(values, np.ndarray):
+        if values.dtype.kind == "M":
+            values = values.astype("datetime64[us]")
+        return values.tolist()
+    return list(values)
+
+
+def _copy_upsert(db: Session, table: str, chunk: Dict[str, Sequence], conflict_columns, update_columns) -> int:
+    names = list(chunk)
+    n_rows = len(chunk[names[0]])
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(zip(*(chunk[name] for name in names)))
+    buffer.seek(0)
+
+    column_list = ", ".join(names)
+    staging = f"{table}_staging"
+    updates = ", ".join(f"{name} = EXCLUDED.{name}" for name in update_columns)
+
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.execute(
+            f"CREATE TEMP TABLE IF NOT EXISTS {staging} ON COMMIT DROP AS "
+            f"SELECT {column_list} FROM {table} WITH NO DATA"
+        )
+        cursor.execute(f"TRUNCATE {staging}")
+        cursor.copy_expert(f"COPY {staging} ({column_list}) FROM STDIN WITH CSV", buffer)
+        cursor.execute(
+            f"INSERT INTO {table} ({column_list}) SELECT {column_list} FROM {staging} "
+            f"ON CONFLICT ({', '.join(conflict_columns)}) DO UPDATE SET {updates}"
+        )
+    finally:
+        cursor.close()
+    # Raw DBAPI statements bypass the engine's cursor events, so count them here
+    DB_ROUND_TRIPS.labels(operation=current_operation()).inc(4)
+    ROWS_INGESTED.labels(table=table).inc(n_rows)
+    return n_rows
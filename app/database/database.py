@@ -1,21 +1,152 @@
-from sqlalchemy import create_engine
+"""
+Engines and sessions, all created on first use.
+
+Importing this module only defines the declarative Base, so Lambdas and
+scripts that never touch the database do not pay for load_dotenv(), engine
+construction or the async driver, and a missing DATABASE_URL only fails
+when a connection is actually needed. Engines are cached per process and
+reused across warm Lambda invocations.
+"""
+import os
+import threading
+
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-import os
-from dotenv import load_dotenv
 
-load_dotenv()
+Base = declarative_base()
+
+# Log every statement (very noisy, off by default)
+SQL_ECHO = os.getenv("SQL_ECHO", "false").lower() == "true"
 
-DATABASE_URL = os.getenv("DATABASE_URL")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
 
-if not DATABASE_URL:
-    raise ValueError("DATABASE_URL environment variable is not set.")
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
 
-engine = create_engine(DATABASE_URL, pool_pre_ping=True, echo=True)
+_engine = None
+_async_engine = None
+_async_session_factory = None
+_lock = threading.Lock()
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-Base = declarative_base()
+def get_database_url() -> str:
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        url = os.getenv("DATABASE_URL")
+    if not url:
+        raise ValueError("DATABASE_URL environment variable is not set.")
+    return url
+
+
+def _pool_kwargs(url: str) -> dict:
+    from sqlalchemy.engine import make_url
+
+    # SQLite's default pools do not take size/overflow settings
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_timeout": DB_POOL_TIMEOUT,
+    }
+
+
+def async_database_url(url: str) -> str:
+    """The same database through its asyncio driver (asyncpg for Postgres)"""
+    from sqlalchemy.engine import make_url
+
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No async driver configured for {parsed.get_backend_name()}")
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def get_engine():
+    """Sync engine for Alembic, the Lambdas and scripts"""
+    global _engine
+    if _engine is None:
+        with _lock:
+            if _engine is None:
+                from sqlalchemy import create_engine
+                from app.database.instrumentation import install_query_logging
+
+                url = get_database_url()
+                _engine = create_engine(url, pool_pre_ping=True, echo=SQL_ECHO, **_pool_kwargs(url))
+                install_query_logging(_engine)
+    return _engine
+
+
+class _LazySessionmaker(sessionmaker):
+    """sessionmaker that binds to get_engine() when the first session is made"""
+
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None:
+            self.configure(bind=get_engine())
+        return super().__call__(**local_kw)
+
+
+SessionLocal = _LazySessionmaker(autocommit=False, autoflush=False)
+
+
+def get_async_engine():
+    """Async engine for the API"""
+    global _async_engine
+    if _async_engine is None:
+        with _lock:
+            if _async_engine is None:
+                from sqlalchemy.ext.asyncio import create_async_engine
+                from app.database.instrumentation import install_query_logging
+
+                url = get_database_url()
+                _async_engine = create_async_engine(
+                    async_database_url(url), pool_pre_ping=True, echo=SQL_ECHO, **_pool_kwargs(url)
+                )
+                install_query_logging(_async_engine.sync_engine)
+    return _async_engine
+
+
+def get_async_session_factory():
+    global _async_session_factory
+    if _async_session_factory is None:
+        from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+        _async_session_factory = async_sessionmaker(
+            get_async_engine(), class_=AsyncSession, autoflush=False, expire_on_commit=False
+        )
+    return _async_session_factory
+
+
+async def dispose_async_engine() -> None:
+    global _async_engine, _async_session_factory
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = _async_session_factory = None
+
+
+def reset_engines_after_fork() -> None:
+    """
+    Drop connections inherited from a parent process (e.g. a preloading
+    gunicorn master) so each worker opens its own.
+    """
+    global _async_engine, _async_session_factory
+    if _engine is not None:
+        _engine.dispose(close=False)
+    # The async engine is bound to the parent's event loop; rebuild it lazily
+    _async_engine = _async_session_factory = None
+
+
+def __getattr__(name: str):
+    # `from app.database.database import engine` keeps working, lazily
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def get_db():
@@ -24,3 +155,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with get_async_session_factory()() as db:
+        yield db
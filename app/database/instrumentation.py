@@ -0,0 +1,74 @@
+"""
+Slow-query logging and connection-pool metrics for SQLAlchemy engines.
+"""
+import logging
+import os
+import time
+from typing import Dict
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.utils.metrics import DB_ROUND_TRIPS, current_operation
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "500"))
+
+_pool_stats: Dict[str, Dict[str, int]] = {}
+
+
+def _engine_name(engine: Engine) -> str:
+    return engine.url.get_backend_name() + ("+async" if engine.dialect.is_async else "")
+
+
+def install_query_logging(engine: Engine, slow_query_ms: float = SLOW_QUERY_MS) -> None:
+    """Log statements slower than slow_query_ms and count pool checkouts/saturation"""
+    name = _engine_name(engine)
+    stats = _pool_stats.setdefault(name, {"checkouts": 0, "saturated_checkouts": 0, "slow_queries": 0})
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = 1000 * (time.perf_counter() - conn.info["query_started"].pop())
+        DB_ROUND_TRIPS.labels(operation=current_operation()).inc()
+        if elapsed_ms >= slow_query_ms:
+            stats["slow_queries"] += 1
+            logger.warning(f"Slow query ({elapsed_ms:.0f} ms): {statement[:500]}")
+
+    @event.listens_for(engine, "checkout")
+    def checkout(dbapi_connection, connection_record, connection_proxy):
+        stats["checkouts"] += 1
+        status = pool_status(engine)
+        if status["capacity"] and status["checked_out"] >= status["capacity"]:
+            stats["saturated_checkouts"] += 1
+            logger.warning(f"{name} connection pool saturated: {status}")
+
+
+def pool_status(engine: Engine) -> dict:
+    """Current pool occupancy; capacity is 0 for pools without a fixed size"""
+    pool = engine.pool
+    size = pool.size() if hasattr(pool, "size") else 0
+    max_overflow = getattr(pool, "_max_overflow", 0)
+    checked_out = pool.checkedout() if hasattr(pool, "checkedout") else 0
+    capacity = size + max(max_overflow, 0) if hasattr(pool, "checkedout") else 0
+    return {
+        "size": size,
+        "checked_out": checked_out,
+        "checked_in": pool.checkedin() if hasattr(pool, "checkedin") else 0,
+        "overflow": pool.overflow() if hasattr(pool, "overflow") else 0,
+        "capacity": capacity,
+        "utilization": checked_out / capacity if capacity else 0.0,
+    }
+
+
+def pool_metrics(*engines: Engine) -> dict:
+    """Pool status and event counters for the given engines"""
+    metrics = {}
+    for engine in engines:
+        name = _engine_name(engine)
+        metrics[name] = {**pool_status(engine), **_pool_stats.get(name, {})}
+    return metrics
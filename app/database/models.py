@@ -8,8 +8,9 @@ from sqlalchemy import (
     Enum,
     ForeignKey,
     TypeDecorator,
+    UniqueConstraint,
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import declared_attr, relationship
 from datetime import datetime
 from enum import Enum as PyEnum
 
@@ -18,12 +19,15 @@ from app.database.database import Base
 
 class StringEnum(TypeDecorator):
     impl = String
+    cache_ok = True
 
     def __init__(self, enumclass, *args, **kwargs):
         self._enumclass = enumclass
         super().__init__(*args, **kwargs)
 
     def process_bind_param(self, value, dialect):
+        if isinstance(value, str):
+            value = self._enumclass(value)
         return value.value if value else None
 
     def process_result_value(self, value, dialect):
@@ -49,6 +53,25 @@ class BaseForecast(Base):
 
     __abstract__ = True
 
+    # Natural key used by bulk upserts: one forecast per time/market/region/model
+    NATURAL_KEY = ("forecast_time", "market_type", "region", "source")
+
+    # Concrete subclasses name their value columns via predicted_column,
+    # actual_column and error_column so callers can address them generically.
+
+    @declared_attr
+    def __table_args__(cls):
+        return (
+            UniqueConstraint(*cls.NATURAL_KEY, name=f"uq_{cls.__tablename__}_natural_key"),
+            # Serves the service's market/region filters ordered by forecast_time
+            Index(
+                f"ix_{cls.__tablename__}_market_region_time",
+                "market_type",
+                "region",
+                "forecast_time",
+            ),
+        )
+
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     timestamp = Column(
         DateTime, index=True, default=datetime.utcnow, nullable=False
@@ -66,6 +89,9 @@ class DemandForecast(BaseForecast):
     """Forecasted & Actual Demand in MW"""
 
     __tablename__ = "demand_forecasts"
+    predicted_column = "predicted_demand_mw"
+    actual_column = "actual_demand_mw"
+    error_column = "demand_error"
 
     predicted_demand_mw = Column(Float, nullable=False)
     actual_demand_mw = Column(Float, nullable=True)
@@ -82,6 +108,9 @@ class PriceForecast(BaseForecast):
     """Forecasted & Actual Market Prices in €/MWh"""
 
     __tablename__ = "price_forecasts"
+    predicted_column = "predicted_price"
+    actual_column = "actual_price"
+    error_column = "price_error"
 
     predicted_price = Column(Float, nullable=False)
     actual_price = Column(Float, nullable=True)
@@ -96,6 +125,9 @@ class GenerationForecast(BaseForecast):
     """Forecasted & Actual Generation in MW"""
 
     __tablename__ = "generation_forecasts"
+    predicted_column = "predicted_generation_mw"
+    actual_column = "actual_generation_mw"
+    error_column = "generation_error"
 
     predicted_generation_mw = Column(Float, nullable=False)
     actual_generation_mw = Column(Float, nullable=True)
@@ -112,6 +144,9 @@ class ImbalanceForecast(BaseForecast):
     """Forecasted & Actual Imbalance in MW"""
 
     __tablename__ = "imbalance_forecasts"
+    predicted_column = "predicted_imbalance_mw"
+    actual_column = "actual_imbalance_mw"
+    error_column = "imbalance_error"
 
     predicted_imbalance_mw = Column(Float, nullable=False)
     actual_imbalance_mw = Column(Float, nullable=True)
@@ -123,6 +158,14 @@ class ImbalanceForecast(BaseForecast):
         return f"<ImbalanceForecast {self.forecast_time}: {self.predicted_imbalance_mw} MW>"
 
 
+FORECAST_MODELS = {
+    ForecastTypeEnum.DEMAND: DemandForecast,
+    ForecastTypeEnum.PRICE: PriceForecast,
+    ForecastTypeEnum.GENERATION: GenerationForecast,
+    ForecastTypeEnum.IMBALANCE: ImbalanceForecast,
+}
+
+
 ### FORECAST EVALUATION METRICS ###
 class ForecastEvaluation(Base):
     """
@@ -131,19 +174,28 @@ class ForecastEvaluation(Base):
     """
 
     __tablename__ = "forecast_evaluations"
+
+    # One windowed evaluation per model/market window, so re-evaluating updates in place
+    WINDOW_KEY = ("forecast_type", "model_name", "market_type", "forecast_time", "window_end")
+
     __table_args__ = (
         Index("idx_forecast_time_type", "forecast_time", "forecast_type"),
+        UniqueConstraint(*WINDOW_KEY, name="uq_forecast_evaluations_window"),
     )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     forecast_type = Column(Enum(ForecastTypeEnum), nullable=False)
     model_name = Column(String, nullable=False)
-    forecast_time = Column(DateTime, nullable=False)
+    market_type = Column(StringEnum(MarketTypeEnum), nullable=True)
+    forecast_time = Column(DateTime, nullable=False)  # Start of the evaluation window
+    window_end = Column(DateTime, nullable=True)  # Exclusive end of the window
+    sample_count = Column(Integer, nullable=True)  # Forecasts aggregated
     actual_value = Column(Float, nullable=False)
     forecast_value = Column(Float, nullable=False)
     error = Column(Float, nullable=False)
     mae = Column(Float, nullable=False)
     rmse = Column(Float, nullable=False)
+    mape = Column(Float, nullable=True)  # Percent; null if all actuals were zero
     forecast_history = relationship(
         "ForecastHistory",
         back_populates="forecast_evaluation",
@@ -0,0 +1,248 @@
+"""
+Monthly range partitioning of forecast tables on forecast_time (Postgres only).
+
+Partitioning is opt-in: migration 0004 converts the tables listed in
+FORECAST_PARTITIONED_TABLES when FORECAST_PARTITIONING is enabled. After that
+this module's CLI keeps partitions ahead of incoming forecasts and detaches
+old months so they can be archived or dropped without touching live data:
+
+    python -m app.database.partitions create --months-ahead 3
+    python -m app.database.partitions detach --retain-months 36
+
+Forecasts for a month without a partition land in the DEFAULT partition,
+and Postgres then refuses CREATE ... PARTITION OF for that month ("updated
+partition constraint for default partition would be violated"). `create`
+handles this by moving those rows into a new table and attaching it as
+the month's partition, in the same transaction.
+"""
+import argparse
+import logging
+import os
+import re
+from datetime import date
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+DEFAULT_PARTITIONED_TABLES = "demand_forecasts,price_forecasts"
+PARTITION_SUFFIX = re.compile(r"_y(\d{4})m(\d{2})$")
+
+
+def partitioning_enabled() -> bool:
+    return os.getenv("FORECAST_PARTITIONING", "false").lower() in ("1", "true", "yes")
+
+
+def partitioned_tables() -> List[str]:
+    tables = os.getenv("FORECAST_PARTITIONED_TABLES", DEFAULT_PARTITIONED_TABLES)
+    return [t.strip() for t in tables.split(",") if t.strip()]
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(day: date, months: int) -> date:
+    month_index = day.year * 12 + day.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_y{month.year:04d}m{month.month:02d}"
+
+
+def is_partitioned(conn: Connection, table: str) -> bool:
+    return bool(
+        conn.execute(
+            text(
+                "SELECT 1 FROM pg_partitioned_table p "
+                "JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = :table"
+            ),
+            {"table": table},
+        ).scalar()
+    )
+
+
+def list_partitions(conn: Connection, table: str) -> List[str]:
+    rows = conn.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits i "
+            "JOIN pg_class parent ON parent.oid = i.inhparent "
+            "JOIN pg_class child ON child.oid = i.inhrelid "
+            "WHERE parent.relname = :table ORDER BY child.relname"
+        ),
+        {"table": table},
+    )
+    return [row[0] for row in rows]
+
+
+def default_partition_name(table: str) -> str:
+    return f"{table}_default"
+
+
+def _exists(conn: Connection, relation: str) -> bool:
+    return conn.execute(text("SELECT to_regclass(:relation)"), {"relation": relation}).scalar() is not None
+
+
+def create_month_partition(conn: Connection, table: str, month: date) -> str:
+    """
+    Create the month's partition. Rows for the month already in the DEFAULT
+    partition are moved into it (the caller's transaction covers the move).
+    """
+    name = partition_name(table, month)
+    bounds = f"FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    if _exists(conn, name):
+        return name
+
+    default = default_partition_name(table)
+    in_range = "forecast_time >= :start AND forecast_time < :end"
+    params = {"start": month, "end": add_months(month, 1)}
+    stranded = _exists(conn, default) and conn.execute(
+        text(f"SELECT EXISTS (SELECT 1 FROM {default} WHERE {in_range})"), params
+    ).scalar()
+    if not stranded:
+        conn.execute(text(f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES {bounds}"))
+        return name
+
+    # Attaching checks the default partition holds no rows for the range,
+    # so they leave it first; matching indexes are created on attach
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS)"))
+    moved = conn.execute(
+        text(
+            f"WITH moved AS (DELETE FROM {default} WHERE {in_range} RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        ),
+        params,
+    ).rowcount
+    conn.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES {bounds}"))
+    logger.info(f"Moved {moved} rows from {default} into new partition {name}")
+    return name
+
+
+def create_partitions(
+    conn: Connection, table: str, start: date, months_ahead: int
+) -> List[str]:
+    """Ensure monthly partitions exist from `start`'s month to `months_ahead` after today"""
+    month = month_start(start)
+    last = add_months(month_start(date.today()), months_ahead)
+    created = []
+    while month <= last:
+        created.append(create_month_partition(conn, table, month))
+        month = add_months(month, 1)
+    return created
+
+
+def detach_partitions(conn: Connection, table: str, retain_months: int) -> List[str]:
+    """Detach monthly partitions that end before the retention window"""
+    cutoff = add_months(month_start(date.today()), -retain_months)
+    detached = []
+    for name in list_partitions(conn, table):
+        match = PARTITION_SUFFIX.search(name)
+        if not match:
+            continue  # default partition
+        month = date(int(match.group(1)), int(match.group(2)), 1)
+        if month < cutoff:
+            conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            detached.append(name)
+    return detached
+
+
+def convert_to_partitioned(
+    conn: Connection, table: str, months_ahead: int = 3
+) -> None:
+    """
+    Rebuild a plain forecast table as a monthly range-partitioned table.
+
+    Postgres requires the partition key in every unique constraint, so the
+    primary key becomes (id, forecast_time); the natural key already
+    includes forecast_time. Existing rows are copied across and the id
+    sequence is kept.
+    """
+    if is_partitioned(conn, table):
+        logger.info(f"{table} is already partitioned")
+        return
+
+    old = f"{table}_unpartitioned"
+    sequence = conn.execute(
+        text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": table}
+    ).scalar()
+
+    conn.execute(text(f"ALTER TABLE {table} RENAME TO {old}"))
+    conn.execute(
+        text(
+            f"CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS) "
+            "PARTITION BY RANGE (forecast_time)"
+        )
+    )
+    if sequence:
+        conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id"))
+
+    first = conn.execute(text(f"SELECT MIN(forecast_time) FROM {old}")).scalar()
+    create_partitions(conn, table, first.date() if first else date.today(), months_ahead)
+    default = default_partition_name(table)
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {default} PARTITION OF {table} DEFAULT"))
+
+    conn.execute(text(f"INSERT INTO {table} SELECT * FROM {old}"))
+    conn.execute(text(f"DROP TABLE {old}"))
+
+    conn.execute(text(f"ALTER TABLE {table} ADD PRIMARY KEY (id, forecast_time)"))
+    conn.execute(
+        text(
+            f"ALTER TABLE {table} ADD CONSTRAINT uq_{table}_natural_key "
+            "UNIQUE (forecast_time, market_type, region, source)"
+        )
+    )
+    for column in ("id", "timestamp", "forecast_time"):
+        conn.execute(text(f"CREATE INDEX ix_{table}_{column} ON {table} ({column})"))
+    conn.execute(
+        text(
+            f"CREATE INDEX ix_{table}_market_region_time "
+            f"ON {table} (market_type, region, forecast_time)"
+        )
+    )
+    logger.info(f"Converted {table} to monthly partitions")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    create_parser = subparsers.add_parser(
+        "create",
+        help="Pre-create future monthly partitions, moving in any of their rows from the default partition",
+    )
+    create_parser.add_argument("--months-ahead", type=int, default=3)
+
+    detach_parser = subparsers.add_parser("detach", help="Detach partitions past retention")
+    detach_parser.add_argument("--retain-months", type=int, default=36)
+
+    parser.add_argument(
+        "--tables", default=None, help="Comma-separated tables (default: FORECAST_PARTITIONED_TABLES)"
+    )
+    args = parser.parse_args(argv)
+
+    from app.database.database import get_engine
+
+    engine = get_engine()
+    tables = args.tables.split(",") if args.tables else partitioned_tables()
+    with engine.begin() as conn:
+        for table in tables:
+            if not is_partitioned(conn, table):
+                logger.warning(f"Skipping {table}: not a partitioned table")
+                continue
+            if args.command == "create":
+                names = create_partitions(conn, table, date.today(), args.months_ahead)
+                logger.info(f"{table}: ensured partitions {', '.join(names)}")
+            else:
+                names = detach_partitions(conn, table, args.retain_months)
+                logger.info(f"{table}: detached {len(names)} partitions {', '.join(names)}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
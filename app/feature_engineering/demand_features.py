@@ -1,44 +1,30 @@
-import boto3
-import os
-import json
+import logging
 import pandas as pd
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timedelta
+from typing import Optional
 
-def generate_features_for_next_24h():
-    """Read today's data from S3 and generate time-based features"""
+from app.feature_engineering.engine import build_features, horizon_index, load_history
 
-    s3 = boto3.client("s3")
-    bucket_name = os.environ["S3_BUCKET_NAME"]
-    prefix = "raw/"
+logger = logging.getLogger(__name__)
 
-    today_str = datetime.now(timezone.utc).strftime("%Y%m%d")
+# Enough history for the longest lag and rolling window
+HISTORY_DAYS = 9
 
-    response = s3.list_objects_v2(Bucket=bucket_name, Prefix=prefix)
 
-    timestamps = []
+def generate_features(now: Optional[datetime] = None, hours: int = 24, freq: str = "h") -> pd.DataFrame:
+    """Build the registered features for the next `hours` from stored EirGrid history"""
+    now = now or datetime.utcnow()
+    index = horizon_index(now, hours=hours, freq=freq)
 
-    for obj in response.get("Contents", []):
-        key = obj["Key"]
-        if today_str not in key or not key.endswith(".json"):
-            continue
+    # Wind forecasts run past now, so read through the end of the horizon
+    try:
+        history = load_history(index[0] - timedelta(days=HISTORY_DAYS), index[-1] + timedelta(hours=1))
+    except Exception as e:
+        logger.warning(f"Could not load history, lag features will be empty: {e}")
+        history = None
 
-        file_obj = s3.get_object(Bucket=bucket_name, Key=key)
-        raw_json = json.loads(file_obj["Body"].read())
+    return build_features(history, index)
 
-        for record in raw_json.values():
-            timestamp = datetime.now(timezone.utc)
-            timestamps.append(timestamp)
 
-    if not timestamps:
-        now = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
-        timestamps = [now + timedelta(hours=i) for i in range(24)]
-
-    df = pd.DataFrame(
-        {
-            "hour": [t.hour for t in timestamps],
-            "day_of_week": [t.weekday() for t in timestamps],
-            "is_weekend": [t.weekday() >= 5 for t in timestamps],
-        }
-    )
-
-    return df
+def generate_features_for_next_24h(now: Optional[datetime] = None, freq: str = "h") -> pd.DataFrame:
+    return generate_features(now, hours=24, freq=freq)
@@ -0,0 +1,334 @@
+"""
+Declarative, vectorized feature engine shared by training and inference.
+
+Features are registered with @register_feature and computed column-wise
+over a regular 15-minute grid that covers the requested timestamps plus
+enough history for the longest lag, so a year of features is a handful of
+NumPy/pandas array operations rather than a Python loop per timestamp.
+
+Lags and rolling statistics only look back at least MIN_LAG_PERIODS (one
+day), so every feature is available at each step of a day-ahead horizon
+and training rows are built exactly like inference rows:
+
+    history = load_history(start, end)
+    train = build_features(history, history.index)
+    live = build_features(history, horizon_index(datetime.utcnow(), hours=24))
+"""
+import logging
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+FREQ = "15min"
+PERIODS_PER_DAY = 96
+PERIODS_PER_WEEK = 7 * PERIODS_PER_DAY
+
+# Day-ahead: nothing may look closer than one day back
+MIN_LAG_PERIODS = PERIODS_PER_DAY
+LAG_PERIODS = {"1d": PERIODS_PER_DAY, "2d": 2 * PERIODS_PER_DAY, "7d": PERIODS_PER_WEEK}
+ROLLING_WINDOWS = {"4h": 16, "24h": PERIODS_PER_DAY, "7d": PERIODS_PER_WEEK}
+# name -> (period in 15-minute steps, number of harmonics)
+FOURIER_TERMS = {
+    "daily": (PERIODS_PER_DAY, 3),
+    "weekly": (PERIODS_PER_WEEK, 2),
+    "yearly": (365.25 * PERIODS_PER_DAY, 2),
+}
+HEATING_BASE_TEMPERATURE = 15.5
+
+# Raw EirGrid series used as inputs, as named in the Parquet store
+HISTORY_SERIES = ("demand", "wind_actual", "wind_forecast")
+
+
+@dataclass(frozen=True)
+class FeatureSpec:
+    name: str
+    func: Callable[[pd.DatetimeIndex, pd.DataFrame], Dict[str, np.ndarray]]
+    requires: Tuple[str, ...] = ()
+    # Every input is read at least MIN_LAG_PERIODS back, so it is safe to use
+    # when one of `requires` is also the forecast target
+    lagged: bool = False
+
+
+FEATURE_REGISTRY: Dict[str, FeatureSpec] = {}
+
+
+def register_feature(name: str, requires: Sequence[str] = (), lagged: bool = False):
+    """
+    Register a feature group.
+
+    The function receives the 15-minute grid and the input series aligned
+    to it (missing inputs are all-NaN columns, so the output columns never
+    depend on what data happened to be available) and returns a dict of
+    column name -> array of len(grid).
+    """
+
+    def decorator(func):
+        FEATURE_REGISTRY[name] = FeatureSpec(name, func, tuple(requires), lagged)
+        return func
+
+    return decorator
+
+
+def _shift(values: np.ndarray, periods: int) -> np.ndarray:
+    shifted = np.full(len(values), np.nan)
+    if periods < len(values):
+        shifted[periods:] = values[: len(values) - periods]
+    return shifted
+
+
+@register_feature("calendar")
+def calendar_features(grid: pd.DatetimeIndex, series: pd.DataFrame) -> Dict[str, np.ndarray]:
+    day_of_week = grid.dayofweek.to_numpy()
+    days = grid.values.astype("datetime64[D]")
+    return {
+        "hour": grid.hour.to_numpy(),
+        "period_of_day": (grid.hour.to_numpy() * 4 + grid.minute.to_numpy() // 15),
+        "day_of_week": day_of_week,
+        "month": grid.month.to_numpy(),
+        "day_of_year": grid.dayofyear.to_numpy(),
+        "is_weekend": day_of_week >= 5,
+        "is_holiday": np.isin(days, irish_holidays(range(grid.year.min(), grid.year.max() + 1))),
+    }
+
+
+@register_feature("fourier")
+def fourier_features(grid: pd.DatetimeIndex, series: pd.DataFrame) -> Dict[str, np.ndarray]:
+    # Periods since the epoch, so the phase is the same whatever the grid start
+    t = grid.asi8 / (15 * 60 * 1e9)
+    columns = {}
+    for name, (period, harmonics) in FOURIER_TERMS.items():
+        k = np.arange(1, harmonics + 1)
+        angles = 2 * np.pi * np.outer(t, k) / period
+        sines, cosines = np.sin(angles), np.cos(angles)
+        for i in range(harmonics):
+            columns[f"{name}_sin_{i + 1}"] = sines[:, i]
+            columns[f"{name}_cos_{i + 1}"] = cosines[:, i]
+    return columns
+
+
+@register_feature("demand_lags", requires=("demand",), lagged=True)
+def demand_lag_features(grid: pd.DatetimeIndex, series: pd.DataFrame) -> Dict[str, np.ndarray]:
+    demand = series["demand"].to_numpy(dtype=np.float64)
+    return {f"demand_lag_{name}": _shift(demand, periods) for name, periods in LAG_PERIODS.items()}
+
+
+@register_feature("demand_rolling", requires=("demand",), lagged=True)
+def demand_rolling_features(grid: pd.DatetimeIndex, series: pd.DataFrame) -> Dict[str, np.ndarray]:
+    # Windows end MIN_LAG_PERIODS back so they are known a day ahead
+    shifted = pd.Series(_shift(series["demand"].to_numpy(dtype=np.float64), MIN_LAG_PERIODS))
+    columns = {}
+    for name, window in ROLLING_WINDOWS.items():
+        rolling = shifted.rolling(window, min_periods=max(1, window // 2))
+        columns[f"demand_mean_{name}"] = rolling.mean().to_numpy()
+        columns[f"demand_std_{name}"] = rolling.std().to_numpy()
+    return columns
+
+
+@register_feature("wind", requires=("wind_actual", "wind_forecast"))
+def wind_features(grid: pd.DatetimeIndex, series: pd.DataFrame) -> Dict[str, np.ndarray]:
+    # The forecast covers the horizon; actuals fill the history it lacks
+    forecast = series["wind_forecast"].to_numpy(dtype=np.float64)
+    wind = np.where(np.isnan(forecast), series["wind_actual"].to_numpy(dtype=np.float64), forecast)
+    return {
+        "wind_mw": wind,
+        "wind_mean_24h": pd.Series(wind).rolling(PERIODS_PER_DAY, min_periods=1).mean().to_numpy(),
+    }
+
+
+@register_feature("temperature", requires=("temperature",))
+def temperature_features(grid: pd.DatetimeIndex, series: pd.DataFrame) -> Dict[str, np.ndarray]:
+    temperature = series["temperature"].to_numpy(dtype=np.float64)
+    return {
+        "temperature": temperature,
+        "heating_degrees": np.maximum(HEATING_BASE_TEMPERATURE - temperature, 0.0),
+    }
+
+
+# Nothing loads temperature yet (it isn't in HISTORY_SERIES), so by default
+# the group would only add NaN columns; request it explicitly where supplied
+DEFAULT_FEATURES = tuple(name for name in FEATURE_REGISTRY if name != "temperature")
+
+# The feature set before this engine; artifacts trained on it expect exactly these
+LEGACY_FEATURES = ("hour", "day_of_week", "is_weekend")
+
+
+def model_columns(model, features: pd.DataFrame) -> pd.DataFrame:
+    """
+    The columns of `features` that `model` was trained on, in training order.
+
+    Models fitted on a DataFrame record them in feature_names_in_; one fitted
+    on a bare array of len(LEGACY_FEATURES) columns predates the engine.
+    Anything else (e.g. baselines, which only read the index) gets the frame
+    unchanged.
+    """
+    names = getattr(model, "feature_names_in_", None)
+    if names is not None:
+        return features[list(names)]
+    if getattr(model, "n_features_in_", None) == len(LEGACY_FEATURES):
+        return features[list(LEGACY_FEATURES)]
+    return features
+
+
+def _easter_sunday(year: int) -> date:
+    """Gregorian Easter (anonymous Gregorian algorithm)"""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = divmod(b, 4)
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 19 * l) // 433
+    month = (h + l - 7 * m + 90) // 25
+    return date(year, month, (h + l - 7 * m + 33 * month + 19) % 32)
+
+
+def _first_monday(year: int, month: int) -> date:
+    first = date(year, month, 1)
+    return first + timedelta(days=(7 - first.weekday()) % 7)
+
+
+def _last_monday(year: int, month: int) -> date:
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=last.weekday())
+
+
+def irish_holidays(years: Iterable[int]) -> np.ndarray:
+    """
+    Public holidays in Ireland as datetime64[D], including the following
+    weekday when a fixed-date holiday falls on a weekend.
+    """
+    holidays = set()
+    for year in years:
+        fixed = [date(year, 1, 1), date(year, 3, 17), date(year, 12, 25), date(year, 12, 26)]
+        moving = [
+            _easter_sunday(year) + timedelta(days=1),
+            _first_monday(year, 5),
+            _first_monday(year, 6),
+            _first_monday(year, 8),
+            _last_monday(year, 10),
+        ]
+        if year >= 2023:
+            # St Brigid's Day: 1 February if a Friday, else the first Monday
+            february_first = date(year, 2, 1)
+            moving.append(february_first if february_first.weekday() == 4 else _first_monday(year, 2))
+
+        holidays.update(fixed + moving)
+        for day in fixed:
+            if day.weekday() >= 5:
+                substitute = day + timedelta(days=7 - day.weekday())
+                while substitute in holidays:
+                    substitute += timedelta(days=1)
+                holidays.add(substitute)
+    return np.array(sorted(holidays), dtype="datetime64[D]")
+
+
+def horizon_index(start: datetime, hours: int = 24, freq: str = "h") -> pd.DatetimeIndex:
+    """Timestamps for the next `hours` from the first full step after start"""
+    first = pd.Timestamp(start).ceil(freq)
+    end = first + pd.Timedelta(hours=hours)
+    return pd.date_range(first, end, freq=freq, inclusive="left", name="effective_time")
+
+
+def _lookback() -> pd.Timedelta:
+    periods = max(max(LAG_PERIODS.values()), MIN_LAG_PERIODS + max(ROLLING_WINDOWS.values()))
+    return pd.Timedelta(FREQ) * periods
+
+
+def _align(history: Optional[pd.DataFrame], grid: pd.DatetimeIndex, required: Sequence[str]) -> pd.DataFrame:
+    """Resample inputs to the grid, filling only short interior gaps"""
+    if history is None or history.empty:
+        aligned = pd.DataFrame(index=grid)
+    else:
+        aligned = (
+            history.resample(FREQ).mean()
+            .interpolate(limit=3, limit_area="inside")
+            .reindex(grid)
+        )
+    for column in required:
+        if column not in aligned:
+            aligned[column] = np.nan
+    return aligned
+
+
+def build_features(
+    history: Optional[pd.DataFrame],
+    index: pd.DatetimeIndex,
+    features: Sequence[str] = DEFAULT_FEATURES,
+) -> pd.DataFrame:
+    """
+    Build the registered feature groups for each timestamp in `index`.
+
+    `history` is a time-indexed frame of input series (demand, wind_actual,
+    wind_forecast, temperature, ...) at any resolution; weather and wind
+    forecasts may extend past the last actual into the horizon. Returns one
+    row per timestamp in `index` (floored to 15 minutes for alignment).
+    """
+    index = pd.DatetimeIndex(index)
+    if index.empty:
+        raise ValueError("Cannot build features for an empty index")
+    specs = [FEATURE_REGISTRY[name] for name in features]
+
+    aligned_index = index.floor(FREQ)
+    grid = pd.date_range(aligned_index.min() - _lookback(), aligned_index.max(), freq=FREQ)
+    required = sorted({column for spec in specs for column in spec.requires})
+    series = _align(history, grid, required)
+
+    columns: Dict[str, np.ndarray] = {}
+    for spec in specs:
+        columns.update(spec.func(grid, series))
+
+    positions = grid.get_indexer(aligned_index)
+    return pd.DataFrame(
+        {name: np.asarray(values)[positions] for name, values in columns.items()},
+        index=index.rename("effective_time"),
+    )
+
+
+def load_history(
+    start: datetime,
+    end: datetime,
+    region: str = "ALL",
+    series: Sequence[str] = HISTORY_SERIES,
+    base_uri: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    Wide frame of EirGrid series for [start, end).
+
+    Served from the in-memory time-series store when it holds the range and
+    is fresh; otherwise read from the Parquet store and written back into it.
+    """
+    from app.data_sources.timeseries_store import get_store
+
+    store = get_store() if base_uri is None and region == "ALL" else None
+    if store is not None and store.covers(series, start):
+        return store.frame(series, start, end).dropna(how="all")
+
+    import pyarrow.dataset as ds
+    from app.data_sources.parquet_store import EIRGRID_DATASET, PARQUET_BASE_URI, read_frame
+
+    raw = read_frame(
+        EIRGRID_DATASET,
+        start=start,
+        end=end,
+        columns=["effective_time", "series", "value", "collected_at"],
+        filter=ds.field("series").isin(list(series)) & (ds.field("region") == region),
+        base_uri=base_uri or PARQUET_BASE_URI,
+    )
+    if raw.empty:
+        return pd.DataFrame(columns=list(series), index=pd.DatetimeIndex([], name="effective_time"))
+
+    # Latest scrape wins when the same reading was collected more than once
+    raw = raw.sort_values("collected_at", kind="stable")
+    wide = raw.pivot_table(
+        index="effective_time", columns="series", values="value", aggfunc="last", observed=True
+    )
+    wide.columns = wide.columns.astype(str)
+    wide = wide.reindex(columns=list(series))
+    if store is not None:
+        store.append_frame(wide)
+    return wide
@@ -1,9 +1,7 @@
 import logging
-import json
-from app.feature_engineering.demand_features import generate_features_for_next_24h
-import boto3
 import os
 import sys
+import time
 
 current_dir = os.path.dirname(
     os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -17,23 +15,23 @@ logger.setLevel(logging.INFO)
 
 
 def handler(event=None, context=None):
-    logger.info("Running feature generation Lambda...")
-
+    started = time.perf_counter()
     try:
-        features_df = generate_features_for_next_24h()
+        # pandas/pyarrow load on the first invocation, not during init
+        from app.data_sources.parquet_store import FEATURES_DATASET, PARQUET_BASE_URI, write_frame
+        from app.feature_engineering.demand_features import generate_features_for_next_24h
+        from app.utils.metrics import log_event
 
-        s3 = boto3.client("s3")
-        bucket_name = os.environ["BUCKET_NAME"]
-
-        for idx, row in features_df.iterrows():
-            feature_data = row.to_dict()
-            timestamp = feature_data["timestamp"]
+        features_df = generate_features_for_next_24h()
 
-            s3.put_object(
-                Bucket=bucket_name,
-                Key=f"features/{timestamp}.json",
-                Body=json.dumps(feature_data),
-            )
+        # One Parquet file per run under <PARQUET_BASE_URI>/features/yyyy=/mm=/dd=/
+        written = write_frame(features_df.reset_index(), FEATURES_DATASET)
+        log_event(
+            "features.invocation",
+            rows=written,
+            dataset=f"{PARQUET_BASE_URI}/{FEATURES_DATASET}",
+            seconds=round(time.perf_counter() - started, 3),
+        )
 
         return {"statusCode": 200, "body": "Feature generation completed successfully."}
 
@@ -2,15 +2,22 @@ import json
 import boto3
 import os
 
+# Created once per container and reused across warm invocations
+lambda_client = boto3.client("lambda")
 
-def handler(event, context):
-    lambda_client = boto3.client("lambda")
 
+def handler(event, context):
     try:
         response = lambda_client.invoke(
             FunctionName=os.environ["FEATURE_FUNCTION_ARN"],
             InvocationType="Event",
         )
+        # Optionally kick off a forecast cycle on the same schedule
+        if os.getenv("FORECAST_FUNCTION_ARN"):
+            lambda_client.invoke(
+                FunctionName=os.environ["FORECAST_FUNCTION_ARN"],
+                InvocationType="Event",
+            )
 
         return {
             "statusCode": 200,
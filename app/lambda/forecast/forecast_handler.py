@@ -0,0 +1,56 @@
+import logging
+import os
+from dataclasses import asdict
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Lambda has no /dev/shm, so the cycle runs in-process unless overridden
+FORECAST_LAMBDA_WORKERS = int(os.getenv("FORECAST_LAMBDA_WORKERS", "1"))
+
+# Reused across warm invocations; the engine's pool keeps the connection open
+_session = None
+
+
+def get_session():
+    global _session
+    if _session is None:
+        from app.database.database import SessionLocal
+
+        _session = SessionLocal()
+    return _session
+
+
+def handler(event=None, context=None):
+    try:
+        from app.services.forecasting import (FORECAST_MARKETS, FORECAST_REGIONS,
+                                              FORECAST_TYPES, plan_jobs,
+                                              run_forecast_cycle)
+        from app.utils.metrics import log_event
+
+        # A scheduled event may narrow the cycle, e.g. {"types": ["PRICE"], "markets": ["BM"]}
+        event = event or {}
+        jobs = plan_jobs(
+            event.get("types", FORECAST_TYPES),
+            event.get("markets", FORECAST_MARKETS),
+            event.get("regions", FORECAST_REGIONS),
+        )
+        db = get_session()
+        try:
+            report = run_forecast_cycle(db, jobs=jobs, workers=FORECAST_LAMBDA_WORKERS)
+        except Exception:
+            db.rollback()
+            raise
+
+        log_event(
+            "forecast.invocation",
+            jobs=len(report.models),
+            ok=sum(entry["status"] == "ok" for entry in report.models),
+            rows_written=report.rows_written,
+            seconds=round(report.total_seconds, 3),
+        )
+        return {"statusCode": 200, "body": asdict(report)}
+
+    except Exception as e:
+        logger.exception("Forecast cycle failed.")
+        return {"statusCode": 500, "body": f"Forecast cycle failed: {str(e)}"}
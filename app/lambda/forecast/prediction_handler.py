@@ -1,118 +1,119 @@
 import logging
-import json
-from datetime import datetime, timedelta
 import os
-from app.database.database import get_db
-from app.database.models import DemandForecast, MarketTypeEnum, ForecastTypeEnum
+import time
+import numpy as np
+from app.database.database import SessionLocal
+from app.database.models import MarketTypeEnum, ForecastTypeEnum
+from app.ml_models.inference.predict import PredictionService
+from app.utils.metrics import log_event
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-def fallback_prediction(features):
-    predictions = []
-    for feature in features:
-        hour = int(feature.get('hour', 0))
-        is_weekend = feature.get('is_weekend', False)
-        
-        base_load = 3500  
-        
-        # Time of day factors (just a somewhat calculated estimate)
-        if 0 <= hour < 5:  # Night (low demand)
-            time_factor = 0.7
-        elif 5 <= hour < 9:  # Morning ramp-up
-            time_factor = 0.9 + (hour - 5) * 0.1
-        elif 9 <= hour < 17:  # Daytime
-            time_factor = 1.2
-        elif 17 <= hour < 21:  # Evening peak
-            time_factor = 1.3
-        else:  # Late evening
-            time_factor = 1.0 - (hour - 21) * 0.1
-        
-        # Weekend adjustment
-        weekend_factor = 0.85 if is_weekend else 1.0
-        
-        # Calculate predicted demand
-        predicted_demand = base_load * time_factor * weekend_factor
-        
-        predictions.append(predicted_demand)
-    
-    return predictions
-
-def create_forecast(db, forecast_time, market_type, forecast_type, value):
-    """Create forecast using SQLAlchemy ORM"""
-    try:
-        if forecast_type == "DEMAND":
-            forecast = DemandForecast(
-                market_type=market_type,
-                forecast_time=forecast_time,
-                predicted_demand_mw=value
-            )
-            db.add(forecast)
-            db.commit()
-            return True
-    except Exception as e:
-        logger.error(f"Database error: {e}")
-        db.rollback()
-        return False
+# Hourly steps forecast per invocation
+FORECAST_HORIZON_HOURS = int(os.getenv("FORECAST_HORIZON_HOURS", "24"))
+# Regions written per step; each gets REGION_SHARES[region] of system demand
+FORECAST_REGIONS = [r.strip() for r in os.getenv("FORECAST_REGIONS", "ALL").split(",") if r.strip()]
+REGION_SHARES = {"ALL": 1.0, "ROI": 0.78, "NI": 0.22}
+REGION_SHARES.update(
+    {
+        region.strip(): float(share)
+        for region, share in (
+            item.split(":") for item in os.getenv("REGION_SHARES", "").split(",") if ":" in item
+        )
+    }
+)
 
-def handler(event=None, context=None):
-    logger.info("Running prediction Lambda...")
+BASE_LOAD_MW = 3500
+
+# Reused across warm invocations; the engine's pool keeps the connection open
+_session = None
+
+
+def get_session():
+    global _session
+    if _session is None:
+        _session = SessionLocal()
+    return _session
+
+
+def fallback_prediction(hour: np.ndarray, is_weekend: np.ndarray) -> np.ndarray:
+    """Rule-of-thumb demand (MW) for arrays of hour-of-day and weekend flags"""
+    hour = np.asarray(hour, dtype=np.float64)
+
+    # Time of day factors (just a somewhat calculated estimate)
+    time_factor = np.select(
+        [
+            hour < 5,  # Night (low demand)
+            hour < 9,  # Morning ramp-up
+            hour < 17,  # Daytime
+            hour < 21,  # Evening peak
+        ],
+        [0.7, 0.9 + (hour - 5) * 0.1, 1.2, 1.3],
+        default=1.0 - (hour - 21) * 0.1,  # Late evening
+    )
+
+    # Weekend adjustment
+    weekend_factor = np.where(np.asarray(is_weekend, dtype=bool), 0.85, 1.0)
+
+    return BASE_LOAD_MW * time_factor * weekend_factor
 
+
+def build_rows(timestamps, system_demand: np.ndarray, regions=FORECAST_REGIONS, source: str = "FALLBACK"):
+    """One (forecast_time, market, value, source, region) row per region and timestamp"""
+    shares = np.array([REGION_SHARES.get(region, 1.0) for region in regions])
+    values = np.rint(shares[:, None] * system_demand[None, :])
+    return [
+        (timestamp, MarketTypeEnum.DAM, value, source, region)
+        for region, region_values in zip(regions, values.tolist())
+        for timestamp, value in zip(timestamps, region_values)
+    ]
+
+
+def handler(event=None, context=None):
+    started = time.perf_counter()
     try:
-        # Generate features for next 24 hours
-        features = []
-        for i in range(24):
-            # Generate timestamps
-            timestamp = (datetime.now() + timedelta(hours=i))
-            timestamp_str = timestamp.strftime("%Y%m%d%H")
-            
-            hour = timestamp.hour
-            day_of_week = timestamp.weekday()
-            is_weekend = day_of_week >= 5
-            
-            feature_data = {
-                "timestamp": timestamp_str,
-                "hour": hour,
-                "day_of_week": day_of_week,
-                "is_weekend": is_weekend
-            }
-            features.append(feature_data)
-            logger.info(f"Created basic features for timestamp {timestamp_str}")
-
-        # Get db session
+        # pandas loads on the first invocation, not during init
+        from app.feature_engineering.demand_features import generate_features
+
+        # Same feature engine the models are trained on
+        features = generate_features(hours=FORECAST_HORIZON_HOURS)
+
+        # Fitted baseline when one is available, else the rule of thumb
+        from app.ml_models.baselines import load_baseline
+
+        baseline = load_baseline(ForecastTypeEnum.DEMAND)
+        if baseline is not None:
+            demand_predictions = baseline.predict(features)
+            source = "BASELINE"
+        else:
+            demand_predictions = fallback_prediction(
+                features["hour"].to_numpy(), features["is_weekend"].to_numpy()
+            )
+            source = "FALLBACK"
+        rows = build_rows(features.index.to_pydatetime(), demand_predictions, source=source)
+
+        saved_count = 0
+        db = get_session()
         try:
-            db = get_db()
-            logger.info("Connected to database successfully")
+            # One bulk upsert and one commit, however many steps and regions
+            saved_count = PredictionService(db).create_forecasts(ForecastTypeEnum.DEMAND, rows)
         except Exception as e:
-            logger.error(f"Database connection error: {e}")
-            db = None
+            log_event("prediction.db_error", level=logging.ERROR, error=str(e))
+            db.rollback()
 
-        logger.info(f"Making predictions for {len(features)} timestamps")
-        demand_predictions = fallback_prediction(features)
-        
-        saved_count = 0
-        for i, prediction in enumerate(demand_predictions):
-            feature_data = features[i]
-            timestamp_str = feature_data["timestamp"]
-            timestamp = datetime.strptime(timestamp_str, "%Y%m%d%H")
-            
-            # Round prediction to nearest whole number
-            prediction_value = round(float(prediction))
-            
-            logger.info(f"Prediction for {timestamp}: {prediction_value} MW")
-            
-            if db:
-                if create_forecast(
-                    db,
-                    forecast_time=timestamp,
-                    market_type=MarketTypeEnum.DAM,
-                    forecast_type=ForecastTypeEnum.DEMAND,
-                    value=prediction_value
-                ):
-                    saved_count += 1
+        # One structured line per invocation instead of free text per step
+        log_event(
+            "prediction.invocation",
+            timestamps=len(features),
+            source=source,
+            regions=len(FORECAST_REGIONS),
+            saved=saved_count,
+            seconds=round(time.perf_counter() - started, 3),
+        )
 
         return {
-            "statusCode": 200, 
+            "statusCode": 200,
             "body": f"Successfully predicted demand for {len(demand_predictions)} hours, saved {saved_count} to database"
         }
 
@@ -1,7 +1,58 @@
-from fastapi import FastAPI
-from app.api.routes.forecast import router as forecast_router
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
 
-app = FastAPI(title="Balancing Market API")
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+from app.api.routes.forecast import get_lambda_client, predict_batcher, router as forecast_router
+from app.data_sources.timeseries_store import get_store, save_snapshot
+from app.database.database import dispose_async_engine, get_async_engine
+from app.utils.cache import warn_if_not_shared
+from app.utils.metrics import MetricsMiddleware, render_metrics
+
+logger = logging.getLogger(__name__)
+
+READINESS_TIMEOUT_SECONDS = float(os.getenv("READINESS_TIMEOUT_SECONDS", "2"))
+# Models loaded before workers fork, comma-separated
+PRELOAD_MODELS = [m.strip() for m in os.getenv("PRELOAD_MODELS", "").split(",") if m.strip()]
+
+
+def preload():
+    """
+    Load models and build clients once, e.g. in the gunicorn master before
+    it forks, so workers share the memory copy-on-write.
+    """
+    from app.ml_models.config import DEFAULT_MODEL_NAME
+    from app.ml_models.registry import get_registry
+
+    get_registry().preload(*(PRELOAD_MODELS or [DEFAULT_MODEL_NAME]))
+    # Restores the time-series snapshot, if configured, once for all workers
+    get_store()
+    try:
+        get_lambda_client()
+    except Exception as e:
+        logger.warning(f"Could not create Lambda client: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warn_if_not_shared()
+    app.state.ready = True
+    yield
+    # Fail readiness first so the load balancer stops routing here while we drain
+    app.state.ready = False
+    await predict_batcher.stop()
+    await dispose_async_engine()
+    try:
+        save_snapshot()
+    except Exception as e:
+        logger.warning(f"Could not save time-series snapshot: {e}")
+
+
+app = FastAPI(title="Balancing Market API", lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(forecast_router, prefix="/api/forecast")
 
@@ -9,3 +60,22 @@ app.include_router(forecast_router, prefix="/api/forecast")
 @app.get("/")
 def health_check():
     return {"status": "Running", "message": "Balancing Market API is live"}
+
+
+@app.get("/ready")
+async def readiness_check():
+    """Ready to take traffic: started, not shutting down, and the database answers"""
+    if not getattr(app.state, "ready", False):
+        return JSONResponse({"status": "not ready", "reason": "starting or shutting down"}, status_code=503)
+    try:
+        async with get_async_engine().connect() as conn:
+            await asyncio.wait_for(conn.execute(text("SELECT 1")), READINESS_TIMEOUT_SECONDS)
+    except Exception as e:
+        return JSONResponse({"status": "not ready", "reason": f"database: {e}"}, status_code=503)
+    return {"status": "ready", "pid": os.getpid()}
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    body, content_type = render_metrics()
+    return Response(body, media_type=content_type)
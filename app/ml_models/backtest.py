@@ -0,0 +1,421 @@
+"""
+Rolling-origin backtests of forecast models over stored history.
+
+The feature frame for the whole period is built once, cached on disk
+between runs and placed in shared memory. It only uses what was known a
+day before each row:
+- Actuals that features read at the row's own time (wind_actual fills
+  gaps in the wind forecast) are delayed by MIN_LAG_PERIODS.
+- Feature groups that read the target series unlagged are dropped.
+
+Each fold then refits a fresh model on the rows before its origin and
+forecasts the next `horizon_hours`. Folds run in a process pool and only
+read the shared frame.
+
+Out-of-sample forecasts keep their lead time, so each market is scored on
+the leads it trades at (MARKET_HORIZON_HOURS: DAM 24h, IDM 8h, BM 2h) via
+compute_window_metrics, and can be stored as ForecastEvaluation rows:
+
+    python -m app.ml_models.backtest --start 2022-01-01 --end 2025-01-01 --model hgb --workers 8 --store
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.database.models import ForecastTypeEnum
+from app.feature_engineering.engine import (
+    DEFAULT_FEATURES,
+    FEATURE_REGISTRY,
+    FREQ,
+    MIN_LAG_PERIODS,
+    build_features,
+    load_history,
+)
+from app.ml_models.evaluation import WindowMetrics, compute_window_metrics
+from app.services.forecasting import MARKET_HORIZON_HOURS, SharedFeatures
+
+logger = logging.getLogger(__name__)
+
+BACKTEST_CACHE_DIR = os.getenv("BACKTEST_CACHE_DIR", os.path.join(tempfile.gettempdir(), "backtest_cache"))
+BACKTEST_WORKERS = int(os.getenv("BACKTEST_WORKERS", str(os.cpu_count() or 1)))
+
+TARGET_COLUMN = "__target__"
+# Lags reach back a week; load a little more so the first rows have them
+HISTORY_PADDING = timedelta(days=9)
+# Actuals some feature groups read at the row's own time; a day-ahead
+# forecast only has them MIN_LAG_PERIODS late
+UNLAGGED_ACTUALS = ("wind_actual",)
+# Bump when the way the frame is built changes, to invalidate cached frames
+FRAME_VERSION = 2
+# Series that can be backtested -> (forecast type, SEMO report or None for EirGrid)
+TARGETS = {
+    "demand": (ForecastTypeEnum.DEMAND, None),
+    "wind_actual": (ForecastTypeEnum.GENERATION, None),
+    "imbalance_price": (ForecastTypeEnum.PRICE, "BM-025"),
+    "system_price": (ForecastTypeEnum.PRICE, "BM-026"),
+}
+
+
+def _hgb():
+    from sklearn.ensemble import HistGradientBoostingRegressor
+
+    return HistGradientBoostingRegressor(max_iter=200, learning_rate=0.1, random_state=0)
+
+
+def _ridge():
+    from sklearn.impute import SimpleImputer
+    from sklearn.linear_model import Ridge
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    return make_pipeline(SimpleImputer(), StandardScaler(), Ridge(alpha=1.0))
+
+
+# name -> factory for an unfitted estimator; each fold fits its own
+MODEL_FACTORIES: Dict[str, Callable[[], object]] = {"hgb": _hgb, "ridge": _ridge}
+
+
+@dataclass(frozen=True)
+class Fold:
+    """Train on rows [train_start, origin), forecast rows [origin, test_end)"""
+
+    origin: np.datetime64
+    train_start: int
+    origin_index: int
+    test_end: int
+
+
+@dataclass
+class FoldResult:
+    fold: Fold
+    forecast_time: np.ndarray
+    predicted: np.ndarray
+    actual: np.ndarray
+    train_rows: int
+    fit_seconds: float
+    error: Optional[str] = None
+
+
+@dataclass
+class BacktestResult:
+    model: str
+    target: str
+    forecasts: pd.DataFrame  # forecast_time, origin, lead_minutes, predicted, actual
+    folds: int
+    failed: List[str] = field(default_factory=list)
+    features_seconds: float = 0.0
+    folds_seconds: float = 0.0
+
+    @property
+    def model_name(self) -> str:
+        return f"backtest:{self.model}:{self.target}"
+
+    def metrics(self, window: timedelta = timedelta(days=1)) -> List[WindowMetrics]:
+        """Window metrics per market, each over the leads within its horizon"""
+        scored = self.forecasts.dropna(subset=["actual", "predicted"])
+        parts = []
+        for market, hours in MARKET_HORIZON_HOURS.items():
+            rows = scored[scored["lead_minutes"] < hours * 60]
+            parts.append((rows, market))
+        times = np.concatenate([rows["forecast_time"].to_numpy() for rows, _ in parts])
+        markets = np.concatenate([np.full(len(rows), market) for rows, market in parts])
+        predicted = np.concatenate([rows["predicted"].to_numpy() for rows, _ in parts])
+        actual = np.concatenate([rows["actual"].to_numpy() for rows, _ in parts])
+        return compute_window_metrics(
+            times, np.full(len(times), self.model_name), markets, predicted, actual, window
+        )
+
+    def lead_time_summary(self) -> pd.DataFrame:
+        """MAE, RMSE and bias by whole hours of lead time"""
+        scored = self.forecasts.dropna(subset=["actual", "predicted"])
+        err = scored["predicted"] - scored["actual"]
+        lead_hours = scored["lead_minutes"] // 60
+        return pd.DataFrame(
+            {
+                "mae": err.abs().groupby(lead_hours).mean(),
+                "rmse": np.sqrt((err**2).groupby(lead_hours).mean()),
+                "bias": err.groupby(lead_hours).mean(),
+                "count": err.groupby(lead_hours).size(),
+            }
+        ).rename_axis("lead_hours")
+
+
+def _load_target(start: datetime, end: datetime, target: str) -> pd.Series:
+    _, report = TARGETS[target]
+    if report is None:
+        return load_history(start, end, series=(target,))[target]
+
+    import pyarrow.dataset as ds
+    from app.data_sources.parquet_store import SEMO_DATASET, read_frame
+
+    raw = read_frame(
+        SEMO_DATASET,
+        start=start,
+        end=end,
+        columns=["effective_time", "value"],
+        filter=ds.field("report") == report,
+    )
+    return raw.groupby("effective_time")["value"].last() if not raw.empty else pd.Series(dtype=np.float64)
+
+
+def backtest_features(target: str) -> Tuple[str, ...]:
+    """Default feature groups, minus those that would read the target unlagged"""
+    return tuple(
+        name
+        for name in DEFAULT_FEATURES
+        if FEATURE_REGISTRY[name].lagged or target not in FEATURE_REGISTRY[name].requires
+    )
+
+
+def lag_actuals(history: pd.DataFrame) -> pd.DataFrame:
+    """History with UNLAGGED_ACTUALS delayed by MIN_LAG_PERIODS"""
+    lag = pd.Timedelta(FREQ) * MIN_LAG_PERIODS
+    for name in UNLAGGED_ACTUALS:
+        if name in history:
+            delayed = history[name].dropna()
+            delayed.index = delayed.index + lag
+            history = history.drop(columns=name).join(delayed, how="outer")
+    return history
+
+
+def build_backtest_frame(
+    start: datetime, end: datetime, target: str = "demand", history: Optional[pd.DataFrame] = None
+) -> pd.DataFrame:
+    """
+    Features on the 15-minute grid over [start, end) plus the target column.
+
+    `history` (a wide frame like load_history returns, including the target
+    column) skips reading the stores, e.g. for synthetic data.
+    """
+    if history is None:
+        history = load_history(start - HISTORY_PADDING, end)
+        if target not in history:
+            values = _load_target(start - HISTORY_PADDING, end, target)
+            history = history.join(values.rename(target), how="outer")
+    grid = pd.date_range(pd.Timestamp(start).ceil(FREQ), pd.Timestamp(end), freq=FREQ, inclusive="left")
+    frame = build_features(lag_actuals(history), grid, backtest_features(target))
+    # Mean of the target's readings in each 15-minute period (prices are 5-minute)
+    target_values = history[target].dropna()
+    target_values = target_values.groupby(target_values.index.floor(FREQ)).mean()
+    frame[TARGET_COLUMN] = target_values.reindex(frame.index).to_numpy(dtype=np.float64)
+    return frame
+
+
+def cached_backtest_frame(start: datetime, end: datetime, target: str, refresh: bool = False) -> pd.DataFrame:
+    """build_backtest_frame, cached as Parquet in BACKTEST_CACHE_DIR per period, target and feature set"""
+    key = json.dumps([str(start), str(end), target, list(backtest_features(target)), FRAME_VERSION])
+    path = os.path.join(BACKTEST_CACHE_DIR, f"{hashlib.sha1(key.encode()).hexdigest()[:16]}.parquet")
+    if not refresh and os.path.exists(path):
+        logger.info(f"Using cached backtest features {path}")
+        return pd.read_parquet(path)
+    frame = build_backtest_frame(start, end, target)
+    os.makedirs(BACKTEST_CACHE_DIR, exist_ok=True)
+    frame.to_parquet(path)
+    return frame
+
+
+def plan_folds(
+    index: pd.DatetimeIndex,
+    step: timedelta = timedelta(days=7),
+    horizon_hours: int = max(MARKET_HORIZON_HOURS.values()),
+    train_days: Optional[int] = None,
+    min_train_days: int = 28,
+) -> List[Fold]:
+    """
+    Origins every `step` from min_train_days in, each forecasting
+    horizon_hours ahead. The training window expands from the first row,
+    or slides over the last `train_days` when given.
+    """
+    times = index.to_numpy(dtype="datetime64[ns]")
+    if len(times) == 0:
+        return []
+    step = np.timedelta64(int(step.total_seconds()), "s")
+    origins = np.arange(times[0] + np.timedelta64(min_train_days, "D"), times[-1], step)
+    folds = []
+    for origin in origins:
+        origin_index = int(np.searchsorted(times, origin))
+        test_end = int(np.searchsorted(times, origin + np.timedelta64(horizon_hours, "h")))
+        train_start = 0
+        if train_days:
+            train_start = int(np.searchsorted(times, origin - np.timedelta64(train_days, "D")))
+        if origin_index < test_end:
+            folds.append(Fold(origin, train_start, origin_index, test_end))
+    return folds
+
+
+# Per worker process: the attached backtest frame and its shared-memory handle
+_frame: Optional[pd.DataFrame] = None
+_frame_shm = None
+
+
+def _init_worker(spec: SharedFeatures) -> None:
+    global _frame, _frame_shm
+    from threadpoolctl import threadpool_limits
+
+    # One process per core already; nested BLAS/OpenMP threads would oversubscribe
+    threadpool_limits(1)
+    _frame, _frame_shm = spec.attach()
+
+
+def run_fold(fold: Fold, model: str, frame: Optional[pd.DataFrame] = None) -> FoldResult:
+    """Fit a fresh `model` on the fold's training rows and forecast its test rows"""
+    frame = _frame if frame is None else frame
+    values = frame.to_numpy(dtype=np.float64, copy=False)
+    target = frame.columns.get_loc(TARGET_COLUMN)
+    features = np.delete(np.arange(values.shape[1]), target)
+
+    train = values[fold.train_start : fold.origin_index]
+    train = train[~np.isnan(train[:, target])]
+    test = values[fold.origin_index : fold.test_end]
+    times = frame.index.to_numpy()[fold.origin_index : fold.test_end]
+    started = time.perf_counter()
+    try:
+        estimator = MODEL_FACTORIES[model]()
+        estimator.fit(train[:, features], train[:, target])
+        predicted = np.asarray(estimator.predict(test[:, features]), dtype=np.float64).ravel()
+        error = None
+    except Exception as e:
+        predicted, error = np.full(len(test), np.nan), str(e)
+    seconds = time.perf_counter() - started
+    return FoldResult(fold, times, predicted, test[:, target], len(train), seconds, error)
+
+
+def _run_folds(folds: List[Fold], model: str, frame: pd.DataFrame, workers: int) -> List[FoldResult]:
+    if workers <= 1 or len(folds) <= 1:
+        return [run_fold(fold, model, frame) for fold in folds]
+
+    spec, shm = SharedFeatures.create(frame)
+    try:
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(folds)), initializer=_init_worker, initargs=(spec,)
+        ) as executor:
+            # Later folds train on more rows; start them first so the pool drains evenly
+            order = sorted(range(len(folds)), key=lambda i: -folds[i].origin_index)
+            fold_results = executor.map(run_fold, [folds[i] for i in order], [model] * len(order))
+            results = dict(zip(order, fold_results))
+        return [results[i] for i in range(len(folds))]
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def run_backtest(
+    start: datetime,
+    end: datetime,
+    model: str = "hgb",
+    target: str = "demand",
+    step: timedelta = timedelta(days=7),
+    horizon_hours: int = max(MARKET_HORIZON_HOURS.values()),
+    train_days: Optional[int] = None,
+    min_train_days: int = 28,
+    workers: int = BACKTEST_WORKERS,
+    frame: Optional[pd.DataFrame] = None,
+) -> BacktestResult:
+    """Backtest `model` on `target` over [start, end); `frame` overrides the cached features"""
+    if model not in MODEL_FACTORIES:
+        raise ValueError(f"Unknown model {model}; choose from {list(MODEL_FACTORIES)}")
+    if target not in TARGETS:
+        raise ValueError(f"Unknown target {target}; choose from {list(TARGETS)}")
+
+    started = time.perf_counter()
+    if frame is None:
+        frame = cached_backtest_frame(start, end, target)
+    features_seconds = time.perf_counter() - started
+
+    folds = plan_folds(frame.index, step, horizon_hours, train_days, min_train_days)
+    if not folds:
+        raise ValueError(f"No folds: need more than {min_train_days} days of data after {start}")
+    logger.info(
+        f"Backtesting {model} on {target}: {len(folds)} folds over {len(frame)} rows with {workers} workers"
+    )
+    started = time.perf_counter()
+    results = _run_folds(folds, model, frame, workers)
+    folds_seconds = time.perf_counter() - started
+
+    failed = [f"{r.fold.origin}: {r.error}" for r in results if r.error]
+    for message in failed:
+        logger.warning(f"Fold failed at {message}")
+    forecasts = pd.DataFrame(
+        {
+            "forecast_time": np.concatenate([r.forecast_time for r in results]),
+            "origin": np.concatenate([np.full(len(r.forecast_time), r.fold.origin) for r in results]),
+            "lead_minutes": np.concatenate(
+                [(r.forecast_time - r.fold.origin) // np.timedelta64(1, "m") for r in results]
+            ),
+            "predicted": np.concatenate([r.predicted for r in results]),
+            "actual": np.concatenate([r.actual for r in results]),
+        }
+    )
+    return BacktestResult(model, target, forecasts, len(folds), failed, features_seconds, folds_seconds)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--start", type=datetime.fromisoformat, required=True)
+    parser.add_argument("--end", type=datetime.fromisoformat, required=True)
+    parser.add_argument("--model", default="hgb", choices=list(MODEL_FACTORIES))
+    parser.add_argument("--target", default="demand", choices=list(TARGETS))
+    parser.add_argument("--step-days", type=float, default=7)
+    parser.add_argument("--horizon-hours", type=int, default=max(MARKET_HORIZON_HOURS.values()))
+    parser.add_argument("--train-days", type=int, default=None, help="sliding window; default expanding")
+    parser.add_argument("--min-train-days", type=int, default=28)
+    parser.add_argument("--workers", type=int, default=BACKTEST_WORKERS)
+    parser.add_argument("--refresh-features", action="store_true", help="rebuild cached features")
+    parser.add_argument("--store", action="store_true", help="write daily metrics to forecast_evaluations")
+    parser.add_argument("--output", default=None, help="write out-of-sample forecasts to this Parquet file")
+    args = parser.parse_args(argv)
+
+    frame = cached_backtest_frame(args.start, args.end, args.target, refresh=args.refresh_features)
+    result = run_backtest(
+        args.start,
+        args.end,
+        args.model,
+        args.target,
+        timedelta(days=args.step_days),
+        args.horizon_hours,
+        args.train_days,
+        args.min_train_days,
+        args.workers,
+        frame=frame,
+    )
+    metrics = result.metrics()
+    print(
+        f"{result.folds} folds, {len(result.forecasts)} forecasts in {result.folds_seconds:.1f}s "
+        f"({len(result.failed)} failed)"
+    )
+    print(result.lead_time_summary().round(2).to_string())
+    for market in MARKET_HORIZON_HOURS:
+        rows = [m for m in metrics if m.market_type == market]
+        if rows:
+            weights = np.array([m.sample_count for m in rows])
+            mae = np.average([m.mae for m in rows], weights=weights)
+            print(f"{market}: MAE {mae:.2f} over {weights.sum()} forecasts")
+
+    if args.output:
+        result.forecasts.to_parquet(args.output)
+    if args.store:
+        from app.database.database import SessionLocal
+        from app.ml_models.inference.predict import PredictionService
+
+        db = SessionLocal()
+        try:
+            stored = PredictionService(db).store_evaluations(TARGETS[args.target][0], metrics)
+        finally:
+            db.close()
+        print(f"Stored {stored} evaluation windows")
+    return result
+
+
+if __name__ == "__main__":
+    main()
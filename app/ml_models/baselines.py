@@ -0,0 +1,277 @@
+"""
+Vectorized baseline forecasters: profile, seasonal-naive and exponential
+smoothing.
+
+Each baseline is fitted once from history into a small lookup table and
+forecasts by timestamp alone, so any horizon for every region is a single
+NumPy gather:
+
+- ProfileBaseline holds the mean by region x month x weekday x 15-minute
+  slot (12 x 7 x 96 float32 per region, about 32 KB).
+- SeasonalNaiveBaseline repeats the last observed season, a week by
+  default.
+- SmoothingBaseline holds an exponentially smoothed level per slot of the
+  season, updated across seasons.
+
+They are saved as ordinary artifacts (<type>_baseline, e.g. demand_baseline)
+so the registry loads, caches and syncs them like models, and predict()
+accepts the feature frame the other models get (only its DatetimeIndex is
+used). They back the prediction Lambda, PredictionService when a model
+artifact is missing, and forecast jobs without a trained model.
+
+    python -m app.ml_models.baselines fit --kind profile --start 2023-01-01 --end 2025-01-01
+"""
+import argparse
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Dict, Optional, Sequence
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+PERIOD_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // PERIOD_MINUTES
+SLOTS_PER_WEEK = 7 * SLOTS_PER_DAY
+# Fitting on the fly from recent history when no baseline artifact exists
+BASELINE_HISTORY_DAYS = int(os.getenv("BASELINE_HISTORY_DAYS", "28"))
+BASELINE_REFIT_SECONDS = float(os.getenv("BASELINE_REFIT_SECONDS", "3600"))
+
+# Forecast type -> history series the baseline is fitted on
+BASELINE_SERIES = {"DEMAND": "demand", "GENERATION": "wind_actual"}
+
+
+def _calendar(times) -> Dict[str, np.ndarray]:
+    """Month (0-11), weekday (Mon=0) and 15-minute slot of day for naive UTC times"""
+    times = np.asarray(times, dtype="datetime64[m]")
+    days = times.astype("datetime64[D]")
+    months = times.astype("datetime64[M]")
+    return {
+        "period": times.astype(np.int64) // PERIOD_MINUTES,
+        "month": (months - months.astype("datetime64[Y]")).astype(np.int64),
+        # 1970-01-01 was a Thursday
+        "weekday": (days.astype(np.int64) + 3) % 7,
+        "slot": (times - days).astype(np.int64) // PERIOD_MINUTES,
+    }
+
+
+def _wide(history) -> "pd.DataFrame":
+    """History as a 15-minute frame with one column per region"""
+    import pandas as pd
+
+    if isinstance(history, pd.Series):
+        history = history.to_frame(history.name or "ALL")
+    return history.resample(f"{PERIOD_MINUTES}min").mean()
+
+
+class Baseline:
+    """Common interface: forecast(times, regions) -> (regions, times) array"""
+
+    regions: tuple = ("ALL",)
+
+    def _region_index(self, regions: Optional[Sequence[str]]) -> np.ndarray:
+        if regions is None:
+            return np.arange(len(self.regions))
+        lookup = {region: i for i, region in enumerate(self.regions)}
+        missing = [region for region in regions if region not in lookup]
+        if missing:
+            raise KeyError(f"Baseline not fitted for regions {missing}")
+        return np.array([lookup[region] for region in regions])
+
+    def forecast(self, times, regions: Optional[Sequence[str]] = None) -> np.ndarray:
+        raise NotImplementedError
+
+    def predict(self, features) -> np.ndarray:
+        """Model-compatible entry point: the first region at each row of a time-indexed frame"""
+        index = getattr(features, "index", None)
+        if index is None or not np.issubdtype(np.asarray(index).dtype, np.datetime64):
+            raise ValueError("Baselines forecast from timestamps; pass a frame with a DatetimeIndex")
+        return self.forecast(np.asarray(index), self.regions[:1])[0]
+
+
+class ProfileBaseline(Baseline):
+    """Mean value by region x month x weekday x slot"""
+
+    def __init__(self, regions: Sequence[str], table: np.ndarray):
+        self.regions = tuple(regions)
+        self.table = table  # (regions, 12, 7, SLOTS_PER_DAY) float32
+
+    @classmethod
+    def fit(cls, history) -> "ProfileBaseline":
+        """
+        Fit from a time-indexed Series or a frame with one column per region.
+
+        Cells without data (months not in the history, hourly inputs' missing
+        quarter-hours) fall back to the weekday x slot mean across months,
+        then the slot mean, then the previous slot.
+        """
+        frame = _wide(history)
+        cal = _calendar(frame.index.to_numpy())
+        n_regions = frame.shape[1]
+        shape = (n_regions, 12, 7, SLOTS_PER_DAY)
+        cells = np.ravel_multi_index((cal["month"], cal["weekday"], cal["slot"]), shape[1:])
+
+        values = frame.to_numpy(dtype=np.float64).T  # (regions, times)
+        valid = ~np.isnan(values)
+        offsets = np.arange(n_regions)[:, None] * np.prod(shape[1:])
+        keys = (offsets + cells[None, :])[valid]
+        size = int(np.prod(shape))
+        sums = np.bincount(keys, weights=values[valid], minlength=size).reshape(shape)
+        counts = np.bincount(keys, minlength=size).reshape(shape).astype(np.float64)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            table = sums / counts
+            by_weekday = sums.sum(axis=1) / counts.sum(axis=1)  # (regions, 7, slots)
+            by_slot = sums.sum(axis=(1, 2)) / counts.sum(axis=(1, 2))  # (regions, slots)
+        table = np.where(np.isnan(table), by_weekday[:, None], table)
+        table = np.where(np.isnan(table), by_slot[:, None, None], table)
+        for slot in range(1, SLOTS_PER_DAY):
+            missing = np.isnan(table[..., slot])
+            table[..., slot][missing] = table[..., slot - 1][missing]
+        return cls(frame.columns.astype(str), table.astype(np.float32))
+
+    def forecast(self, times, regions: Optional[Sequence[str]] = None) -> np.ndarray:
+        cal = _calendar(times)
+        rows = self._region_index(regions)
+        return self.table[rows[:, None], cal["month"], cal["weekday"], cal["slot"]].astype(np.float64)
+
+
+class SmoothingBaseline(Baseline):
+    """
+    Exponentially smoothed level for each slot of a season (a day by default).
+
+    Fitting folds the history season by season: level = alpha * observed +
+    (1 - alpha) * level, vectorized across slots and regions. Forecasts
+    repeat the final levels by slot.
+    """
+
+    def __init__(self, regions: Sequence[str], levels: np.ndarray, season: int, alpha: float):
+        self.regions = tuple(regions)
+        self.levels = levels  # (regions, season) float32, slot 0 at a multiple of `season` periods
+        self.season = season
+        self.alpha = alpha
+
+    @classmethod
+    def fit(cls, history, alpha: float = 0.3, season: int = SLOTS_PER_DAY) -> "SmoothingBaseline":
+        frame = _wide(history)
+        values = frame.to_numpy(dtype=np.float64)
+        if len(values) == 0:
+            raise ValueError("No history to fit on")
+        # Pad with NaN to whole seasons so row k of the reshape is one season
+        # starting at slot 0; the partial seasons at either end still count
+        before = int(_calendar(frame.index[:1].to_numpy())["period"][0]) % season
+        after = -(before + len(values)) % season
+        values = np.pad(values, ((before, after), (0, 0)), constant_values=np.nan)
+        seasons = values.reshape(-1, season, values.shape[1])
+
+        level = np.full(seasons.shape[1:], np.nan)
+        for observed in seasons:
+            # Missing observations keep the previous level; the first seen value seeds it
+            smoothed = np.where(np.isnan(level), observed, alpha * observed + (1 - alpha) * level)
+            level = np.where(np.isnan(observed), level, smoothed)
+        fill = np.nanmean(values, axis=0)
+        level = np.where(np.isnan(level), fill[None, :], level)
+        return cls(frame.columns.astype(str), level.T.astype(np.float32), season, alpha)
+
+    def forecast(self, times, regions: Optional[Sequence[str]] = None) -> np.ndarray:
+        slots = _calendar(times)["period"] % self.season
+        rows = self._region_index(regions)
+        return self.levels[rows[:, None], slots].astype(np.float64)
+
+
+class SeasonalNaiveBaseline(SmoothingBaseline):
+    """The last observed value at the same point of the season (a week by default)"""
+
+    @classmethod
+    def fit(cls, history, season: int = SLOTS_PER_WEEK) -> "SeasonalNaiveBaseline":
+        # Smoothing with alpha = 1 keeps exactly the latest observation per slot
+        return super().fit(history, alpha=1.0, season=season)
+
+
+BASELINES = {
+    "profile": ProfileBaseline,
+    "seasonal_naive": SeasonalNaiveBaseline,
+    "smoothing": SmoothingBaseline,
+}
+
+
+def baseline_name(forecast_type: str) -> str:
+    return f"{forecast_type.lower()}_baseline"
+
+
+# forecast type -> (fitted at, baseline) for baselines fitted on the fly
+_recent: Dict[str, tuple] = {}
+_recent_lock = threading.Lock()
+
+
+def _fit_recent(forecast_type: str) -> Optional[Baseline]:
+    """A profile fitted on the last BASELINE_HISTORY_DAYS, refreshed every BASELINE_REFIT_SECONDS"""
+    series = BASELINE_SERIES.get(forecast_type)
+    if series is None:
+        return None
+    with _recent_lock:
+        fitted_at, baseline = _recent.get(forecast_type, (0.0, None))
+        if time.monotonic() - fitted_at < BASELINE_REFIT_SECONDS:
+            return baseline
+        from app.feature_engineering.engine import load_history
+
+        end = datetime.utcnow()
+        try:
+            history = load_history(end - timedelta(days=BASELINE_HISTORY_DAYS), end, series=(series,))[series]
+            baseline = ProfileBaseline.fit(history.rename("ALL")) if history.notna().any() else None
+        except Exception as e:
+            logger.warning(f"Could not fit a {forecast_type} baseline from recent history: {e}")
+            baseline = None
+        _recent[forecast_type] = (time.monotonic(), baseline)
+        return baseline
+
+
+def load_baseline(forecast_type: str = "DEMAND") -> Optional[Baseline]:
+    """
+    The stored <type>_baseline artifact, else a profile fitted from recent
+    history, else None (callers then use their rule-of-thumb fallback).
+    """
+    from app.ml_models.registry import load_model
+
+    forecast_type = getattr(forecast_type, "value", forecast_type)
+    try:
+        return load_model(baseline_name(forecast_type))
+    except FileNotFoundError:
+        return _fit_recent(forecast_type)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    fit = subparsers.add_parser("fit", help="fit a baseline on stored history and save it as an artifact")
+    fit.add_argument("--kind", default="profile", choices=list(BASELINES))
+    fit.add_argument("--type", default="DEMAND", choices=list(BASELINE_SERIES))
+    fit.add_argument("--start", type=datetime.fromisoformat, required=True)
+    fit.add_argument("--end", type=datetime.fromisoformat, required=True)
+    fit.add_argument("--output", default=None, help="default: <MODEL_DIR>/<type>_baseline.pkl")
+    args = parser.parse_args(argv)
+
+    import joblib
+
+    from app.feature_engineering.engine import load_history
+    from app.ml_models.config import MODEL_DIR
+
+    series = BASELINE_SERIES[args.type]
+    history = load_history(args.start, args.end, series=(series,))[series].rename("ALL")
+    if not history.notna().any():
+        parser.error(f"No {series} history between {args.start} and {args.end}")
+    baseline = BASELINES[args.kind].fit(history)
+    output = args.output or os.path.join(MODEL_DIR, f"{baseline_name(args.type)}.pkl")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    joblib.dump(baseline, output)
+    print(f"Saved {args.kind} baseline for {args.type} to {output} ({os.path.getsize(output)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
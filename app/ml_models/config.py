@@ -0,0 +1,17 @@
+import os
+
+# Model artifacts
+MODEL_DIR = os.getenv("MODEL_DIR", "models")
+DEFAULT_MODEL_NAME = os.getenv("DEFAULT_MODEL_NAME", "demand_forecast_model")
+MODEL_S3_BUCKET = os.getenv("MODEL_S3_BUCKET") or os.getenv("S3_BUCKET_NAME")
+MODEL_S3_PREFIX = os.getenv("MODEL_S3_PREFIX", "models/")
+
+# Model registry cache
+MODEL_CACHE_MAX_BYTES = int(os.getenv("MODEL_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+MODEL_REFRESH_SECONDS = float(os.getenv("MODEL_REFRESH_SECONDS", "60"))
+# "r" memory-maps numpy arrays in joblib artifacts so forked workers share pages
+MODEL_MMAP_MODE = os.getenv("MODEL_MMAP_MODE") or None
+
+# Dynamic batching in front of /forecast/predict
+PREDICT_BATCH_MAX_SIZE = int(os.getenv("PREDICT_BATCH_MAX_SIZE", "256"))
+PREDICT_BATCH_MAX_WAIT_MS = float(os.getenv("PREDICT_BATCH_MAX_WAIT_MS", "5"))
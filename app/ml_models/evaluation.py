@@ -0,0 +1,100 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List
+
+import numpy as np
+
+EPOCH = np.datetime64("1970-01-01T00:00:00", "s")
+
+
+@dataclass
+class WindowMetrics:
+    """Forecast accuracy over one (model, market, window) group"""
+
+    model_name: str
+    market_type: str
+    window_start: datetime
+    window_end: datetime
+    sample_count: int
+    actual_value: float  # mean actual over the window
+    forecast_value: float  # mean forecast over the window
+    error: float  # mean signed error (forecast - actual), i.e. bias
+    mae: float
+    rmse: float
+    mape: float | None  # percent; None when every actual in the window is zero
+
+
+def compute_window_metrics(
+    forecast_times: np.ndarray,
+    model_names: np.ndarray,
+    market_types: np.ndarray,
+    predicted: np.ndarray,
+    actual: np.ndarray,
+    window: timedelta = timedelta(days=1),
+) -> List[WindowMetrics]:
+    """
+    Aggregate point forecasts into per-model/market/window accuracy metrics.
+
+    All inputs are equal-length 1-D arrays. Grouping and the sums behind
+    MAE, RMSE and MAPE are done with np.unique/np.bincount, so cost is
+    linear in the number of samples rather than the number of groups.
+    """
+    predicted = np.asarray(predicted, dtype=np.float64)
+    actual = np.asarray(actual, dtype=np.float64)
+    if predicted.size == 0:
+        return []
+
+    window_seconds = int(window.total_seconds())
+    seconds = (np.asarray(forecast_times, dtype="datetime64[s]") - EPOCH).astype(np.int64)
+    window_idx = seconds // window_seconds
+
+    _, model_idx = np.unique(np.asarray(model_names, dtype=str), return_inverse=True)
+    _, market_idx = np.unique(np.asarray(market_types, dtype=str), return_inverse=True)
+    keys = np.stack([model_idx.ravel(), market_idx.ravel(), window_idx])
+    group_keys, first_idx, group_idx = np.unique(
+        keys, axis=1, return_inverse=True, return_index=True
+    )
+    group_idx = group_idx.ravel()
+    n_groups = group_keys.shape[1]
+
+    err = predicted - actual
+    abs_err = np.abs(err)
+    nonzero = actual != 0
+    ape = np.divide(abs_err, np.abs(actual), out=np.zeros_like(abs_err), where=nonzero)
+
+    counts = np.bincount(group_idx, minlength=n_groups)
+    sum_actual = np.bincount(group_idx, weights=actual, minlength=n_groups)
+    sum_pred = np.bincount(group_idx, weights=predicted, minlength=n_groups)
+    sum_err = np.bincount(group_idx, weights=err, minlength=n_groups)
+    sum_abs = np.bincount(group_idx, weights=abs_err, minlength=n_groups)
+    sum_sq = np.bincount(group_idx, weights=err * err, minlength=n_groups)
+    sum_ape = np.bincount(group_idx, weights=ape, minlength=n_groups)
+    n_nonzero = np.bincount(group_idx, weights=nonzero, minlength=n_groups)
+
+    mae = sum_abs / counts
+    rmse = np.sqrt(sum_sq / counts)
+    mape = np.divide(
+        100.0 * sum_ape, n_nonzero, out=np.full(n_groups, np.nan), where=n_nonzero > 0
+    )
+
+    model_names = np.asarray(model_names, dtype=str)
+    market_types = np.asarray(market_types, dtype=str)
+    results = []
+    for g in range(n_groups):
+        start = datetime.utcfromtimestamp(int(group_keys[2, g]) * window_seconds)
+        results.append(
+            WindowMetrics(
+                model_name=str(model_names[first_idx[g]]),
+                market_type=str(market_types[first_idx[g]]),
+                window_start=start,
+                window_end=start + window,
+                sample_count=int(counts[g]),
+                actual_value=float(sum_actual[g] / counts[g]),
+                forecast_value=float(sum_pred[g] / counts[g]),
+                error=float(sum_err[g] / counts[g]),
+                mae=float(mae[g]),
+                rmse=float(rmse[g]),
+                mape=None if np.isnan(mape[g]) else float(mape[g]),
+            )
+        )
+    return results
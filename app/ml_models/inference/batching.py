@@ -0,0 +1,189 @@
+"""
+Dynamic micro-batching for online inference.
+
+Concurrent requests are queued and collected for up to `max_wait_ms` or
+until `max_batch_size` rows are waiting, then run through a single
+vectorized `predict` call on the stacked matrix. Each caller gets back the
+slice of the result that belongs to its rows. If the batcher is stopped or
+its worker dies, every request still waiting fails instead of hanging.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from app.ml_models import config
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _PendingRequest:
+    rows: np.ndarray
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+@dataclass
+class BatcherStats:
+    requests: int = 0
+    rows: int = 0
+    batches: int = 0  # predict_fn calls
+    collections: int = 0  # queue collection cycles; one may need a call per feature width
+    last_batch_size: int = 0
+    max_batch_size_seen: int = 0
+    total_wait_seconds: float = 0.0
+    total_predict_seconds: float = 0.0
+
+    def as_dict(self, queue_depth: int) -> dict:
+        return {
+            "queue_depth": queue_depth,
+            "requests": self.requests,
+            "rows": self.rows,
+            "batches": self.batches,
+            "collections": self.collections,
+            "avg_batch_size": self.rows / self.batches if self.batches else 0.0,
+            "last_batch_size": self.last_batch_size,
+            "max_batch_size_seen": self.max_batch_size_seen,
+            "avg_queue_wait_ms": 1000 * self.total_wait_seconds / self.requests if self.requests else 0.0,
+            "avg_predict_ms": 1000 * self.total_predict_seconds / self.batches if self.batches else 0.0,
+        }
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        predict_fn: Callable[[np.ndarray], np.ndarray],
+        max_batch_size: int = config.PREDICT_BATCH_MAX_SIZE,
+        max_wait_ms: float = config.PREDICT_BATCH_MAX_WAIT_MS,
+    ):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.stats = BatcherStats()
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def metrics(self) -> dict:
+        return self.stats.as_dict(self.queue_depth)
+
+    async def submit(self, rows: np.ndarray) -> np.ndarray:
+        """Queue a (n_rows, n_features) matrix and wait for its n_rows predictions"""
+        rows = np.atleast_2d(np.asarray(rows, dtype=np.float64))
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_PendingRequest(rows, future))
+        return await future
+
+    async def stop(self) -> None:
+        """Stop the worker; requests still queued or collected fail with RuntimeError"""
+        if self._worker:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+            self._queue = None
+
+    def _ensure_started(self) -> None:
+        if self._worker is None or self._worker.done():
+            if self._queue is not None:
+                # A dead worker already failed its queue; this catches late arrivals
+                self._fail_pending([], self._queue, RuntimeError("MicroBatcher worker stopped"))
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        queue = self._queue
+        batch: List[_PendingRequest] = []
+        try:
+            while True:
+                batch = []
+                await self._collect(batch)
+                await self._execute(batch)
+        except asyncio.CancelledError:
+            self._fail_pending(batch, queue, RuntimeError("MicroBatcher stopped"))
+            raise
+        except Exception as e:
+            # The next submit starts a fresh worker
+            logger.exception("MicroBatcher worker failed")
+            self._fail_pending(batch, queue, e)
+
+    @staticmethod
+    def _fail_pending(batch: List[_PendingRequest], queue: asyncio.Queue, error: Exception) -> None:
+        """Fail the requests in `batch` and everything left in `queue`"""
+        pending = list(batch)
+        while True:
+            try:
+                pending.append(queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        for request in pending:
+            if not request.future.done():
+                request.future.set_exception(error)
+
+    async def _collect(self, batch: List[_PendingRequest]) -> None:
+        """
+        Block for the first request, then gather more until full or timed
+        out. Requests are appended to `batch` as they are taken, so none are
+        lost if the worker is cancelled part way.
+        """
+        first = await self._queue.get()
+        batch.append(first)
+        n_rows = len(first.rows)
+        deadline = time.perf_counter() + self.max_wait
+
+        while n_rows < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = await asyncio.wait_for(self._queue.get(), timeout=remaining)
+            except asyncio.TimeoutError:
+                break
+            batch.append(request)
+            n_rows += len(request.rows)
+
+    async def _execute(self, batch: List[_PendingRequest]) -> None:
+        # Requests with different feature widths cannot share a matrix
+        by_width = {}
+        for request in batch:
+            by_width.setdefault(request.rows.shape[1], []).append(request)
+
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        for requests in by_width.values():
+            stacked = np.vstack([r.rows for r in requests])
+            self.stats.batches += 1
+            try:
+                predictions = await loop.run_in_executor(None, self.predict_fn, stacked)
+            except Exception as e:
+                for r in requests:
+                    if not r.future.done():
+                        r.future.set_exception(e)
+                continue
+
+            predictions = np.asarray(predictions)
+            offset = 0
+            for r in requests:
+                n = len(r.rows)
+                if not r.future.done():
+                    r.future.set_result(predictions[offset : offset + n])
+                offset += n
+
+        n_rows = sum(len(r.rows) for r in batch)
+        self.stats.requests += len(batch)
+        self.stats.rows += n_rows
+        self.stats.collections += 1
+        self.stats.last_batch_size = n_rows
+        self.stats.max_batch_size_seen = max(self.stats.max_batch_size_seen, n_rows)
+        self.stats.total_wait_seconds += sum(started - r.enqueued_at for r in batch)
+        self.stats.total_predict_seconds += time.perf_counter() - started
@@ -1,22 +1,41 @@
 import logging
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import TYPE_CHECKING, Iterable, List, Optional, Tuple
+import numpy as np
+from sqlalchemy import (Column, DateTime, Float, MetaData, String, Table,
+                        func, insert, select, update)
+from app.database.bulk import upsert_rows
 from app.database.models import (DemandForecast, PriceForecast, 
                                GenerationForecast, ImbalanceForecast, 
-                               ForecastEvaluation, MarketTypeEnum, ForecastTypeEnum)
-import joblib
+                               ForecastEvaluation, MarketTypeEnum, ForecastTypeEnum,
+                               FORECAST_MODELS)
+from app.ml_models.config import DEFAULT_MODEL_NAME
+from app.ml_models.evaluation import WindowMetrics, compute_window_metrics
+from app.ml_models.registry import load_model
+from app.utils.cache import forecast_cache
+from app.utils.metrics import MODEL_PREDICT_SECONDS, db_operation, timer
 
-from app.feature_engineering.demand_features import generate_features_for_next_24h
+if TYPE_CHECKING:
+    import pandas as pd
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# (forecast_time, market_type, value, source, region)
+ForecastRow = Tuple[datetime, MarketTypeEnum, float, str, str]
+
+
+def forecast_source(model_name: str) -> str:
+    """The source stored with a model's forecasts: BASELINE for fitted baselines, LSTM otherwise"""
+    return "BASELINE" if model_name.endswith("_baseline") else "LSTM"
+
 
 class PredictionService:
     def __init__(self, db: Session):
         self.db = db
 
+    @db_operation("prediction.create_forecast")
     def create_forecast(
         self,
         forecast_time: datetime,
@@ -27,28 +46,68 @@ class PredictionService:
         region: str = "ALL",
     ):
         """Create a new forecast record"""
-        if forecast_type == ForecastTypeEnum.DEMAND:
-            forecast = DemandForecast(
-                forecast_time=forecast_time,
-                market_type=market_type,
-                predicted_demand_mw=value,
-                source=source,
-                region=region,
-            )
-        elif forecast_type == ForecastTypeEnum.PRICE:
-            forecast = PriceForecast(
-                forecast_time=forecast_time,
-                market_type=market_type,
-                predicted_price=value,
-                source=source,
-                region=region,
-            )
-        
+        model = FORECAST_MODELS[ForecastTypeEnum(forecast_type)]
+        forecast = model(
+            forecast_time=forecast_time,
+            market_type=market_type,
+            source=source,
+            region=region,
+            **{model.predicted_column: value},
+        )
+
         self.db.add(forecast)
         self.db.commit()
         self.db.refresh(forecast)
+        forecast_cache.invalidate(ForecastTypeEnum(forecast_type).value)
         return forecast
 
+    @db_operation("prediction.create_forecasts")
+    def create_forecasts(
+        self,
+        forecast_type: ForecastTypeEnum,
+        rows: Iterable[ForecastRow],
+    ) -> int:
+        """
+        Upsert many forecasts of one type in a single transaction.
+
+        Each row is (forecast_time, market_type, value, source, region).
+        Rows are keyed on (forecast_time, market_type, region, source), so
+        re-running a forecast overwrites the predicted value instead of
+        adding duplicates. Returns the number of rows written.
+        """
+        model = FORECAST_MODELS[ForecastTypeEnum(forecast_type)]
+        created_at = datetime.utcnow()
+
+        records = (
+            {
+                "timestamp": created_at,
+                "forecast_time": forecast_time,
+                "market_type": MarketTypeEnum(market_type),
+                "region": region,
+                "source": source,
+                model.predicted_column: float(value),
+            }
+            for forecast_time, market_type, value, source, region in rows
+        )
+
+        try:
+            written = upsert_rows(
+                self.db,
+                model,
+                records,
+                conflict_columns=model.NATURAL_KEY,
+                update_columns=("timestamp", model.predicted_column),
+            )
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        forecast_cache.invalidate(ForecastTypeEnum(forecast_type).value)
+        logger.info(f"Upserted {written} {model.__tablename__} rows")
+        return written
+
+    @db_operation("prediction.update_actual_values")
     def update_actual_values(
         self,
         actual_time: datetime,
@@ -58,23 +117,100 @@ class PredictionService:
         region: str = "ALL",
     ) -> Optional[DemandForecast | PriceForecast | GenerationForecast | ImbalanceForecast]:
         """Update actual values after market data is available"""
-        
+        model = FORECAST_MODELS[ForecastTypeEnum(forecast_type)]
+
         # Get existing forecast
-        if forecast_type == ForecastTypeEnum.DEMAND:
-            forecast = self.db.query(DemandForecast).filter(
-                DemandForecast.forecast_time == actual_time,
-                DemandForecast.market_type == market_type
-            ).first()
-            if forecast:
-                forecast.actual_demand_mw = value
-                forecast.demand_error = abs(forecast.predicted_demand_mw - value)
-        
+        forecast = self.db.query(model).filter(
+            model.forecast_time == actual_time,
+            model.market_type == market_type,
+            model.region == region,
+        ).first()
         if forecast:
+            setattr(forecast, model.actual_column, value)
+            setattr(
+                forecast,
+                model.error_column,
+                abs(getattr(forecast, model.predicted_column) - value),
+            )
             self.db.commit()
             self.db.refresh(forecast)
-        
+            forecast_cache.invalidate(ForecastTypeEnum(forecast_type).value)
+
         return forecast
 
+    @db_operation("prediction.update_actual_values_bulk")
+    def update_actual_values_bulk(
+        self,
+        forecast_type: ForecastTypeEnum,
+        actuals: "pd.DataFrame",
+        market_type: Optional[MarketTypeEnum] = None,
+    ) -> int:
+        """
+        Backfill actuals for many timestamps with one set-based UPDATE ... FROM.
+
+        `actuals` needs `forecast_time` and `value` columns and may carry a
+        `region` column (defaults to "ALL"). Every forecast at a matching
+        time/region is updated, across all sources, and limited to
+        `market_type` when given. Times are stored as naive UTC: tz-aware
+        input is converted, naive input is taken as UTC already. Returns the
+        number of forecast rows updated.
+        """
+        import pandas as pd
+
+        model = FORECAST_MODELS[ForecastTypeEnum(forecast_type)]
+        if actuals.empty:
+            return 0
+
+        frame = pd.DataFrame(
+            {
+                "forecast_time": pd.to_datetime(actuals["forecast_time"], utc=True).dt.tz_localize(None),
+                "region": actuals["region"] if "region" in actuals else "ALL",
+                "actual_value": actuals["value"].astype(float),
+            }
+        ).drop_duplicates(subset=["forecast_time", "region"], keep="last")
+
+        staging = Table(
+            "tmp_actuals",
+            MetaData(),
+            Column("forecast_time", DateTime, nullable=False),
+            Column("region", String, nullable=False),
+            Column("actual_value", Float, nullable=False),
+            prefixes=["TEMPORARY"],
+        )
+        predicted = getattr(model, model.predicted_column)
+        stmt = (
+            update(model)
+            .where(
+                model.forecast_time == staging.c.forecast_time,
+                model.region == staging.c.region,
+            )
+            .values(
+                {
+                    model.actual_column: staging.c.actual_value,
+                    model.error_column: func.abs(predicted - staging.c.actual_value),
+                }
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if market_type is not None:
+            stmt = stmt.where(model.market_type == MarketTypeEnum(market_type))
+
+        conn = self.db.connection()
+        try:
+            staging.create(conn)
+            conn.execute(insert(staging), frame.to_dict("records"))
+            updated = conn.execute(stmt).rowcount
+            staging.drop(conn)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        forecast_cache.invalidate(ForecastTypeEnum(forecast_type).value)
+        logger.info(f"Backfilled actuals on {updated} {model.__tablename__} rows")
+        return updated
+
+    @db_operation("prediction.evaluate_forecast")
     def evaluate_forecast(
         self,
         forecast_time: datetime,
@@ -83,32 +219,34 @@ class PredictionService:
         model_name: str = "LSTM",
     ) -> Optional[ForecastEvaluation]:
         """Evaluate forecast accuracy by comparing it to actual values"""
-        if forecast_type == ForecastTypeEnum.DEMAND:
-            forecast = (
-                self.db.query(DemandForecast)
-                .filter(
-                    DemandForecast.forecast_time == forecast_time,
-                    DemandForecast.market_type == market_type,
-                )
-                .first()
+        model = FORECAST_MODELS[ForecastTypeEnum(forecast_type)]
+        forecast = (
+            self.db.query(model)
+            .filter(
+                model.forecast_time == forecast_time,
+                model.market_type == market_type,
             )
-            if not forecast or forecast.actual_demand_mw is None:
-                logger.warning(f"No matching forecast or actual data found for {forecast_time}.")
-                return None
-            error = abs(forecast.actual_demand_mw - forecast.predicted_demand_mw)
-            actual_value = forecast.actual_demand_mw
-            forecast_value = forecast.predicted_demand_mw
-
+            .first()
+        )
+        actual_value = getattr(forecast, model.actual_column, None)
+        if not forecast or actual_value is None:
+            logger.warning(f"No matching forecast or actual data found for {forecast_time}.")
+            return None
+        forecast_value = getattr(forecast, model.predicted_column)
+        error = abs(actual_value - forecast_value)
 
         evaluation = ForecastEvaluation(
+            forecast_type=ForecastTypeEnum(forecast_type),
             model_name=model_name,
             market_type=market_type,
             forecast_time=forecast_time,
+            sample_count=1,
             actual_value=actual_value,
             forecast_value=forecast_value,
             error=error,
             mae=error,
-            rmse=error**2,
+            rmse=error,
+            mape=100.0 * error / abs(actual_value) if actual_value else None,
         )
 
         self.db.add(evaluation)
@@ -116,6 +254,129 @@ class PredictionService:
         self.db.refresh(evaluation)
         return evaluation
 
+    @db_operation("prediction.evaluate_forecasts")
+    def evaluate_forecasts(
+        self,
+        forecast_type: ForecastTypeEnum,
+        start: datetime,
+        end: datetime,
+        window: timedelta = timedelta(days=1),
+        market_type: Optional[MarketTypeEnum] = None,
+    ) -> int:
+        """
+        Compute error, MAE, RMSE and MAPE per model/market/window over
+        [start, end) and upsert them as ForecastEvaluation rows.
+
+        Only forecasts that already have actuals are included. Re-evaluating
+        a window replaces its metrics. Returns the number of evaluation rows
+        written.
+        """
+        forecast_type = ForecastTypeEnum(forecast_type)
+        model = FORECAST_MODELS[forecast_type]
+        predicted = getattr(model, model.predicted_column)
+        actual = getattr(model, model.actual_column)
+
+        query = select(
+            model.forecast_time, model.source, model.market_type, predicted, actual
+        ).where(
+            model.forecast_time >= start,
+            model.forecast_time < end,
+            actual.is_not(None),
+        )
+        if market_type is not None:
+            query = query.where(model.market_type == MarketTypeEnum(market_type))
+
+        rows = self.db.execute(query).all()
+        if not rows:
+            logger.warning(f"No forecasts with actuals between {start} and {end}.")
+            return 0
+
+        times, sources, markets, predicted_values, actual_values = zip(*rows)
+        metrics = compute_window_metrics(
+            np.array(times, dtype="datetime64[s]"),
+            np.array(sources),
+            np.array([m.value for m in markets]),
+            np.array(predicted_values, dtype=np.float64),
+            np.array(actual_values, dtype=np.float64),
+            window=window,
+        )
+        return self.store_evaluations(forecast_type, metrics)
+
+    @db_operation("prediction.store_evaluations")
+    def store_evaluations(
+        self, forecast_type: ForecastTypeEnum, metrics: List[WindowMetrics]
+    ) -> int:
+        """Upsert windowed metrics as ForecastEvaluation rows, keyed by WINDOW_KEY"""
+        if not metrics:
+            return 0
+
+        records = [
+            {
+                "forecast_type": ForecastTypeEnum(forecast_type),
+                "model_name": m.model_name,
+                "market_type": MarketTypeEnum(m.market_type),
+                "forecast_time": m.window_start,
+                "window_end": m.window_end,
+                "sample_count": m.sample_count,
+                "actual_value": m.actual_value,
+                "forecast_value": m.forecast_value,
+                "error": m.error,
+                "mae": m.mae,
+                "rmse": m.rmse,
+                "mape": m.mape,
+            }
+            for m in metrics
+        ]
+        try:
+            written = upsert_rows(
+                self.db,
+                ForecastEvaluation,
+                records,
+                conflict_columns=ForecastEvaluation.WINDOW_KEY,
+                update_columns=(
+                    "sample_count", "actual_value", "forecast_value", "error", "mae", "rmse", "mape"
+                ),
+            )
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        logger.info(f"Stored {written} {forecast_type.value} evaluation windows")
+        return written
+
+    @db_operation("prediction.reconcile_actuals")
+    def reconcile_actuals(
+        self,
+        forecast_type: ForecastTypeEnum,
+        actuals: "pd.DataFrame",
+        window: timedelta = timedelta(days=1),
+        market_type: Optional[MarketTypeEnum] = None,
+    ) -> int:
+        """
+        Backfill a DataFrame of actuals and evaluate the affected windows.
+
+        Returns the number of evaluation rows written.
+        """
+        import pandas as pd
+
+        if actuals.empty:
+            return 0
+        self.update_actual_values_bulk(forecast_type, actuals, market_type=market_type)
+
+        times = pd.to_datetime(actuals["forecast_time"])
+        window_seconds = int(window.total_seconds())
+        start = datetime.utcfromtimestamp(
+            (times.min().value // 10**9) // window_seconds * window_seconds
+        )
+        end = datetime.utcfromtimestamp(
+            ((times.max().value // 10**9) // window_seconds + 1) * window_seconds
+        )
+        return self.evaluate_forecasts(
+            forecast_type, start, end, window=window, market_type=market_type
+        )
+
+    @db_operation("prediction.get_recent_forecasts")
     def get_recent_forecasts(
         self, 
         market_type: MarketTypeEnum, 
@@ -123,11 +384,8 @@ class PredictionService:
         limit: int = 24
     ) -> List[DemandForecast | PriceForecast | GenerationForecast | ImbalanceForecast]:
         """Retrieve most recent forecasts"""
-        if forecast_type == ForecastTypeEnum.DEMAND:
-            model = DemandForecast
-        elif forecast_type == ForecastTypeEnum.PRICE:
-            model = PriceForecast
-        
+        model = FORECAST_MODELS[ForecastTypeEnum(forecast_type)]
+
         forecasts = (
             self.db.query(model)
             .filter(model.market_type == market_type)
@@ -138,18 +396,92 @@ class PredictionService:
         
         return forecasts
 
+    @db_operation("prediction.get_forecasts")
+    def get_forecasts(
+        self,
+        forecast_type: ForecastTypeEnum,
+        market_type: Optional[MarketTypeEnum] = None,
+        region: Optional[str] = None,
+        source: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: int = 24,
+    ) -> List[dict]:
+        """
+        Forecasts as plain dicts for serving, ordered by forecast_time.
+
+        With a time range, returns up to `limit` rows from [start, end);
+        without one, the latest `limit` forecast times.
+        """
+        model = FORECAST_MODELS[ForecastTypeEnum(forecast_type)]
+        columns = [
+            model.forecast_time,
+            model.market_type,
+            model.region,
+            model.source,
+            getattr(model, model.predicted_column).label("predicted"),
+            getattr(model, model.actual_column).label("actual"),
+            model.timestamp.label("created_at"),
+        ]
+        stmt = select(*columns)
+        if market_type is not None:
+            stmt = stmt.where(model.market_type == MarketTypeEnum(market_type))
+        if region is not None:
+            stmt = stmt.where(model.region == region)
+        if source is not None:
+            stmt = stmt.where(model.source == source)
+        if start is not None:
+            stmt = stmt.where(model.forecast_time >= start)
+        if end is not None:
+            stmt = stmt.where(model.forecast_time < end)
+
+        latest_first = start is None and end is None
+        order = model.forecast_time.desc() if latest_first else model.forecast_time.asc()
+        rows = [dict(row._mapping) for row in self.db.execute(stmt.order_by(order).limit(limit))]
+        return rows[::-1] if latest_first else rows
+
+    def _model_or_baseline(self, model_name: str, features, forecast_type=ForecastTypeEnum.DEMAND):
+        """
+        The named model, or the fitted baseline for the forecast type when
+        the artifact is missing and the features are time-indexed.
+        """
+        try:
+            return model_name, load_model(model_name)
+        except FileNotFoundError:
+            from app.ml_models.baselines import baseline_name, load_baseline
+
+            baseline = load_baseline(forecast_type) if hasattr(features, "index") else None
+            if baseline is None:
+                raise
+            logger.warning(f"No artifact for {model_name}; using the {forecast_type.value} baseline")
+            return baseline_name(forecast_type.value), baseline
+
+    def predict(self, features, model_name: str = DEFAULT_MODEL_NAME):
+        """Run the cached model on a feature matrix (or a time-indexed frame)"""
+        name, model = self._model_or_baseline(model_name, features)
+        if hasattr(features, "columns"):
+            from app.feature_engineering.engine import model_columns
+
+            features = model_columns(model, features)
+        with timer(MODEL_PREDICT_SECONDS, model=name):
+            return model.predict(features)
+
     def run_forecast_for_next_24h(self):
-        model = joblib.load("models/demand_forecast_model.pkl")
+        from app.feature_engineering.demand_features import generate_features_for_next_24h
+        from app.feature_engineering.engine import model_columns
+
         future_features = generate_features_for_next_24h()
-        predictions = model.predict(future_features)
-
-        for i, value in enumerate(predictions):
-            forecast_time = datetime.utcnow().replace(
-                minute=0, second=0, microsecond=0
-            ) + timedelta(hours=i)
-            self.create_forecast(
-                forecast_time=forecast_time,
-                market_type=MarketTypeEnum.DAM,
-                forecast_type="DEMAND",
-                value=value,
-            )
+        name, model = self._model_or_baseline(DEFAULT_MODEL_NAME, future_features)
+        with timer(MODEL_PREDICT_SECONDS, model=name):
+            # Older artifacts were trained on LEGACY_FEATURES only
+            predictions = model.predict(model_columns(model, future_features))
+
+        source = forecast_source(name)
+        start = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+        return self.create_forecasts(
+            ForecastTypeEnum.DEMAND,
+            (
+                (start + timedelta(hours=i), MarketTypeEnum.DAM, value, source, "ALL")
+                for i, value in enumerate(predictions)
+            ),
+        )
@@ -0,0 +1,215 @@
+"""
+In-process model registry.
+
+Models are deserialized once per process and cached by (name, version,
+mtime). Lookups within MODEL_REFRESH_SECONDS are served straight from the
+cache; after that the artifact is re-checked locally (and in S3 when a
+bucket is configured) and a newer artifact is loaded and swapped in.
+Missing artifacts are remembered for the same interval, so callers that
+fall back (e.g. to a baseline) don't hit S3 on every request.
+
+S3 syncs and deserialization run outside the registry-wide lock, under a
+per-model lock, so a cold load only blocks other lookups of that model.
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from app.ml_models import config
+from app.utils.metrics import MODEL_LOAD_SECONDS
+
+logger = logging.getLogger(__name__)
+
+ModelKey = Tuple[str, Optional[str], float]
+
+
+@dataclass
+class _CacheEntry:
+    model: Any
+    size_bytes: int
+    loaded_at: float
+
+
+class ModelRegistry:
+    def __init__(
+        self,
+        model_dir: str = config.MODEL_DIR,
+        max_bytes: int = config.MODEL_CACHE_MAX_BYTES,
+        refresh_seconds: float = config.MODEL_REFRESH_SECONDS,
+        mmap_mode: Optional[str] = config.MODEL_MMAP_MODE,
+        s3_bucket: Optional[str] = config.MODEL_S3_BUCKET,
+        s3_prefix: str = config.MODEL_S3_PREFIX,
+    ):
+        self.model_dir = model_dir
+        self.max_bytes = max_bytes
+        self.refresh_seconds = refresh_seconds
+        self.mmap_mode = mmap_mode
+        self.s3_bucket = s3_bucket
+        self.s3_prefix = s3_prefix
+
+        self._cache: "OrderedDict[ModelKey, _CacheEntry]" = OrderedDict()
+        # (name, version) -> (last checked, key currently served)
+        self._current: Dict[Tuple[str, Optional[str]], Tuple[float, ModelKey]] = {}
+        # (name, version) -> when the artifact was last found missing
+        self._missing: Dict[Tuple[str, Optional[str]], float] = {}
+        self._s3_etags: Dict[str, str] = {}
+        self._s3_client = None
+        self._s3_client_lock = threading.Lock()
+        # Guards the dicts above; held only for bookkeeping, never across I/O
+        self._lock = threading.RLock()
+        # (name, version) -> lock serializing syncs and loads of that model
+        self._load_locks: Dict[Tuple[str, Optional[str]], threading.Lock] = {}
+
+    def artifact_path(self, name: str, version: Optional[str] = None) -> str:
+        if version:
+            return os.path.join(self.model_dir, name, f"{version}.pkl")
+        return os.path.join(self.model_dir, f"{name}.pkl")
+
+    def get(self, name: str, version: Optional[str] = None) -> Any:
+        """Return the model, loading or hot-swapping it if needed"""
+        with self._lock:
+            model = self._fresh(name, version)
+            if model is not None:
+                return model
+            load_lock = self._load_locks.setdefault((name, version), threading.Lock())
+
+        with load_lock:
+            # Another thread may have loaded it while this one waited
+            with self._lock:
+                model = self._fresh(name, version)
+                if model is not None:
+                    return model
+                current = self._current.get((name, version))
+
+            now = time.monotonic()
+            path = self.artifact_path(name, version)
+            self._sync_from_s3(name, version, path)
+            if not os.path.exists(path):
+                with self._lock:
+                    self._missing[(name, version)] = now
+                raise FileNotFoundError(f"No model artifact at {path}")
+
+            key = (name, version, os.path.getmtime(path))
+            with self._lock:
+                entry = self._cache.get(key)
+            if entry is None:
+                entry = self._load(path)
+
+            with self._lock:
+                self._missing.pop((name, version), None)
+                self._cache[key] = entry
+                if current and current[1] != key:
+                    self._cache.pop(current[1], None)
+                    logger.info(f"Hot-swapped model {name} ({version or 'latest'})")
+                self._cache.move_to_end(key)
+                self._current[(name, version)] = (now, key)
+                self._evict()
+            return entry.model
+
+    def _fresh(self, name: str, version: Optional[str]) -> Any:
+        """
+        The cached model if it was checked within refresh_seconds, else None.
+        Raises FileNotFoundError for an artifact found missing within the
+        interval. Call with self._lock held.
+        """
+        now = time.monotonic()
+        current = self._current.get((name, version))
+        if current and now - current[0] < self.refresh_seconds and current[1] in self._cache:
+            self._cache.move_to_end(current[1])
+            return self._cache[current[1]].model
+
+        missing_since = self._missing.get((name, version))
+        if missing_since is not None and now - missing_since < self.refresh_seconds:
+            raise FileNotFoundError(f"No model artifact at {self.artifact_path(name, version)}")
+        return None
+
+    def preload(self, *names: str) -> None:
+        """Load models up front, e.g. before forking server workers"""
+        for name in names:
+            try:
+                self.get(name)
+            except FileNotFoundError as e:
+                logger.warning(f"Could not preload {name}: {e}")
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        with self._lock:
+            for key in [k for k in self._cache if name is None or k[0] == name]:
+                del self._cache[key]
+            for key in [k for k in self._current if name is None or k[0] == name]:
+                del self._current[key]
+            for key in [k for k in self._missing if name is None or k[0] == name]:
+                del self._missing[key]
+
+    def reset_after_fork(self) -> None:
+        """Drop the S3 client inherited from a parent process; boto3 clients aren't fork-safe"""
+        self._s3_client = None
+        # A load in flight at fork time would leave its lock held in the child
+        self._load_locks = {}
+        self._s3_client_lock = threading.Lock()
+
+    def cached_bytes(self) -> int:
+        return sum(entry.size_bytes for entry in self._cache.values())
+
+    def _load(self, path: str) -> _CacheEntry:
+        import joblib
+
+        started = time.perf_counter()
+        model = joblib.load(path, mmap_mode=self.mmap_mode)
+        elapsed = time.perf_counter() - started
+        MODEL_LOAD_SECONDS.labels(model=os.path.splitext(os.path.relpath(path, self.model_dir))[0]).observe(elapsed)
+        logger.info(f"Loaded model {path} in {elapsed:.3f}s")
+        return _CacheEntry(model=model, size_bytes=os.path.getsize(path), loaded_at=time.time())
+
+    def _evict(self) -> None:
+        """Drop least recently used models until the cache fits in max_bytes"""
+        while len(self._cache) > 1 and self.cached_bytes() > self.max_bytes:
+            key, _ = self._cache.popitem(last=False)
+            self._current = {k: v for k, v in self._current.items() if v[1] != key}
+            logger.info(f"Evicted model {key[0]} ({key[1] or 'latest'}) from cache")
+
+    def _sync_from_s3(self, name: str, version: Optional[str], path: str) -> None:
+        """Download the artifact if the S3 copy changed since the last check"""
+        if not self.s3_bucket:
+            return
+
+        key = self.s3_prefix + os.path.relpath(path, self.model_dir).replace(os.sep, "/")
+        try:
+            with self._s3_client_lock:
+                if self._s3_client is None:
+                    import boto3
+
+                    self._s3_client = boto3.client("s3")
+            etag = self._s3_client.head_object(Bucket=self.s3_bucket, Key=key)["ETag"]
+            if self._s3_etags.get(key) == etag and os.path.exists(path):
+                return
+
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp_path = f"{path}.download"
+            self._s3_client.download_file(self.s3_bucket, key, tmp_path)
+            os.replace(tmp_path, path)  # atomic, so readers never see a partial file
+            self._s3_etags[key] = etag
+            logger.info(f"Fetched model s3://{self.s3_bucket}/{key}")
+        except Exception as e:
+            logger.warning(f"Could not sync model {name} from S3: {e}")
+
+
+_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ModelRegistry:
+    """Process-wide registry shared by the API, services and Lambdas"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
+
+
+def load_model(name: str = config.DEFAULT_MODEL_NAME, version: Optional[str] = None) -> Any:
+    return get_registry().get(name, version)
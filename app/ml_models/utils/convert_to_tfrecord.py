@@ -1,47 +1,305 @@
-import ast
-import tensorflow as tf
-import pandas as pd
+"""
+Write processed training data as sharded, compressed TFRecords of windowed
+sequences for the LSTM.
+
+Each example holds `window` consecutive rows of every feature column
+(flattened, row-major: [window, n_features]) and the target column
+`horizon` steps after the window ends; windows never span two input
+files. The windows are split into `num_shards` contiguous runs, one
+GZIP/ZLIB file each, written by their own worker process. A worker reads
+only the row groups its run covers (neighbouring runs overlap by
+window + horizon - 1 rows) and serializes WRITE_BATCH windows at a time.
+A <prefix>.meta.json next to the shards records the shapes and
+compression for app.ml_models.utils.tf_dataset. The target is never one
+of the default feature columns.
+
+convert_csv_to_tfrecord keeps the original one-example-per-row format
+(feature [Value], int64 label Status == "Success") for existing callers.
+
+    python -m app.ml_models.utils.convert_to_tfrecord --shards 16 --window 96
+"""
+import argparse
+import glob
+import json
 import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 from app.utils.logging import logger
 
-RAW_PATH = os.path.join("/app", "ml_models", "data", "raw")
-PROCESSED_PATH = os.path.join("/app", "ml_models", "data", "processed")
+PROCESSED_PATH = os.path.join("app", "ml_models", "data", "processed")
+TFRECORD_PATH = os.path.join("app", "ml_models", "data", "tfrecord")
 
-os.makedirs(RAW_PATH, exist_ok=True)
-os.makedirs(PROCESSED_PATH, exist_ok=True)
+DEFAULT_WINDOW = 96  # one day of 15-minute steps
+DEFAULT_HORIZON = 1
+DEFAULT_TARGET = "Value"
+COMPRESSION_SUFFIX = {"GZIP": ".gz", "ZLIB": ".zz", "": ""}
+# Windows serialized and written at a time, bounding a worker's peak memory
+WRITE_BATCH = int(os.getenv("TFRECORD_WRITE_BATCH", "4096"))
 
 
-def convert_csv_to_tfrecord(csv_filename, tfrecord_filename):
-    df = pd.read_csv(csv_filename)
+def shard_path(prefix: str, shard: int, num_shards: int, compression: str) -> str:
+    return f"{prefix}-{shard:05d}-of-{num_shards:05d}.tfrecord{COMPRESSION_SUFFIX[compression]}"
 
-    df["Value"] = df["Rows"].apply(
-        lambda x: ast.literal_eval(x)["Value"] if pd.notnull(x) else 0
-    )
 
-    features = df[["Value"]].values
-    labels = (df["Status"] == "Success").astype(int).values
+def numeric_columns(path: str) -> List[str]:
+    return [
+        f.name for f in pq.read_schema(path)
+        if pa.types.is_floating(f.type) or pa.types.is_integer(f.type)
+    ]
 
-    with tf.io.TFRecordWriter(tfrecord_filename) as writer:
-        for f, l in zip(features, labels):
-            writer.write(serialize_example(f, l))
 
-    logger.info(f"Converted {csv_filename} to {tfrecord_filename}")
+def file_offsets(input_files: Sequence[str]) -> np.ndarray:
+    """Row offset where each file starts in the concatenated files, plus the total, from footers only"""
+    return np.cumsum([0] + [pq.ParquetFile(path).metadata.num_rows for path in input_files])
+
+
+def load_rows(
+    input_files: Sequence[str],
+    offsets: np.ndarray,
+    start: int,
+    stop: int,
+    target: str,
+    feature_columns: Sequence[str],
+):
+    """
+    Rows [start, stop) of the concatenated files as float32 features and
+    targets, reading only the row groups that overlap them.
+    """
+    tables = []
+    for path, file_start, file_end in zip(input_files, offsets[:-1], offsets[1:]):
+        if file_end <= start or file_start >= stop:
+            continue
+        parquet = pq.ParquetFile(path)
+        groups, first_row, group_start = [], None, file_start
+        for i in range(parquet.metadata.num_row_groups):
+            group_end = group_start + parquet.metadata.row_group(i).num_rows
+            if group_end > start and group_start < stop:
+                first_row = group_start if first_row is None else first_row
+                groups.append(i)
+            group_start = group_end
+        table = parquet.read_row_groups(groups, columns=sorted({*feature_columns, target}))
+        lo = max(start, first_row)
+        tables.append(table.slice(lo - first_row, min(stop, file_end) - lo))
+
+    table = pa.concat_tables(tables)
+    features = np.column_stack([table.column(c).to_numpy() for c in feature_columns]).astype(np.float32)
+    targets = table.column(target).to_numpy().astype(np.float32)
+    return features, targets
+
+
+def window_starts(offsets: np.ndarray, window: int, horizon: int) -> np.ndarray:
+    """Start rows of every window whose label lies in the same file"""
+    return np.concatenate(
+        [np.arange(start, max(end - window - horizon + 1, start)) for start, end in zip(offsets[:-1], offsets[1:])]
+    ).astype(np.int64)
+
+
+def _write_shard(
+    input_files: Sequence[str],
+    offsets: np.ndarray,
+    starts: np.ndarray,
+    target: str,
+    feature_columns: Sequence[str],
+    window: int,
+    horizon: int,
+    path: str,
+    compression: str,
+) -> int:
+    """Write the windows starting at `starts` (ascending, contiguous in the data) to one shard"""
+    import tensorflow as tf
 
+    options = tf.io.TFRecordOptions(compression_type=compression)
+    with tf.io.TFRecordWriter(path, options) as writer:
+        if len(starts) == 0:
+            return 0
+        first = int(starts[0])
+        features, targets = load_rows(
+            input_files, offsets, first, int(starts[-1]) + window + horizon, target, feature_columns
+        )
+        windows = np.lib.stride_tricks.sliding_window_view(features, window, axis=0)
+        for batch in range(0, len(starts), WRITE_BATCH):
+            batch_starts = starts[batch : batch + WRITE_BATCH] - first
+            # [n_windows, n_features, window] view -> rows of window * n_features floats
+            sequences = windows[batch_starts].transpose(0, 2, 1).reshape(len(batch_starts), -1)
+            labels = targets[batch_starts + window + horizon - 1]
+            for record in serialize_examples(sequences, labels):
+                writer.write(record.tobytes())
+    return len(starts)
+
+
+def serialize_example(sequence: np.ndarray, label: float) -> bytes:
+    import tensorflow as tf
 
-def serialize_example(feature, label):
     feature_dict = {
-        "feature": tf.train.Feature(float_list=tf.train.FloatList(value=feature)),
-        "label": tf.train.Feature(int64_list=tf.train.Int64List(value=[label])),
+        "sequence": tf.train.Feature(float_list=tf.train.FloatList(value=sequence)),
+        "label": tf.train.Feature(float_list=tf.train.FloatList(value=[label])),
     }
     example_proto = tf.train.Example(features=tf.train.Features(feature=feature_dict))
     return example_proto.SerializeToString()
 
 
-if __name__ == "__main__":
-    for file in os.listdir(RAW_PATH):
-        if file.endswith(".csv"):
-            csv_file = os.path.join(RAW_PATH, file)
-            tfrecord_file = os.path.join(
-                PROCESSED_PATH, file.replace(".csv", ".tfrecord")
+def serialize_examples(sequences: np.ndarray, labels: np.ndarray) -> np.ndarray:
+    """
+    Serialize many same-shaped examples at once, as rows of a uint8 matrix.
+
+    Every example has the same wire layout and only its packed float
+    payloads differ, so one example is serialized through protobuf with
+    marker values and the real floats are copied into that template for
+    all rows in a single NumPy assignment (about 150x faster than one
+    protobuf round per example). The markers must each occur exactly once
+    in the template, and the first record is decoded and checked against
+    its input, so a layout change fails loudly instead of writing garbage.
+    """
+    sequences = np.ascontiguousarray(sequences, dtype="<f4")
+    labels = np.ascontiguousarray(labels, dtype="<f4")
+    n_values = sequences.shape[1]
+
+    marker = np.arange(1, n_values + 1, dtype="<f4").tobytes()
+    label_marker = np.array([-1.0], dtype="<f4").tobytes()
+    template = serialize_example(np.frombuffer(marker, dtype="<f4"), -1.0)
+    if template.count(marker) != 1 or template.count(label_marker) != 1:
+        raise RuntimeError("Unexpected Example wire layout")
+    sequence_offset, label_offset = template.find(marker), template.find(label_marker)
+
+    records = np.tile(np.frombuffer(template, dtype=np.uint8), (len(sequences), 1))
+    records[:, sequence_offset : sequence_offset + 4 * n_values] = sequences.view(np.uint8)
+    records[:, label_offset : label_offset + 4] = labels.view(np.uint8).reshape(-1, 4)
+    if len(records):
+        _check_record(records[0].tobytes(), sequences[0], labels[0])
+    return records
+
+
+def _check_record(record: bytes, sequence: np.ndarray, label: float) -> None:
+    import tensorflow as tf
+
+    feature = tf.train.Example.FromString(record).features.feature
+    decoded = np.array(feature["sequence"].float_list.value, dtype="<f4")
+    same = np.array_equal(decoded, sequence, equal_nan=True) and np.array_equal(
+        np.array(feature["label"].float_list.value, dtype="<f4"), np.array([label], dtype="<f4"), equal_nan=True
+    )
+    if not same:
+        raise RuntimeError("Templated Example does not decode to its input")
+
+
+def _serialize_row_example(feature: np.ndarray, label: int) -> bytes:
+    import tensorflow as tf
+
+    feature_dict = {
+        "feature": tf.train.Feature(float_list=tf.train.FloatList(value=feature)),
+        "label": tf.train.Feature(int64_list=tf.train.Int64List(value=[label])),
+    }
+    return tf.train.Example(features=tf.train.Features(feature=feature_dict)).SerializeToString()
+
+
+def convert_csv_to_tfrecord(csv_filename: str, tfrecord_filename: str, chunk_size: int = 100_000) -> int:
+    """
+    One uncompressed example per raw CSV row: feature [Value] parsed from
+    `Rows` (0 when missing) and label 1 where Status == "Success". Kept for
+    callers of the original converter; new training data should use
+    convert_to_tfrecord. Returns the number of examples written.
+    """
+    import pandas as pd
+    import tensorflow as tf
+
+    from app.ml_models.utils.data_processing import parse_rows_column
+
+    written = 0
+    with tf.io.TFRecordWriter(tfrecord_filename) as writer:
+        for chunk in pd.read_csv(csv_filename, chunksize=chunk_size):
+            values = parse_rows_column(chunk["Rows"], {"Value": "float"})["Value"].fillna(0.0)
+            labels = (chunk["Status"] == "Success").astype(int)
+            for value, label in zip(values.to_numpy(dtype=np.float32), labels.to_numpy()):
+                writer.write(_serialize_row_example([value], int(label)))
+            written += len(chunk)
+    logger.info(f"Converted {csv_filename} to {tfrecord_filename}")
+    return written
+
+
+def convert_to_tfrecord(
+    input_files: Sequence[str],
+    output_prefix: str,
+    window: int = DEFAULT_WINDOW,
+    horizon: int = DEFAULT_HORIZON,
+    target: str = DEFAULT_TARGET,
+    feature_columns: Optional[Sequence[str]] = None,
+    num_shards: int = 8,
+    compression: str = "GZIP",
+    workers: Optional[int] = None,
+) -> dict:
+    """Write windowed examples for the input files as shards; returns the metadata written"""
+    input_files = sorted(input_files)
+    # The target is the label; list it in `feature_columns` explicitly to feed
+    # its past values to the model as well
+    feature_columns = list(feature_columns or [c for c in numeric_columns(input_files[0]) if c != target])
+    if not feature_columns:
+        raise ValueError(f"No numeric feature columns besides the target {target}; pass feature_columns")
+    offsets = file_offsets(input_files)
+    n_rows = int(offsets[-1])
+    runs = np.array_split(window_starts(offsets, window, horizon), num_shards)
+
+    os.makedirs(os.path.dirname(output_prefix) or ".", exist_ok=True)
+    paths = [shard_path(output_prefix, shard, num_shards, compression) for shard in range(num_shards)]
+    with ProcessPoolExecutor(max_workers=workers or min(num_shards, os.cpu_count() or 1)) as executor:
+        futures = [
+            executor.submit(
+                _write_shard,
+                input_files, offsets, starts, target, feature_columns, window, horizon, path, compression,
             )
-            convert_csv_to_tfrecord(csv_file, tfrecord_file)
+            for starts, path in zip(runs, paths)
+        ]
+        counts = [future.result() for future in futures]
+
+    meta = {
+        "shards": [os.path.basename(p) for p in paths],
+        "compression": compression,
+        "window": window,
+        "horizon": horizon,
+        "feature_columns": feature_columns,
+        "target": target,
+        "num_examples": sum(counts),
+        "num_rows": n_rows,
+    }
+    with open(f"{output_prefix}.meta.json", "w") as f:
+        json.dump(meta, f, indent=2)
+
+    logger.info(f"Wrote {meta['num_examples']} windows of {window}x{len(feature_columns)} to {num_shards} shards")
+    return meta
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Convert processed data to sharded TFRecords")
+    parser.add_argument("--input", default=os.path.join(PROCESSED_PATH, "*.parquet"), help="glob of processed files")
+    parser.add_argument("--output-prefix", default=os.path.join(TFRECORD_PATH, "train"))
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW)
+    parser.add_argument("--horizon", type=int, default=DEFAULT_HORIZON)
+    parser.add_argument("--target", default=DEFAULT_TARGET)
+    parser.add_argument(
+        "--features", default=None, help="comma-separated feature columns (default: all numeric but the target)"
+    )
+    parser.add_argument("--shards", type=int, default=8)
+    parser.add_argument("--compression", choices=["GZIP", "ZLIB", ""], default="GZIP")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    input_files = glob.glob(args.input)
+    if not input_files:
+        raise FileNotFoundError(f"No processed files match {args.input}")
+    convert_to_tfrecord(
+        input_files,
+        args.output_prefix,
+        window=args.window,
+        horizon=args.horizon,
+        target=args.target,
+        feature_columns=args.features.split(",") if args.features else None,
+        num_shards=args.shards,
+        compression=args.compression,
+        workers=args.workers,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,52 +1,251 @@
+"""
+Chunked training-data preparation.
+
+Each raw CSV is streamed in chunks twice, never loaded whole and never
+written out as intermediate CSVs:
+
+1. Stats pass: parse the `Rows` column, drop duplicate rows (by row hash),
+   partial_fit a StandardScaler and keep a bounded uniform sample of each
+   numeric column for its median.
+2. Write pass: re-read, apply the same duplicate mask, fill missing
+   numeric values with the sampled medians, scale, and append to a zstd
+   Parquet file.
+
+Two passes are needed because the first written row already depends on
+the whole file: its missing values take the file's medians and its scaling
+takes the file's mean and variance.
+
+The medians are approximate once a column has more than MEDIAN_SAMPLE_SIZE
+values. In quantile terms the sample's median has a standard error of
+0.5/sqrt(MEDIAN_SAMPLE_SIZE) around the true median, about 0.16% at the
+default. Smaller columns get the exact median.
+
+Files are processed in parallel, one per worker process, and each file's
+fitted scaler is saved next to its output.
+
+    python -m app.ml_models.utils.data_processing --workers 4
+"""
+import argparse
 import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import joblib
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from sklearn.preprocessing import StandardScaler
 from app.utils.logging import logger
 
 RAW_PATH = "app/ml_models/data/raw"
-CLEANED_PATH = "app/ml_models/data/cleaned"
 PROCESSED_PATH = "app/ml_models/data/processed"
 
-os.makedirs(CLEANED_PATH, exist_ok=True)
-os.makedirs(PROCESSED_PATH, exist_ok=True)
-
-
-# Clean raw data by removing duplicates and filling missing values.
-def clean_data(input_csv, output_csv):
-    df = pd.read_csv(input_csv)
-
-    df = df.drop_duplicates()
-    df.fillna(df.median(), inplace=True)
-
-    df.to_csv(output_csv, index=False)
-    logger.info(f"Cleaned data saved to {output_csv}")
-
-
-# Preprocesses data by scaling all numeric columns
-def preprocess_data(csv_path, output_path):
-    df = pd.read_csv(csv_path)
-
+CHUNK_SIZE = 100_000
+# Values kept per column to estimate its median
+MEDIAN_SAMPLE_SIZE = 100_000
+# Fields of the dict literal stored in the raw `Rows` column
+ROW_FIELDS = {"EffectiveTime": "str", "FieldName": "str", "Region": "str", "Value": "float"}
+# Columns passed through unscaled
+LABEL_COLUMNS = ("Status",)
+
+
+def parse_rows_column(rows: pd.Series, fields: Dict[str, str] = ROW_FIELDS) -> pd.DataFrame:
+    """
+    Extract fields from stringified dicts ("{'Value': 1.0, ...}") with one
+    vectorized regex per field instead of literal_eval per row.
+    """
+    rows = rows.astype("string")
+    parsed = {}
+    for name, kind in fields.items():
+        if kind == "float":
+            raw = rows.str.extract(rf"'{name}':\s*([^,}}]+)", expand=False)
+            parsed[name] = pd.to_numeric(raw.str.strip(), errors="coerce")
+        else:
+            parsed[name] = rows.str.extract(rf"'{name}':\s*'([^']*)'", expand=False)
+    return pd.DataFrame(parsed, index=rows.index)
+
+
+def prepare_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Expand the Rows column (if present) into typed columns"""
+    if "Rows" not in chunk:
+        return chunk
+    parsed = parse_rows_column(chunk["Rows"])
+    return pd.concat([chunk.drop(columns=["Rows"]), parsed], axis=1)
+
+
+def numeric_columns(frame: pd.DataFrame) -> List[str]:
+    return [c for c in frame.select_dtypes(include="number").columns if c not in LABEL_COLUMNS]
+
+
+class _SeenHashes:
+    """
+    uint64 hashes of the rows kept so far, for dropping duplicates across
+    chunks: 8 bytes per distinct row (80 MB for 10M rows).
+
+    They are held as a few sorted runs merged like a binary counter (a run
+    absorbs the newer one once that is at least half its size), so each
+    hash is merged O(log n) times rather than re-sorted with every chunk.
+    """
+
+    def __init__(self):
+        self._runs: List[np.ndarray] = []
+
+    def __len__(self) -> int:
+        return sum(len(run) for run in self._runs)
+
+    def _contains(self, hashes: np.ndarray) -> np.ndarray:
+        """Membership of sorted `hashes` (sorted keys make searchsorted cache-friendly)"""
+        found = np.zeros(len(hashes), dtype=bool)
+        for run in self._runs:
+            positions = np.minimum(np.searchsorted(run, hashes), len(run) - 1)
+            found |= run[positions] == hashes
+        return found
+
+    def keep_mask(self, chunk: pd.DataFrame) -> np.ndarray:
+        hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+        unique, first = np.unique(hashes, return_index=True)
+        new = ~self._contains(unique)
+        keep = np.zeros(len(hashes), dtype=bool)
+        keep[first[new]] = True
+
+        if new.any():
+            self._runs.append(unique[new])
+        while len(self._runs) > 1 and 2 * len(self._runs[-1]) >= len(self._runs[-2]):
+            newer = self._runs.pop()
+            # Stable sort of two sorted runs is a linear merge
+            self._runs[-1] = np.sort(np.concatenate([self._runs[-1], newer]), kind="stable")
+        return keep
+
+
+@dataclass
+class _MedianSample:
+    """Bottom-k sample: a uniform sample of fixed size over a stream"""
+
+    size: int = MEDIAN_SAMPLE_SIZE
+    keys: np.ndarray = field(default_factory=lambda: np.empty(0))
+    values: np.ndarray = field(default_factory=lambda: np.empty(0))
+
+    def update(self, values: np.ndarray, rng: np.random.Generator) -> None:
+        values = values[~np.isnan(values)]
+        keys = np.concatenate([self.keys, rng.random(len(values))])
+        values = np.concatenate([self.values, values])
+        if len(keys) > self.size:
+            keep = np.argpartition(keys, self.size)[: self.size]
+            keys, values = keys[keep], values[keep]
+        self.keys, self.values = keys, values
+
+    def median(self) -> float:
+        return float(np.median(self.values)) if len(self.values) else 0.0
+
+
+@dataclass
+class FileStats:
+    columns: List[str]
+    scaler: StandardScaler
+    medians: Dict[str, float]
+    keep_masks: List[bytes]
+    rows_in: int
+    rows_kept: int
+
+
+def _numeric(chunk: pd.DataFrame, columns: List[str]) -> np.ndarray:
+    # A stray non-numeric value must not turn the whole column into strings
+    return chunk[columns].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+
+
+def _read_chunks(path: str, chunk_size: int):
+    for chunk in pd.read_csv(path, chunksize=chunk_size):
+        yield prepare_chunk(chunk)
+
+
+def compute_stats(path: str, chunk_size: int = CHUNK_SIZE, seed: int = 0) -> FileStats:
+    """Stats pass: duplicate masks, an incrementally fitted scaler and medians"""
+    rng = np.random.default_rng(seed)
+    seen = _SeenHashes()
     scaler = StandardScaler()
-    df[df.columns] = scaler.fit_transform(df)
-
-    df.to_csv(output_path, index=False)
-    logger.info(f"Processed data saved to {output_path}")
-
-
-def main():
-    for filename in os.listdir(RAW_PATH):
-        if filename.endswith(".csv"):
-            raw_file = os.path.join(RAW_PATH, filename)
-            cleaned_file = os.path.join(CLEANED_PATH, filename)
-            processed_file = os.path.join(PROCESSED_PATH, filename)
-
-            logger.info(f"Processing file: {raw_file}")
-
-            clean_data(raw_file, cleaned_file)
-
-            preprocess_data(cleaned_file, processed_file)
-
-            logger.info(f"Completed processing for: {filename}\n")
+    samples: Dict[str, _MedianSample] = {}
+    columns: Optional[List[str]] = None
+    keep_masks, rows_in, rows_kept = [], 0, 0
+
+    for chunk in _read_chunks(path, chunk_size):
+        if columns is None:
+            columns = numeric_columns(chunk)
+            samples = {c: _MedianSample() for c in columns}
+        keep = seen.keep_mask(chunk)
+        keep_masks.append(np.packbits(keep).tobytes())
+        rows_in += len(chunk)
+        rows_kept += int(keep.sum())
+
+        values = _numeric(chunk.loc[keep], columns)
+        for i, column in enumerate(columns):
+            samples[column].update(values[:, i], rng)
+        if len(values):
+            # StandardScaler ignores NaNs when fitting
+            scaler.partial_fit(values)
+
+    columns = columns or []
+    return FileStats(
+        columns=columns,
+        scaler=scaler,
+        medians={c: samples[c].median() for c in columns},
+        keep_masks=keep_masks,
+        rows_in=rows_in,
+        rows_kept=rows_kept,
+    )
+
+
+def process_file(raw_file: str, output_file: str, chunk_size: int = CHUNK_SIZE) -> dict:
+    """Clean, scale and write one raw CSV to Parquet in bounded memory"""
+    stats = compute_stats(raw_file, chunk_size)
+    writer: Optional[pq.ParquetWriter] = None
+
+    try:
+        for chunk, packed in zip(_read_chunks(raw_file, chunk_size), stats.keep_masks):
+            keep = np.unpackbits(np.frombuffer(packed, dtype=np.uint8), count=len(chunk)).astype(bool)
+            chunk = chunk.loc[keep]
+            if stats.columns and len(chunk) and hasattr(stats.scaler, "n_samples_seen_"):
+                values = _numeric(chunk, stats.columns)
+                medians = np.array([stats.medians[c] for c in stats.columns])
+                values = np.where(np.isnan(values), medians, values)
+                chunk = chunk.copy()
+                chunk[stats.columns] = stats.scaler.transform(values)
+
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(output_file, table.schema, compression="zstd")
+            writer.write_table(table.cast(writer.schema))
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if stats.columns:
+        joblib.dump(stats.scaler, f"{os.path.splitext(output_file)[0]}.scaler.joblib")
+
+    logger.info(f"Processed {raw_file}: kept {stats.rows_kept} of {stats.rows_in} rows -> {output_file}")
+    return {"file": raw_file, "rows_in": stats.rows_in, "rows_kept": stats.rows_kept}
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Prepare raw CSVs for training")
+    parser.add_argument("--raw-path", default=RAW_PATH)
+    parser.add_argument("--output-path", default=PROCESSED_PATH)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.output_path, exist_ok=True)
+    jobs = [
+        (os.path.join(args.raw_path, name), os.path.join(args.output_path, name.replace(".csv", ".parquet")))
+        for name in sorted(os.listdir(args.raw_path))
+        if name.endswith(".csv")
+    ]
+    logger.info(f"Processing {len(jobs)} files with {args.workers} workers")
+
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = [executor.submit(process_file, raw, output, args.chunk_size) for raw, output in jobs]
+        return [future.result() for future in futures]
 
 
 if __name__ == "__main__":
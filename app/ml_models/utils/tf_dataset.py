@@ -0,0 +1,73 @@
+"""
+tf.data input pipeline for the sharded TFRecords written by
+convert_to_tfrecord.
+
+Shards are read concurrently with interleave, serialized records are
+cached (in memory, or on disk with `cache_path`) before shuffling, and
+whole batches are decoded with one vectorized parse_example call in
+parallel, then prefetched so the model never waits on input.
+
+    train = make_dataset("app/ml_models/data/tfrecord/train", batch_size=512)
+    model.fit(train, epochs=10)
+"""
+import json
+import os
+from typing import Optional
+
+import tensorflow as tf
+
+AUTOTUNE = tf.data.AUTOTUNE
+
+
+def load_meta(prefix: str) -> dict:
+    with open(f"{prefix}.meta.json") as f:
+        return json.load(f)
+
+
+def make_dataset(
+    prefix: str,
+    batch_size: int = 256,
+    training: bool = True,
+    shuffle_buffer: int = 10_000,
+    cache: bool = True,
+    cache_path: Optional[str] = None,
+) -> tf.data.Dataset:
+    """
+    Batched (sequence [batch, window, n_features], label [batch]) pairs.
+
+    In training mode shard order and records are shuffled and the last
+    partial batch is dropped; otherwise order is deterministic.
+    """
+    meta = load_meta(prefix)
+    window, n_features = meta["window"], len(meta["feature_columns"])
+    directory = os.path.dirname(prefix)
+    files = [os.path.join(directory, shard) for shard in meta["shards"]]
+
+    dataset = tf.data.Dataset.from_tensor_slices(files)
+    if training:
+        dataset = dataset.shuffle(len(files))
+    dataset = dataset.interleave(
+        lambda path: tf.data.TFRecordDataset(path, compression_type=meta["compression"]),
+        cycle_length=min(len(files), os.cpu_count() or 1),
+        num_parallel_calls=AUTOTUNE,
+        deterministic=not training,
+    )
+    if cache:
+        dataset = dataset.cache(cache_path or "")
+    if training:
+        dataset = dataset.shuffle(shuffle_buffer, reshuffle_each_iteration=True)
+
+    spec = {
+        "sequence": tf.io.FixedLenFeature([window * n_features], tf.float32),
+        "label": tf.io.FixedLenFeature([], tf.float32),
+    }
+
+    def parse_batch(records):
+        parsed = tf.io.parse_example(records, spec)
+        return tf.reshape(parsed["sequence"], [-1, window, n_features]), parsed["label"]
+
+    return (
+        dataset.batch(batch_size, drop_remainder=training)
+        .map(parse_batch, num_parallel_calls=AUTOTUNE, deterministic=not training)
+        .prefetch(AUTOTUNE)
+    )
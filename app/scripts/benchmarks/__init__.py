@@ -0,0 +1,20 @@
+"""
+Standalone performance benchmarks, run as modules:
+
+    python -m app.scripts.benchmarks.features
+
+The end-to-end suite with stored results and regression checks is
+app.scripts.benchmarks.suite.
+"""
+import time
+from typing import Callable, Tuple
+
+
+def timed(func: Callable, repeat: int = 5) -> Tuple[float, object]:
+    """Best wall-clock time in seconds over `repeat` runs, and the last result"""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
@@ -0,0 +1,62 @@
+"""
+Time bid-curve construction for a synthetic fleet over one day of
+half-hour settlement periods.
+
+    python -m app.scripts.benchmarks.bidding --units 500 --steps 16
+"""
+import argparse
+
+import numpy as np
+
+from app.database.models import MarketTypeEnum
+from app.scripts.benchmarks import timed
+from app.services.bidding_service import PERIODS_PER_DAY, Fleet, MarketInputs, build_bid_curves
+
+
+def synthetic_fleet(units: int, seed: int = 0) -> Fleet:
+    """Mixed fleet of cheap baseload through to expensive peakers"""
+    rng = np.random.default_rng(seed)
+    return Fleet(
+        unit_ids=[f"U{i:04d}" for i in range(units)],
+        marginal_cost=rng.uniform(20, 250, units),
+        quadratic_cost=rng.uniform(0, 0.05, units),
+        capacity_mw=rng.choice([10.0, 50.0, 100.0, 250.0, 400.0], units),
+    )
+
+
+def synthetic_inputs(market_type: MarketTypeEnum, periods: int = PERIODS_PER_DAY, seed: int = 0) -> MarketInputs:
+    """Twin-peaked daily price shape with imbalance noise"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(periods) / periods
+    price = 110 + 40 * np.sin(2 * np.pi * (t - 0.3)) + 30 * np.exp(-((t - 0.75) ** 2) / 0.005)
+    imbalance = rng.normal(0, 200, periods)
+    return MarketInputs(
+        market_type=market_type,
+        period_start=np.datetime64("2025-01-01T00:00:00") + np.arange(periods) * np.timedelta64(30, "m"),
+        price_mean=price,
+        price_sigma=15 * (1 + np.abs(imbalance) / 500),
+        imbalance_mw=imbalance,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--units", type=int, default=500)
+    parser.add_argument("--periods", type=int, default=PERIODS_PER_DAY)
+    parser.add_argument("--steps", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    fleet = synthetic_fleet(args.units)
+    for market in MarketTypeEnum:
+        inputs = synthetic_inputs(market, args.periods)
+        seconds, curves = timed(lambda: build_bid_curves(inputs, fleet, n_steps=args.steps), args.repeat)
+        points = curves.quantities.size
+        print(
+            f"{market.value}: {args.units} units x {args.periods} periods x {args.steps} steps "
+            f"in {seconds * 1000:.1f} ms ({points / seconds:,.0f} curve points/s)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Time the feature engine over a year of synthetic 15-minute history.
+
+    python -m app.scripts.benchmarks.features --days 365
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from app.feature_engineering.engine import FEATURE_REGISTRY, FREQ, build_features
+from app.scripts.benchmarks import timed
+
+
+def synthetic_history(days: int, seed: int = 0) -> pd.DataFrame:
+    """Demand, wind and hourly temperature with daily/weekly shape and noise"""
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2024-01-01", periods=days * 96, freq=FREQ)
+    t = np.arange(len(index))
+    demand = (
+        4000
+        + 800 * np.sin(2 * np.pi * (t % 96) / 96 - np.pi / 2)
+        - 300 * (index.dayofweek >= 5)
+        + rng.normal(0, 100, len(index))
+    )
+    wind = np.clip(1500 + np.cumsum(rng.normal(0, 20, len(index))), 0, 4500)
+    temperature = pd.Series(
+        10 + 6 * np.sin(2 * np.pi * t / (365.25 * 96)) + rng.normal(0, 1, len(index)), index=index
+    ).resample("h").mean()
+    history = pd.DataFrame(
+        {"demand": demand, "wind_actual": wind, "wind_forecast": wind + rng.normal(0, 50, len(index))},
+        index=index,
+    )
+    return history.join(temperature.rename("temperature"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    history = synthetic_history(args.days)
+    groups = tuple(FEATURE_REGISTRY)  # temperature included, since the history has it
+    seconds, features = timed(lambda: build_features(history, history.index, groups), args.repeat)
+    print(
+        f"{len(features):,} rows x {features.shape[1]} features in {seconds * 1000:.1f} ms "
+        f"({len(features) / seconds:,.0f} rows/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Cold-start import time per Lambda handler (and the API app).
+
+Each handler is imported in a fresh interpreter, `--repeat` times, and the
+median wall time of the import is reported. `--profile` also prints the
+heaviest modules from `python -X importtime` for each handler.
+
+    python -m app.scripts.benchmarks.imports --repeat 5 --profile 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+HANDLERS = {
+    "prediction": "app.lambda.forecast.prediction_handler",
+    "feature": "app.lambda.forecast.feature_handler",
+    "feature_trigger": "app.lambda.forecast.feature_trigger",
+    "forecast": "app.lambda.forecast.forecast_handler",
+    "eirgrid_scraper": "app.data_sources.eirgrid_scraper",
+    "api": "app.main",
+}
+
+_TIMER = (
+    "import importlib, time; started = time.perf_counter(); "
+    "importlib.import_module({module!r}); print(time.perf_counter() - started)"
+)
+
+
+def _env() -> Dict[str, str]:
+    # Mimic a Lambda init: no .env, no database configured at import
+    env = dict(os.environ)
+    env.pop("DATABASE_URL", None)
+    env.setdefault("AWS_DEFAULT_REGION", "eu-west-1")
+    return env
+
+
+def import_seconds(module: str, repeat: int = 5) -> float:
+    """Median cold import time of a module, each run in a new interpreter"""
+    times = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", _TIMER.format(module=module)],
+            capture_output=True, text=True, env=_env(), check=True,
+        )
+        times.append(float(result.stdout.strip().splitlines()[-1]))
+    return statistics.median(times)
+
+
+def heaviest_imports(module: str, top: int = 10) -> List[Tuple[str, int, int]]:
+    """(module, self us, cumulative us) for the slowest imports, from -X importtime"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import importlib; importlib.import_module({module!r})"],
+        capture_output=True, text=True, env=_env(), check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return sorted(rows, key=lambda row: row[2], reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--profile", type=int, default=0, metavar="N", help="show the N heaviest imports")
+    parser.add_argument("--handlers", default=",".join(HANDLERS))
+    args = parser.parse_args()
+
+    for name in args.handlers.split(","):
+        module = HANDLERS[name]
+        try:
+            seconds = import_seconds(module, args.repeat)
+        except subprocess.CalledProcessError as e:
+            print(f"{name:16s} import failed: {e.stderr.strip().splitlines()[-1]}")
+            continue
+        print(f"{name:16s} {seconds * 1000:8.1f} ms  ({module})")
+        for row_name, self_us, cumulative_us in heaviest_imports(module, args.profile) if args.profile else []:
+            print(f"    {cumulative_us / 1000:8.1f} ms cumulative  {self_us / 1000:6.1f} ms self  {row_name}")
+
+
+if __name__ == "__main__":
+    main()
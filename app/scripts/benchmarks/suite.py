@@ -0,0 +1,522 @@
+"""
+End-to-end benchmark suite: ingestion, features, persistence, training
+data and the prediction API, at data scales from a day to five years.
+
+Everything runs offline:
+- SQLite in a temporary directory, or --database-url for a local Postgres.
+- A local directory standing in for S3.
+- A stub HTTP server standing in for the EirGrid API.
+- A temporary Parquet store.
+
+Each run writes a JSON results file (git commit, machine, per-scenario
+timings) to --results-dir and compares it with the previous run there, or
+with --baseline. Scenarios slower by more than --threshold are reported as
+regressions, and --fail-on-regression makes that a non-zero exit.
+
+Scenarios use the same `timed` helper as the other scripts in this package
+rather than pytest-benchmark or asv. That keeps the suite dependency-free, and
+the results files and regression check above cover what those tools would
+provide.
+
+    python -m app.scripts.benchmarks.suite --scales day,month,year
+    python -m app.scripts.benchmarks.suite --scales 5y --only db. --database-url postgresql://localhost/bench
+"""
+import argparse
+import glob
+import io
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from app.scripts.benchmarks import timed
+
+SCALES = {"day": 1, "week": 7, "month": 30, "year": 365, "5y": 1826}
+RESULTS_DIR = ".benchmarks"
+DEFAULT_THRESHOLD = 0.2
+START = datetime(2024, 1, 1)
+SOURCE = "BENCH"
+
+# name -> setup(ctx) returning (function to time, items it processes)
+SCENARIOS: Dict[str, Callable[["BenchContext"], Tuple[Callable[[], object], int]]] = {}
+
+
+def scenario(name: str):
+    def decorator(func):
+        SCENARIOS[name] = func
+        return func
+
+    return decorator
+
+
+class LocalS3:
+    """The part of the boto3 S3 client the scrapers use, backed by a directory"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, bucket: str, key: str) -> str:
+        return os.path.join(self.root, bucket, key)
+
+    def put_object(self, Bucket: str, Key: str, Body, **kwargs) -> dict:
+        path = self._path(Bucket, Key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(Body.encode() if isinstance(Body, str) else Body)
+        return {}
+
+    def get_object(self, Bucket: str, Key: str) -> dict:
+        with open(self._path(Bucket, Key), "rb") as f:
+            return {"Body": io.BytesIO(f.read())}
+
+
+def _eirgrid_rows(day: date, field: str = "VALUE") -> List[dict]:
+    times = [datetime(day.year, day.month, day.day) + timedelta(minutes=15 * i) for i in range(96)]
+    return [
+        {"EffectiveTime": t.strftime("%d-%b-%Y %H:%M:%S"), "FieldName": field, "Region": "ALL", "Value": 4000.0 + i}
+        for i, t in enumerate(times)
+    ]
+
+
+class _EirGridStub(BaseHTTPRequestHandler):
+    """One day of 15-minute rows for whatever area and date are asked for"""
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        day = datetime.strptime(query["date"][0], "%d %b %Y").date()
+        body = json.dumps({"Rows": _eirgrid_rows(day, query["area"][0].upper())}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@dataclass
+class BenchContext:
+    workdir: str
+    days: int
+    eirgrid_url: str
+    s3: LocalS3
+
+    @property
+    def start(self) -> datetime:
+        return START
+
+    @property
+    def end(self) -> datetime:
+        return START + timedelta(days=self.days)
+
+    def quarter_hours(self) -> np.ndarray:
+        return np.datetime64(START, "us") + np.arange(self.days * 96) * np.timedelta64(15, "m")
+
+    def session(self):
+        from app.database.database import SessionLocal
+
+        return SessionLocal()
+
+
+_api_client = None
+
+
+def api_client():
+    """One API test client per run: the prediction batcher is bound to its event loop"""
+    global _api_client
+    if _api_client is None:
+        from fastapi.testclient import TestClient
+
+        from app.main import app
+
+        _api_client = TestClient(app)
+        _api_client.__enter__()
+    return _api_client
+
+
+@scenario("ingest.eirgrid_backfill")
+def bench_eirgrid_backfill(ctx: BenchContext):
+    from app.data_sources import eirgrid_scraper
+
+    eirgrid_scraper.EIRGRID_API_URL = ctx.eirgrid_url
+    eirgrid_scraper._s3_clients["eu-west-1"] = ctx.s3
+    end = ctx.start.date() + timedelta(days=ctx.days - 1)
+    return (
+        lambda: eirgrid_scraper.backfill("bench", ctx.start.date(), end),
+        ctx.days * len(eirgrid_scraper.ENDPOINTS),
+    )
+
+
+@scenario("ingest.semo_parse_store")
+def bench_semo(ctx: BenchContext):
+    from app.data_sources.semo_scraper import parse_items, store_prices
+
+    # BM-025 publishes 5-minute imbalance prices
+    times = np.datetime64(ctx.start, "s") + np.arange(ctx.days * 288) * np.timedelta64(5, "m")
+    items = [
+        {"StartTime": f"{t}Z", "ImbalancePriceAmountEUR": str(100 + i % 50)}
+        for i, t in enumerate(times.astype(str))
+    ]
+
+    def run():
+        db = ctx.session()
+        try:
+            written = store_prices(db, parse_items(items, "ImbalancePriceAmountEUR", "BM-025"), "SEMO-BM025")
+            db.commit()
+            return written
+        finally:
+            db.close()
+
+    return run, len(items)
+
+
+@scenario("features.build")
+def bench_build_features(ctx: BenchContext):
+    from app.feature_engineering.engine import build_features
+    from app.scripts.benchmarks.features import synthetic_history
+
+    history = synthetic_history(ctx.days)
+    return lambda: build_features(history, history.index), len(history)
+
+
+@scenario("features.next_24h")
+def bench_next_24h(ctx: BenchContext):
+    from app.data_sources.parquet_store import EIRGRID_DATASET, eirgrid_payload_to_table, write_table
+    from app.feature_engineering.demand_features import HISTORY_DAYS, generate_features_for_next_24h
+
+    # Fixed size: the live path always reads HISTORY_DAYS of stored history
+    now = ctx.start + timedelta(days=HISTORY_DAYS)
+    for offset in range(HISTORY_DAYS + 1):
+        day = (ctx.start + timedelta(days=offset)).date()
+        payload = {label: {"Rows": _eirgrid_rows(day)} for label in ("demand", "wind_actual", "wind_forecast")}
+        write_table(eirgrid_payload_to_table(payload), EIRGRID_DATASET)
+    return lambda: generate_features_for_next_24h(now), 24
+
+
+def _forecast_rows(ctx: BenchContext):
+    from app.database.models import MarketTypeEnum
+
+    values = 4000 + 500 * np.sin(np.arange(ctx.days * 96) / 96 * 2 * np.pi)
+    return [
+        (t, MarketTypeEnum.DAM, v, SOURCE, "ALL")
+        for t, v in zip(ctx.quarter_hours().tolist(), values.tolist())
+    ]
+
+
+@scenario("db.write_forecasts")
+def bench_write_forecasts(ctx: BenchContext):
+    from app.database.models import ForecastTypeEnum
+    from app.ml_models.inference.predict import PredictionService
+
+    rows = _forecast_rows(ctx)
+
+    def run():
+        db = ctx.session()
+        try:
+            return PredictionService(db).create_forecasts(ForecastTypeEnum.DEMAND, rows)
+        finally:
+            db.close()
+
+    return run, len(rows)
+
+
+@scenario("db.read_forecasts")
+def bench_read_forecasts(ctx: BenchContext):
+    from app.database.models import ForecastTypeEnum, MarketTypeEnum
+    from app.ml_models.inference.predict import PredictionService
+
+    n_rows = ctx.days * 96
+
+    def run():
+        db = ctx.session()
+        try:
+            return PredictionService(db).get_forecasts(
+                ForecastTypeEnum.DEMAND, MarketTypeEnum.DAM, "ALL", SOURCE, ctx.start, ctx.end, limit=n_rows
+            )
+        finally:
+            db.close()
+
+    return run, n_rows
+
+
+@scenario("db.update_actuals")
+def bench_update_actuals(ctx: BenchContext):
+    import pandas as pd
+
+    from app.database.models import ForecastTypeEnum, MarketTypeEnum
+    from app.ml_models.inference.predict import PredictionService
+
+    times = ctx.quarter_hours()
+    actuals = pd.DataFrame({"forecast_time": times, "value": 4000 + np.random.default_rng(0).normal(0, 100, len(times))})
+
+    def run():
+        db = ctx.session()
+        try:
+            return PredictionService(db).update_actual_values_bulk(ForecastTypeEnum.DEMAND, actuals, MarketTypeEnum.DAM)
+        finally:
+            db.close()
+
+    return run, len(actuals)
+
+
+@scenario("db.evaluate")
+def bench_evaluate(ctx: BenchContext):
+    from app.database.models import ForecastTypeEnum
+    from app.ml_models.inference.predict import PredictionService
+
+    def run():
+        db = ctx.session()
+        try:
+            return PredictionService(db).evaluate_forecasts(ForecastTypeEnum.DEMAND, ctx.start, ctx.end)
+        finally:
+            db.close()
+
+    return run, ctx.days * 96
+
+
+@scenario("training.tfrecord")
+def bench_tfrecord(ctx: BenchContext):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    try:
+        import tensorflow  # noqa: F401
+    except ImportError:
+        return None, 0
+    from app.ml_models.utils.convert_to_tfrecord import convert_to_tfrecord
+
+    rng = np.random.default_rng(0)
+    n_rows = ctx.days * 96
+    path = os.path.join(ctx.workdir, "processed.parquet")
+    pq.write_table(
+        pa.table({**{f"f{i}": rng.normal(size=n_rows) for i in range(8)}, "Value": rng.normal(size=n_rows)}),
+        path,
+    )
+    prefix = os.path.join(ctx.workdir, "tfrecord", "train")
+    return lambda: convert_to_tfrecord([path], prefix, window=24, num_shards=4, workers=1), n_rows
+
+
+@scenario("training.csv_tfrecord")
+def bench_csv_tfrecord(ctx: BenchContext):
+    try:
+        import tensorflow  # noqa: F401
+    except ImportError:
+        return None, 0
+    from app.ml_models.utils.convert_to_tfrecord import convert_csv_to_tfrecord
+
+    times = ctx.quarter_hours().astype(datetime)
+    values = 4000.0 + np.random.default_rng(0).normal(scale=100.0, size=len(times))
+    path = os.path.join(ctx.workdir, "raw.csv")
+    with open(path, "w") as f:
+        f.write("Rows,Status\n")
+        f.writelines(
+            f"\"{{'EffectiveTime': '{t:%d-%b-%Y %H:%M:%S}', 'Value': {v:.3f}}}\",Success\n"
+            for t, v in zip(times, values)
+        )
+    output = os.path.join(ctx.workdir, "raw.tfrecord")
+    return lambda: convert_csv_to_tfrecord(path, output), len(times)
+
+
+@scenario("api.predict")
+def bench_api_predict(ctx: BenchContext):
+    # Fixed size: single-row request latency does not depend on data scale
+    requests = 200
+    client = api_client()
+    row = np.random.default_rng(0).normal(size=_N_MODEL_FEATURES).tolist()
+
+    def run():
+        for _ in range(requests):
+            client.post("/api/forecast/forecast/predict", json=row).raise_for_status()
+
+    return run, requests
+
+
+@scenario("api.predict_batch")
+def bench_api_predict_batch(ctx: BenchContext):
+    client = api_client()
+    rows = np.random.default_rng(0).normal(size=(ctx.days * 96, _N_MODEL_FEATURES)).tolist()
+    return lambda: client.post("/api/forecast/forecast/predict_batch", json=rows).raise_for_status(), len(rows)
+
+
+_N_MODEL_FEATURES = 8
+
+
+def _prepare_environment(workdir: str, database_url: Optional[str]) -> None:
+    """Point the app at throwaway storage; must run before app modules are imported"""
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    os.environ["DATABASE_URL"] = database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["PARQUET_BASE_URI"] = os.path.join(workdir, "parquet")
+    os.environ["MODEL_DIR"] = os.path.join(workdir, "models")
+    os.environ.pop("REDIS_URL", None)
+    os.environ.pop("MODEL_S3_BUCKET", None)
+    os.environ.pop("S3_BUCKET_NAME", None)
+
+
+def _prepare_database_and_model(workdir: str) -> None:
+    import joblib
+    from sklearn.linear_model import LinearRegression
+
+    import app.database.models  # noqa: F401  (registers the tables)
+    from app.database.database import Base, get_engine
+    from app.ml_models.config import DEFAULT_MODEL_NAME, MODEL_DIR
+
+    Base.metadata.create_all(get_engine())
+    rng = np.random.default_rng(0)
+    features = rng.normal(size=(256, _N_MODEL_FEATURES))
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    joblib.dump(
+        LinearRegression().fit(features, features.sum(axis=1)),
+        os.path.join(MODEL_DIR, f"{DEFAULT_MODEL_NAME}.pkl"),
+    )
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_suite(
+    scales: List[str],
+    only: Optional[List[str]] = None,
+    repeat: int = 3,
+    database_url: Optional[str] = None,
+) -> dict:
+    """Run the selected scenarios at each scale; returns the results document"""
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    _prepare_environment(workdir, database_url)
+    _prepare_database_and_model(workdir)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _EirGridStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    eirgrid_url = f"http://127.0.0.1:{server.server_address[1]}/api/graph-data"
+    s3 = LocalS3(os.path.join(workdir, "s3"))
+
+    names = [name for name in SCENARIOS if not only or any(name.startswith(prefix) for prefix in only)]
+    results = []
+    try:
+        for scale in scales:
+            ctx = BenchContext(workdir, SCALES[scale], eirgrid_url, s3)
+            for name in names:
+                func, items = SCENARIOS[name](ctx)
+                if func is None:
+                    print(f"{name:28s} {scale:6s} skipped (dependency not installed)")
+                    continue
+                seconds, _ = timed(func, repeat)
+                results.append(
+                    {
+                        "scenario": name,
+                        "scale": scale,
+                        "days": ctx.days,
+                        "items": items,
+                        "seconds": seconds,
+                        "items_per_second": items / seconds if seconds else None,
+                    }
+                )
+                print(f"{name:28s} {scale:6s} {seconds * 1000:10.1f} ms  {items / seconds:14,.0f} items/s")
+    finally:
+        server.shutdown()
+        if _api_client is not None:
+            _api_client.__exit__(None, None, None)
+
+    return {
+        "commit": _git_commit(),
+        "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "database": os.environ["DATABASE_URL"].split(":", 1)[0],
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> List[dict]:
+    """Scenarios present in both runs, with their slowdown ratio and whether it regressed"""
+    previous = {(r["scenario"], r["scale"]): r["seconds"] for r in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        before = previous.get((result["scenario"], result["scale"]))
+        if not before:
+            continue
+        ratio = result["seconds"] / before
+        rows.append(
+            {
+                "scenario": result["scenario"],
+                "scale": result["scale"],
+                "before": before,
+                "after": result["seconds"],
+                "ratio": ratio,
+                "regression": ratio > 1 + threshold,
+            }
+        )
+    return rows
+
+
+def latest_results(results_dir: str) -> Optional[str]:
+    paths = sorted(glob.glob(os.path.join(results_dir, "*.json")))
+    return paths[-1] if paths else None
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default="day,month", help=f"comma-separated, from {', '.join(SCALES)}")
+    parser.add_argument("--only", default=None, help="comma-separated scenario name prefixes, e.g. db.,api.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--database-url", default=None, help="default: SQLite in a temporary directory")
+    parser.add_argument("--results-dir", default=RESULTS_DIR)
+    parser.add_argument("--baseline", default=None, help="results file to compare with (default: the latest)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown, 0.2 = 20%%")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+
+    scales = args.scales.split(",")
+    unknown = [scale for scale in scales if scale not in SCALES]
+    if unknown:
+        parser.error(f"unknown scales {unknown}; choose from {list(SCALES)}")
+
+    baseline_path = args.baseline or latest_results(args.results_dir)
+    current = run_suite(scales, args.only.split(",") if args.only else None, args.repeat, args.database_url)
+
+    os.makedirs(args.results_dir, exist_ok=True)
+    path = os.path.join(
+        args.results_dir, f"{current['created_at'].replace(':', '').replace('-', '')}-{current['commit']}.json"
+    )
+    with open(path, "w") as f:
+        json.dump(current, f, indent=2)
+    print(f"Results written to {path}")
+
+    if not baseline_path:
+        return current
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    rows = compare(current, baseline, args.threshold)
+    print(f"Compared with {baseline_path} (commit {baseline.get('commit')}):")
+    for row in rows:
+        flag = "REGRESSION" if row["regression"] else ""
+        print(
+            f"  {row['scenario']:28s} {row['scale']:6s} {row['before'] * 1000:10.1f} -> "
+            f"{row['after'] * 1000:10.1f} ms  x{row['ratio']:.2f} {flag}"
+        )
+    if args.fail_on_regression and any(row["regression"] for row in rows):
+        sys.exit(1)
+    return current
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,12 @@
+import argparse
 import boto3
 import os
+from datetime import date, datetime, timedelta
+from typing import Optional
 from dotenv import load_dotenv
 
+from app.data_sources.raw_store import Manifest, discover_new_objects, download_objects
+
 load_dotenv()
 
 BUCKET_NAME = os.getenv("S3_BUCKET_NAME")
@@ -10,21 +15,74 @@ if not BUCKET_NAME:
 
 PREFIX = "raw/"
 LOCAL_DIR = os.path.join("app", "data", "raw")
+MANIFEST_PATH = os.path.join(LOCAL_DIR, ".manifest.json")
+
+# First partition listed when there is no manifest yet
+DEFAULT_START = date(2024, 1, 1)
+
 
-def download_s3_files():
+def download_s3_files(start: Optional[date] = None, end: Optional[date] = None, max_workers: int = 8):
+    """
+    Download raw JSON objects that are new or changed since the last run.
+
+    `start` rescans partitions from that day instead of the saved watermark;
+    `end` stops at that day instead of today.
+    """
     s3 = boto3.client("s3")
 
     if not os.path.exists(LOCAL_DIR):
         os.makedirs(LOCAL_DIR)
 
-    response = s3.list_objects_v2(Bucket=BUCKET_NAME, Prefix=PREFIX)
-    for obj in response.get("Contents", []):
-        key = obj["Key"]
-        filename = os.path.basename(key)
-        local_path = os.path.join(LOCAL_DIR, filename)
+    manifest = Manifest.load_file(MANIFEST_PATH)
+    new_objects = discover_new_objects(
+        s3, BUCKET_NAME, manifest, default_start=DEFAULT_START, start_day=start, end_day=end, prefix=PREFIX
+    )
+    print(f"Downloading {len(new_objects)} new objects to {LOCAL_DIR}")
+
+    download_objects(s3, BUCKET_NAME, new_objects, LOCAL_DIR, max_workers=max_workers)
+
+    manifest.mark(new_objects)
+    manifest.save_file(MANIFEST_PATH)
+
+
+def download_dataset(dataset: str, start: date, end: date, columns: Optional[list] = None) -> str:
+    """
+    Pull a date range of a Parquet dataset from S3 into one local file.
+
+    Only the partitions in [start, end] and the requested columns are read.
+    """
+    from app.data_sources.parquet_store import read_table
+    import pyarrow.parquet as pq
 
-        print(f"Downloading {key} to {local_path}")
-        s3.download_file(BUCKET_NAME, key, local_path)
+    table = read_table(
+        dataset,
+        start=datetime.combine(start, datetime.min.time()),
+        end=datetime.combine(end + timedelta(days=1), datetime.min.time()),
+        columns=columns,
+    )
+    local_dir = os.path.join("app", "data", "parquet")
+    os.makedirs(local_dir, exist_ok=True)
+    local_path = os.path.join(local_dir, f"{dataset}_{start:%Y%m%d}_{end:%Y%m%d}.parquet")
+    pq.write_table(table, local_path, compression="zstd")
+    print(f"Wrote {table.num_rows} {dataset} rows to {local_path}")
+    return local_path
 
 if __name__ == "__main__":
-    download_s3_files()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Download raw market data from S3")
+    parser.add_argument("--start", type=date.fromisoformat, default=None)
+    parser.add_argument("--end", type=date.fromisoformat, default=None)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument(
+        "--dataset", default=None, help="Read this Parquet dataset (e.g. eirgrid) instead of raw JSON"
+    )
+    parser.add_argument("--columns", default=None, help="Comma-separated columns to project")
+    args = parser.parse_args()
+    if args.dataset:
+        download_dataset(
+            args.dataset,
+            args.start or DEFAULT_START,
+            args.end or date.today(),
+            args.columns.split(",") if args.columns else None,
+        )
+    else:
+        download_s3_files(args.start, args.end, args.workers)
@@ -0,0 +1,151 @@
+"""
+Minimal HTTP load generator for the API.
+
+Keeps `--concurrency` requests in flight against a URL for `--duration`
+seconds and reports throughput and latency percentiles. `--vary` adds a
+changing query parameter so every request misses the response cache and
+exercises the database path.
+
+    uvicorn app.main:app --port 8000 &
+    python -m app.scripts.load_test http://localhost:8000/api/forecast/forecasts/DEMAND \\
+        --concurrency 64 --duration 10 --vary limit
+
+With `--serve-workers` the script starts the production server itself
+(gunicorn.conf.py) once per worker count, waits for /ready, runs the test
+against the given path and reports throughput per worker:
+
+    python -m app.scripts.load_test /api/forecast/forecasts/DEMAND --serve-workers 1,2,4
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import signal
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+import httpx
+import numpy as np
+
+
+async def _worker(client: httpx.AsyncClient, url: str, deadline: float, vary: Optional[str], counter, latencies: List[float], errors: List[int]):
+    while time.perf_counter() < deadline:
+        params = {vary: 1 + next(counter) % 1000} if vary else None
+        started = time.perf_counter()
+        try:
+            response = await client.get(url, params=params)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+        except httpx.HTTPError:
+            errors.append(0)
+        latencies.append(time.perf_counter() - started)
+
+
+async def run_load_test(url: str, concurrency: int = 32, duration: float = 10.0, vary: Optional[str] = None) -> dict:
+    latencies: List[float] = []
+    errors: List[int] = []
+    counter = itertools.count()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(
+            *(_worker(client, url, deadline, vary, counter, latencies, errors) for _ in range(concurrency))
+        )
+        elapsed = time.perf_counter() - started
+
+    latency_ms = 1000 * np.array(latencies or [0.0])
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "requests_per_second": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(latency_ms, 50)),
+        "p95_ms": float(np.percentile(latency_ms, 95)),
+        "p99_ms": float(np.percentile(latency_ms, 99)),
+    }
+
+
+@contextmanager
+def serve(workers: int, port: int, ready_timeout: float = 120.0) -> Iterator[str]:
+    """Run gunicorn with `workers` workers until the block exits; yields the base URL"""
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), BIND=f"127.0.0.1:{port}")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app.main:app"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + ready_timeout
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"gunicorn exited with {process.returncode}")
+            try:
+                if httpx.get(f"{base_url}/ready", timeout=2).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Server not ready after {ready_timeout:.0f}s")
+            time.sleep(0.5)
+        yield base_url
+    finally:
+        # Graceful shutdown, as in production
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=60)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def run_worker_sweep(
+    path: str, worker_counts: List[int], concurrency: int, duration: float, vary: Optional[str], port: int = 8765
+) -> List[dict]:
+    """Load-test a fresh server per worker count"""
+    results = []
+    for workers in worker_counts:
+        with serve(workers, port) as base_url:
+            result = asyncio.run(run_load_test(base_url + path, concurrency, duration, vary))
+        result["workers"] = workers
+        result["requests_per_second_per_worker"] = result["requests_per_second"] / workers
+        results.append(result)
+    return results
+
+
+def _summary(result: dict) -> str:
+    return (
+        f"{result['requests']} requests, {result['errors']} errors, "
+        f"{result['requests_per_second']:.0f} req/s, "
+        f"p50 {result['p50_ms']:.1f} ms, p95 {result['p95_ms']:.1f} ms, p99 {result['p99_ms']:.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("url")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--vary", default=None, help="query parameter to vary per request (cache-busting)")
+    parser.add_argument(
+        "--serve-workers", default=None, help="comma-separated worker counts to start gunicorn with (url is then a path)"
+    )
+    args = parser.parse_args()
+
+    if args.serve_workers:
+        counts = [int(n) for n in args.serve_workers.split(",")]
+        for result in run_worker_sweep(args.url, counts, args.concurrency, args.duration, args.vary):
+            print(
+                f"{result['workers']} workers: {_summary(result)}, "
+                f"{result['requests_per_second_per_worker']:.0f} req/s per worker"
+            )
+        return
+
+    print(_summary(asyncio.run(run_load_test(args.url, args.concurrency, args.duration, args.vary))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""
+Bid curve construction from stored price and imbalance forecasts.
+
+For each settlement period t the clearing price is treated as
+p ~ N(mu_t, sigma_t^2), with mu_t the latest PRICE forecast for the market
+and sigma_t derived from recent forecast errors and widened by the
+forecast system imbalance. A unit with cost a*q + b*q^2 that trades off
+expected profit against variance with risk aversion lambda offers, at
+price p,
+
+    q(p) = clip((p - a) / (2 * (b + lambda * sigma_t^2)), 0, capacity)
+
+which is monotone in p, so it is a valid price-quantity bid curve. The
+curves are evaluated at K price steps (normal quantiles around mu_t) for
+every unit and period at once as one (units, periods, steps) array;
+expected dispatch and profit come from Gauss-Hermite quadrature over the
+same distribution.
+"""
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from scipy import stats
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.database.models import ImbalanceForecast, MarketTypeEnum, PriceForecast
+from app.utils.metrics import db_operation
+
+logger = logging.getLogger(__name__)
+
+PERIOD = timedelta(minutes=30)
+PERIODS_PER_DAY = 48
+
+# Harmonised price floor/cap per market, EUR/MWh
+MARKET_PRICE_LIMITS = {
+    MarketTypeEnum.DAM: (-500.0, 4000.0),
+    MarketTypeEnum.IDM: (-500.0, 4000.0),
+    MarketTypeEnum.BM: (-1000.0, 10000.0),
+}
+
+DEFAULT_PRICE_STEPS = 16
+DEFAULT_RISK_AVERSION = 0.001
+# Price volatility as a share of the forecast price when no error history exists
+DEFAULT_RELATIVE_SIGMA = 0.15
+MIN_SIGMA = 1.0
+# Each IMBALANCE_SCALE_MW of forecast imbalance adds one more sigma
+IMBALANCE_SCALE_MW = 500.0
+QUADRATURE_POINTS = 24
+
+
+@dataclass
+class Fleet:
+    """Units as parallel arrays: cost a*q + b*q^2 (EUR), capacity in MW"""
+
+    unit_ids: List[str]
+    marginal_cost: np.ndarray  # a, EUR/MWh
+    quadratic_cost: np.ndarray  # b, EUR/MW^2h
+    capacity_mw: np.ndarray
+
+    @classmethod
+    def from_records(cls, units: Sequence[dict]) -> "Fleet":
+        return cls(
+            unit_ids=[str(u["unit_id"]) for u in units],
+            marginal_cost=np.array([u["marginal_cost"] for u in units], dtype=np.float64),
+            quadratic_cost=np.array([u.get("quadratic_cost", 0.0) for u in units], dtype=np.float64),
+            capacity_mw=np.array([u["capacity_mw"] for u in units], dtype=np.float64),
+        )
+
+    def __len__(self) -> int:
+        return len(self.unit_ids)
+
+
+@dataclass
+class MarketInputs:
+    """Per-period price distribution for one market and delivery day"""
+
+    market_type: MarketTypeEnum
+    period_start: np.ndarray  # datetime64[s], (periods,)
+    price_mean: np.ndarray  # NaN where no forecast
+    price_sigma: np.ndarray
+    imbalance_mw: np.ndarray
+
+
+@dataclass
+class BidCurves:
+    market_type: MarketTypeEnum
+    unit_ids: List[str]
+    period_start: np.ndarray  # (periods,)
+    prices: np.ndarray  # (periods, steps), ascending per period
+    quantities: np.ndarray  # (units, periods, steps), MW offered at each price
+    expected_dispatch_mw: np.ndarray  # (units, periods)
+    expected_profit: np.ndarray  # (units, periods), EUR per period
+
+    def to_records(self) -> List[dict]:
+        """One record per unit and period, with the curve as (price, quantity) pairs"""
+        records = []
+        for u, unit_id in enumerate(self.unit_ids):
+            for t, start in enumerate(self.period_start.astype("datetime64[s]").tolist()):
+                if np.isnan(self.prices[t, 0]):
+                    continue
+                records.append(
+                    {
+                        "unit_id": unit_id,
+                        "market_type": self.market_type.value,
+                        "period_start": start,
+                        "curve": list(zip(self.prices[t].tolist(), self.quantities[u, t].tolist())),
+                        "expected_dispatch_mw": float(self.expected_dispatch_mw[u, t]),
+                        "expected_profit": float(self.expected_profit[u, t]),
+                    }
+                )
+        return records
+
+
+def supply_quantity(
+    price: np.ndarray,
+    fleet: Fleet,
+    sigma: np.ndarray,
+    risk_aversion: float,
+) -> np.ndarray:
+    """
+    Risk-adjusted optimal output for each unit at each price.
+
+    `price` has shape (periods, n) and `sigma` (periods,); the result is
+    (units, periods, n).
+    """
+    a = fleet.marginal_cost[:, None, None]
+    curvature = 2 * (fleet.quadratic_cost[:, None, None] + risk_aversion * sigma[None, :, None] ** 2)
+    # A unit with no curvature and no risk term is a pure step at its marginal cost
+    safe_curvature = np.where(curvature > 0, curvature, 1.0)
+    quantity = np.where(
+        curvature > 0,
+        (price[None, :, :] - a) / safe_curvature,
+        np.where(price[None, :, :] >= a, np.inf, 0.0),
+    )
+    return np.clip(quantity, 0.0, fleet.capacity_mw[:, None, None])
+
+
+def price_steps(inputs: MarketInputs, n_steps: int = DEFAULT_PRICE_STEPS) -> np.ndarray:
+    """Prices at evenly spaced normal quantiles around each period's mean, within market limits"""
+    quantiles = (np.arange(n_steps) + 0.5) / n_steps
+    z = stats.norm.ppf(quantiles)
+    floor, cap = MARKET_PRICE_LIMITS[inputs.market_type]
+    prices = inputs.price_mean[:, None] + inputs.price_sigma[:, None] * z[None, :]
+    return np.clip(prices, floor, cap)
+
+
+def build_bid_curves(
+    inputs: MarketInputs,
+    fleet: Fleet,
+    risk_aversion: float = DEFAULT_RISK_AVERSION,
+    n_steps: int = DEFAULT_PRICE_STEPS,
+) -> BidCurves:
+    """Bid curves, expected dispatch and expected profit for every unit and period"""
+    prices = price_steps(inputs, n_steps)
+    quantities = supply_quantity(prices, fleet, inputs.price_sigma, risk_aversion)
+
+    # E[f(p)] for p ~ N(mu, sigma^2) with probabilists' Gauss-Hermite nodes
+    nodes, weights = np.polynomial.hermite_e.hermegauss(QUADRATURE_POINTS)
+    weights = weights / weights.sum()
+    floor, cap = MARKET_PRICE_LIMITS[inputs.market_type]
+    scenario_prices = np.clip(
+        inputs.price_mean[:, None] + inputs.price_sigma[:, None] * nodes[None, :], floor, cap
+    )
+    dispatch = supply_quantity(scenario_prices, fleet, inputs.price_sigma, risk_aversion)
+    hours = PERIOD.total_seconds() / 3600
+    profit = (
+        scenario_prices[None, :, :] * dispatch
+        - fleet.marginal_cost[:, None, None] * dispatch
+        - fleet.quadratic_cost[:, None, None] * dispatch ** 2
+    ) * hours
+
+    # Periods without a forecast get empty curves
+    missing = np.isnan(inputs.price_mean)
+    quantities[:, missing, :] = 0.0
+    expected_dispatch = np.where(missing[None, :], 0.0, dispatch @ weights)
+    expected_profit = np.where(missing[None, :], 0.0, profit @ weights)
+
+    return BidCurves(
+        market_type=inputs.market_type,
+        unit_ids=fleet.unit_ids,
+        period_start=inputs.period_start,
+        prices=prices,
+        quantities=quantities,
+        expected_dispatch_mw=expected_dispatch,
+        expected_profit=expected_profit,
+    )
+
+
+def period_means(times: np.ndarray, values: np.ndarray, day_start: datetime, n_periods: int) -> np.ndarray:
+    """Average values into half-hour periods from day_start; NaN where empty"""
+    offsets = (times - np.datetime64(day_start, "s")) // np.timedelta64(int(PERIOD.total_seconds()), "s")
+    valid = (offsets >= 0) & (offsets < n_periods) & ~np.isnan(values)
+    index = offsets[valid].astype(np.int64)
+    sums = np.bincount(index, weights=values[valid], minlength=n_periods)
+    counts = np.bincount(index, minlength=n_periods)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+
+class BiddingService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _latest_series(self, model, market_type: MarketTypeEnum, start: datetime, end: datetime, region: str):
+        """(forecast_time, predicted) arrays of the newest forecast per time across sources"""
+        newest = (
+            select(model.forecast_time, func.max(model.timestamp).label("timestamp"))
+            .where(
+                model.market_type == market_type,
+                model.region == region,
+                model.forecast_time >= start,
+                model.forecast_time < end,
+            )
+            .group_by(model.forecast_time)
+            .subquery()
+        )
+        stmt = (
+            select(model.forecast_time, getattr(model, model.predicted_column))
+            .join(
+                newest,
+                (model.forecast_time == newest.c.forecast_time) & (model.timestamp == newest.c.timestamp),
+            )
+            .where(model.market_type == market_type, model.region == region)
+        )
+        rows = self.db.execute(stmt).all()
+        if not rows:
+            return np.empty(0, dtype="datetime64[s]"), np.empty(0)
+        times, predicted = zip(*rows)
+        return np.array(times, dtype="datetime64[s]"), np.array(predicted, dtype=np.float64)
+
+    def _price_sigma(self, market_type: MarketTypeEnum, day_start: datetime, region: str) -> Optional[float]:
+        """RMS price forecast error (bias included) over the previous 28 days, if any was recorded"""
+        stmt = select(func.avg(PriceForecast.price_error * PriceForecast.price_error)).where(
+            PriceForecast.market_type == market_type,
+            PriceForecast.region == region,
+            PriceForecast.forecast_time >= day_start - timedelta(days=28),
+            PriceForecast.forecast_time < day_start,
+            PriceForecast.price_error.isnot(None),
+        )
+        mean_square = self.db.execute(stmt).scalar()
+        return None if mean_square is None else float(np.sqrt(mean_square))
+
+    @db_operation("bidding.load_inputs")
+    def load_inputs(
+        self,
+        market_type: MarketTypeEnum,
+        day: datetime,
+        region: str = "ALL",
+        n_periods: int = PERIODS_PER_DAY,
+    ) -> MarketInputs:
+        """Per-period price mean/sigma and imbalance for a delivery day from stored forecasts"""
+        market_type = MarketTypeEnum(market_type)
+        day_start = datetime(day.year, day.month, day.day)
+        end = day_start + n_periods * PERIOD
+
+        price_times, prices = self._latest_series(PriceForecast, market_type, day_start, end, region)
+        imbalance_times, imbalance = self._latest_series(
+            ImbalanceForecast, market_type, day_start, end, region
+        )
+        price_mean = period_means(price_times, prices, day_start, n_periods)
+        imbalance_mw = np.nan_to_num(period_means(imbalance_times, imbalance, day_start, n_periods))
+
+        # Recent forecast error, else a share of the price; widened by the imbalance
+        error_sigma = self._price_sigma(market_type, day_start, region)
+        base_sigma = (
+            np.full(n_periods, error_sigma)
+            if error_sigma is not None
+            else DEFAULT_RELATIVE_SIGMA * np.abs(np.nan_to_num(price_mean))
+        )
+        price_sigma = np.maximum(base_sigma, MIN_SIGMA) * (1 + np.abs(imbalance_mw) / IMBALANCE_SCALE_MW)
+
+        period_start = np.datetime64(day_start, "s") + np.arange(n_periods) * np.timedelta64(
+            int(PERIOD.total_seconds()), "s"
+        )
+        return MarketInputs(market_type, period_start, price_mean, price_sigma, imbalance_mw)
+
+    def build_bids(
+        self,
+        market_type: MarketTypeEnum,
+        day: datetime,
+        fleet: Fleet,
+        region: str = "ALL",
+        risk_aversion: float = DEFAULT_RISK_AVERSION,
+        n_steps: int = DEFAULT_PRICE_STEPS,
+    ) -> BidCurves:
+        inputs = self.load_inputs(market_type, day, region)
+        curves = build_bid_curves(inputs, fleet, risk_aversion, n_steps)
+        covered = int((~np.isnan(inputs.price_mean)).sum())
+        logger.info(
+            f"Built {market_type.value} bids for {len(fleet)} units over {covered}/{len(inputs.price_mean)} periods"
+        )
+        return curves
+
+    def build_all_markets(
+        self,
+        day: datetime,
+        fleet: Fleet,
+        markets: Sequence[MarketTypeEnum] = tuple(MarketTypeEnum),
+        **kwargs,
+    ) -> Dict[MarketTypeEnum, BidCurves]:
+        return {market: self.build_bids(market, day, fleet, **kwargs) for market in markets}
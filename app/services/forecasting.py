@@ -0,0 +1,307 @@
+"""
+Forecast cycle orchestration across forecast types, markets and regions.
+
+One cycle:
+
+1. Build the feature frame once for the longest market horizon.
+2. Place it in a shared-memory block that every worker process maps
+   without copying.
+3. Run one job per (forecast type, market, region) in a process pool.
+   Each job loads its model through the registry and predicts the first
+   `horizon` rows.
+4. Upsert the results with one bulk statement per forecast type.
+
+A job uses the most specific artifact it finds, named
+<type>_<market>_<region>_model, then <type>_<market>_model, then
+<type>_model (and DEFAULT_MODEL_NAME for demand), then the fitted
+<type>_baseline. Jobs without any artifact are reported as skipped.
+Rows are stored with the same source as PredictionService writes
+(forecast_source: BASELINE or LSTM), so both paths upsert the same rows.
+Time spent in features, each model and the write is logged and returned.
+
+With workers <= 1 everything runs in-process without shared memory,
+which is what the Lambda handler uses (Lambda has no /dev/shm).
+
+    python -m app.services.forecasting --workers 4 --types DEMAND,PRICE --markets DAM,IDM
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from itertools import product
+from multiprocessing import shared_memory
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.database.models import ForecastTypeEnum, MarketTypeEnum
+from app.ml_models.config import DEFAULT_MODEL_NAME
+from app.utils.metrics import MODEL_PREDICT_SECONDS, timer
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def _env_list(name: str, default: str) -> List[str]:
+    return [item.strip() for item in os.getenv(name, default).split(",") if item.strip()]
+
+
+FORECAST_TYPES = _env_list("FORECAST_TYPES", ",".join(t.value for t in ForecastTypeEnum))
+FORECAST_MARKETS = _env_list("FORECAST_MARKETS", ",".join(m.value for m in MarketTypeEnum))
+FORECAST_REGIONS = _env_list("FORECAST_REGIONS", "ALL")
+FORECAST_FREQ = os.getenv("FORECAST_FREQ", "h")
+FORECAST_WORKERS = int(os.getenv("FORECAST_WORKERS", str(os.cpu_count() or 1)))
+# Hours ahead per market, e.g. "DAM:24,IDM:8,BM:2"
+MARKET_HORIZON_HOURS = {"DAM": 24, "IDM": 8, "BM": 2}
+MARKET_HORIZON_HOURS.update(
+    {
+        market.strip(): int(hours)
+        for market, hours in (
+            item.split(":") for item in os.getenv("MARKET_HORIZON_HOURS", "").split(",") if ":" in item
+        )
+    }
+)
+
+
+@dataclass(frozen=True)
+class ForecastJob:
+    forecast_type: str
+    market_type: str
+    region: str
+    horizon_hours: int
+
+    def model_names(self) -> List[str]:
+        """Artifact names to try, most specific first"""
+        kind, market, region = self.forecast_type.lower(), self.market_type.lower(), self.region.lower()
+        names = [f"{kind}_{market}_{region}_model", f"{kind}_{market}_model", f"{kind}_model"]
+        if self.forecast_type == ForecastTypeEnum.DEMAND.value:
+            names.append(DEFAULT_MODEL_NAME)
+        # Last resort: the fitted baseline for the type (see app.ml_models.baselines)
+        names.append(f"{kind}_baseline")
+        return names
+
+
+@dataclass
+class JobResult:
+    job: ForecastJob
+    model: Optional[str] = None
+    values: Optional[np.ndarray] = None
+    seconds: float = 0.0
+    status: str = "ok"  # ok, skipped (no artifact) or failed
+    error: Optional[str] = None
+
+
+@dataclass
+class CycleReport:
+    started_at: str
+    features_seconds: float = 0.0
+    predict_seconds: float = 0.0
+    write_seconds: float = 0.0
+    total_seconds: float = 0.0
+    rows_written: Dict[str, int] = field(default_factory=dict)
+    models: List[dict] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class SharedFeatures:
+    """A float64 feature matrix in shared memory, plus what is needed to rebuild the frame"""
+
+    name: str
+    shape: Tuple[int, int]
+    columns: Tuple[str, ...]
+    index: np.ndarray  # datetime64[ns]
+
+    @classmethod
+    def create(cls, frame: "pd.DataFrame") -> Tuple["SharedFeatures", shared_memory.SharedMemory]:
+        values = frame.to_numpy(dtype=np.float64)
+        shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        np.ndarray(values.shape, dtype=np.float64, buffer=shm.buf)[:] = values
+        spec = cls(shm.name, values.shape, tuple(frame.columns), frame.index.to_numpy(dtype="datetime64[ns]"))
+        return spec, shm
+
+    def attach(self) -> Tuple["pd.DataFrame", shared_memory.SharedMemory]:
+        import pandas as pd
+
+        # Pool workers share the parent's resource tracker, so attaching
+        # here does not hand ownership of the block to the worker
+        shm = shared_memory.SharedMemory(name=self.name)
+        values = np.ndarray(self.shape, dtype=np.float64, buffer=shm.buf)
+        frame = pd.DataFrame(values, columns=list(self.columns), index=pd.DatetimeIndex(self.index), copy=False)
+        return frame, shm
+
+
+# Per worker process: the attached feature frame and its shared-memory handle
+_features: Optional["pd.DataFrame"] = None
+_features_shm: Optional[shared_memory.SharedMemory] = None
+
+
+def _init_worker(spec: SharedFeatures) -> None:
+    global _features, _features_shm
+    _features, _features_shm = spec.attach()
+
+
+def run_job(job: ForecastJob, features: Optional["pd.DataFrame"] = None) -> JobResult:
+    """Predict one job's horizon with the first model artifact found"""
+    from app.feature_engineering.engine import model_columns
+    from app.ml_models.registry import load_model
+
+    features = _features if features is None else features
+    started = time.perf_counter()
+    for name in job.model_names():
+        try:
+            model = load_model(name)
+        except FileNotFoundError:
+            continue
+        try:
+            index = features.index.to_numpy()
+            rows = features[index < index[0] + np.timedelta64(job.horizon_hours, "h")]
+            with timer(MODEL_PREDICT_SECONDS, model=name):
+                values = np.asarray(model.predict(model_columns(model, rows)), dtype=np.float64).ravel()
+            return JobResult(job, name, values, time.perf_counter() - started)
+        except Exception as e:
+            return JobResult(job, name, None, time.perf_counter() - started, "failed", str(e))
+    return JobResult(job, None, None, time.perf_counter() - started, "skipped", "no model artifact")
+
+
+def plan_jobs(
+    forecast_types: Sequence[str] = FORECAST_TYPES,
+    markets: Sequence[str] = FORECAST_MARKETS,
+    regions: Sequence[str] = FORECAST_REGIONS,
+) -> List[ForecastJob]:
+    return [
+        ForecastJob(ForecastTypeEnum(kind).value, MarketTypeEnum(market).value, region, MARKET_HORIZON_HOURS[market])
+        for kind, market, region in product(forecast_types, markets, regions)
+    ]
+
+
+def _run_jobs(jobs: List[ForecastJob], features: "pd.DataFrame", workers: int) -> List[JobResult]:
+    if workers <= 1 or len(jobs) <= 1:
+        return [run_job(job, features) for job in jobs]
+
+    spec, shm = SharedFeatures.create(features)
+    try:
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(jobs)), initializer=_init_worker, initargs=(spec,)
+        ) as executor:
+            return list(executor.map(run_job, jobs))
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def run_forecast_cycle(
+    db=None,
+    now: Optional[datetime] = None,
+    jobs: Optional[List[ForecastJob]] = None,
+    workers: int = FORECAST_WORKERS,
+    freq: str = FORECAST_FREQ,
+    write: bool = True,
+) -> CycleReport:
+    """
+    Run every job once and bulk-write the predictions; returns per-model timings.
+
+    Writes go through `db`, or a session opened for the cycle when it is None.
+    """
+    from app.feature_engineering.demand_features import generate_features
+    from app.ml_models.inference.predict import forecast_source
+
+    jobs = plan_jobs() if jobs is None else jobs
+    cycle_started = time.perf_counter()
+    report = CycleReport(started_at=datetime.utcnow().isoformat())
+
+    started = time.perf_counter()
+    features = generate_features(now, hours=max(MARKET_HORIZON_HOURS.values()), freq=freq)
+    report.features_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    results = _run_jobs(jobs, features, workers)
+    report.predict_seconds = time.perf_counter() - started
+
+    rows_by_type: Dict[str, list] = defaultdict(list)
+    timestamps = features.index.to_pydatetime()
+    for result in results:
+        report.models.append(
+            {
+                **asdict(result.job),
+                "model": result.model,
+                "status": result.status,
+                "rows": 0 if result.values is None else len(result.values),
+                "seconds": round(result.seconds, 4),
+                "error": result.error,
+            }
+        )
+        if result.values is None:
+            continue
+        job = result.job
+        rows_by_type[job.forecast_type].extend(
+            (timestamp, job.market_type, value, forecast_source(result.model), job.region)
+            for timestamp, value in zip(timestamps, result.values.tolist())
+        )
+
+    if write and rows_by_type:
+        from app.ml_models.inference.predict import PredictionService
+
+        started = time.perf_counter()
+        session = db
+        if session is None:
+            from app.database.database import SessionLocal
+
+            session = SessionLocal()
+        try:
+            service = PredictionService(session)
+            for kind, rows in rows_by_type.items():
+                report.rows_written[kind] = service.create_forecasts(ForecastTypeEnum(kind), rows)
+        finally:
+            if db is None:
+                session.close()
+        report.write_seconds = time.perf_counter() - started
+
+    report.total_seconds = time.perf_counter() - cycle_started
+    for entry in report.models:
+        logger.info(
+            f"{entry['forecast_type']}/{entry['market_type']}/{entry['region']}: {entry['status']} "
+            f"{entry['model'] or '-'} {entry['rows']} rows in {entry['seconds'] * 1000:.1f} ms"
+        )
+    logger.info(
+        f"Forecast cycle: {len(jobs)} jobs, features {report.features_seconds:.2f}s, "
+        f"predict {report.predict_seconds:.2f}s, write {report.write_seconds:.2f}s, "
+        f"total {report.total_seconds:.2f}s"
+    )
+    return report
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Run one forecast cycle")
+    parser.add_argument("--types", default=",".join(FORECAST_TYPES))
+    parser.add_argument("--markets", default=",".join(FORECAST_MARKETS))
+    parser.add_argument("--regions", default=",".join(FORECAST_REGIONS))
+    parser.add_argument("--workers", type=int, default=FORECAST_WORKERS)
+    parser.add_argument("--freq", default=FORECAST_FREQ)
+    parser.add_argument("--dry-run", action="store_true", help="predict without writing to the database")
+    args = parser.parse_args(argv)
+
+    jobs = plan_jobs(args.types.split(","), args.markets.split(","), args.regions.split(","))
+    db = None
+    if not args.dry_run:
+        from app.database.database import SessionLocal
+
+        db = SessionLocal()
+    try:
+        report = run_forecast_cycle(db, jobs=jobs, workers=args.workers, freq=args.freq, write=not args.dry_run)
+    finally:
+        if db is not None:
+            db.close()
+    print(json.dumps(asdict(report), indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,325 @@
+"""
+Imbalance settlement over 30-minute periods.
+
+Positions (contracted and metered MWh per unit and period) are joined
+with imbalance settlement prices as aligned (units, periods) arrays, and
+imbalance volume, imbalance charges, P&L and exposure are computed in one
+pass of array arithmetic.
+
+Prices come from the SEMO reports the scraper stores in price_forecasts:
+BM-025 (imbalance price, averaged over each settlement period) is final;
+BM-026 (system price) and then any model BM forecast are used as
+provisional prices until it arrives. Exposure is what remains
+unsettled: the imbalance cashflow on periods without a final price or
+metered volume.
+
+A SettlementLedger keeps the results between runs. SEMO republishes
+prices by re-upserting rows, which bumps their `timestamp`, so
+`SettlementService.resettle` asks only for price rows newer than the
+ledger's watermark and recomputes only the periods whose price moved.
+
+    ledger = SettlementLedger(positions)
+    service = SettlementService(db)
+    service.settle(ledger)      # first run: every period
+    ...
+    service.resettle(ledger)    # later runs: only republished periods
+    ledger.save("settlement.npz")
+"""
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.database.models import MarketTypeEnum, PriceForecast
+from app.services.bidding_service import PERIOD, Fleet, period_means
+from app.utils.metrics import db_operation
+
+logger = logging.getLogger(__name__)
+
+FINAL_PRICE_SOURCE = "SEMO-BM025"
+SYSTEM_PRICE_SOURCE = "SEMO-BM026"
+# Prices that differ by less than this (EUR/MWh) are not re-settled
+PRICE_TOLERANCE = 1e-6
+
+_PERIOD_SECONDS = np.timedelta64(int(PERIOD.total_seconds()), "s")
+
+
+@dataclass
+class Positions:
+    """Volumes per unit and settlement period; metered is NaN until known"""
+
+    unit_ids: List[str]
+    period_start: np.ndarray  # datetime64[s], (periods,), consecutive half-hours
+    contracted_mwh: np.ndarray  # (units, periods), ex-ante traded volume
+    traded_price: np.ndarray  # (units, periods) or (periods,), EUR/MWh
+    metered_mwh: np.ndarray  # (units, periods)
+    forecast_mwh: Optional[np.ndarray] = None  # stands in for missing metering
+
+    @property
+    def start(self) -> datetime:
+        return self.period_start[0].astype("datetime64[s]").item()
+
+    def delivered_mwh(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Delivered volume and whether it is metered (else forecast or contracted)"""
+        metered = ~np.isnan(self.metered_mwh)
+        fallback = self.contracted_mwh if self.forecast_mwh is None else self.forecast_mwh
+        return np.where(metered, self.metered_mwh, fallback), metered
+
+
+@dataclass
+class PeriodPrices:
+    """Imbalance settlement price per period, whether it is final, and the newest row time behind it"""
+
+    price: np.ndarray  # NaN where nothing is published or forecast
+    final: np.ndarray
+    version: np.ndarray  # datetime64[us], NaT where no price
+
+
+@dataclass
+class SettlementResult:
+    imbalance_mwh: np.ndarray  # delivered - contracted; positive is long
+    imbalance_charge: np.ndarray  # EUR paid by the unit; negative when it is paid
+    pnl: np.ndarray  # EUR: traded revenue + imbalance cashflow - generation cost
+    exposure: np.ndarray  # EUR of imbalance cashflow not yet final
+
+
+def settle_arrays(
+    positions: Positions,
+    prices: PeriodPrices,
+    fleet: Optional[Fleet] = None,
+    periods: slice = slice(None),
+) -> SettlementResult:
+    """Settle the given periods of every unit at once"""
+    delivered, metered = positions.delivered_mwh()
+    delivered, metered = delivered[:, periods], metered[:, periods]
+    contracted = positions.contracted_mwh[:, periods]
+    traded_price = np.broadcast_to(positions.traded_price, positions.contracted_mwh.shape)[:, periods]
+    price, final = prices.price[periods], prices.final[periods]
+
+    # Without any imbalance price yet, value the imbalance at the traded price
+    imbalance_price = np.where(np.isnan(price)[None, :], traded_price, price[None, :])
+    imbalance = delivered - contracted
+    cashflow = imbalance * imbalance_price
+
+    pnl = contracted * traded_price + cashflow
+    if fleet is not None:
+        hours = PERIOD.total_seconds() / 3600
+        power = delivered / hours
+        pnl = pnl - (fleet.marginal_cost[:, None] * power + fleet.quadratic_cost[:, None] * power ** 2) * hours
+
+    settled = final[None, :] & metered
+    return SettlementResult(
+        imbalance_mwh=imbalance,
+        imbalance_charge=-cashflow,
+        pnl=pnl,
+        exposure=np.where(settled, 0.0, np.abs(cashflow)),
+    )
+
+
+class SettlementLedger:
+    """Settlement results for a block of positions, updated period by period"""
+
+    def __init__(self, positions: Positions, fleet: Optional[Fleet] = None):
+        self.positions = positions
+        self.fleet = fleet
+        n_periods = len(positions.period_start)
+        self.prices = PeriodPrices(
+            price=np.full(n_periods, np.nan),
+            final=np.zeros(n_periods, dtype=bool),
+            version=np.full(n_periods, np.datetime64("NaT"), dtype="datetime64[us]"),
+        )
+        # Until prices arrive every imbalance is valued at the traded price
+        self.result = settle_arrays(positions, self.prices, fleet)
+
+    @property
+    def watermark(self) -> Optional[datetime]:
+        """Newest price row reflected in the ledger"""
+        versions = self.prices.version[~np.isnat(self.prices.version)]
+        return versions.max().astype("datetime64[us]").item() if len(versions) else None
+
+    def _recompute(self, periods: np.ndarray) -> None:
+        if not len(periods):
+            return
+        # Changed periods are settled as one contiguous span and scattered back
+        span = slice(int(periods.min()), int(periods.max()) + 1)
+        partial = settle_arrays(self.positions, self.prices, self.fleet, span)
+        columns = periods - span.start
+        for name in SettlementResult.__dataclass_fields__:
+            getattr(self.result, name)[:, periods] = getattr(partial, name)[:, columns]
+
+    def apply_prices(self, prices: PeriodPrices, periods: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Merge prices for `periods` (all when None) and re-settle those whose
+        price or finality changed; returns the re-settled period indices.
+        """
+        if periods is None:
+            periods = np.arange(len(self.prices.price))
+        new_price, new_final = prices.price[periods], prices.final[periods]
+        old_price, old_final = self.prices.price[periods], self.prices.final[periods]
+
+        same_price = np.isclose(new_price, old_price, rtol=0, atol=PRICE_TOLERANCE) | (
+            np.isnan(new_price) & np.isnan(old_price)
+        )
+        changed = periods[~same_price | (new_final != old_final)]
+
+        self.prices.price[periods] = new_price
+        self.prices.final[periods] = new_final
+        self.prices.version[periods] = prices.version[periods]
+        self._recompute(changed)
+        return changed
+
+    def apply_metering(self, metered_mwh: np.ndarray, periods: np.ndarray) -> np.ndarray:
+        """Record metered volumes (units, len(periods)) and re-settle those periods"""
+        self.positions.metered_mwh[:, periods] = metered_mwh
+        self._recompute(np.asarray(periods))
+        return periods
+
+    def totals(self) -> Dict[str, float]:
+        return {
+            "imbalance_mwh": float(self.result.imbalance_mwh.sum()),
+            "imbalance_charge": float(self.result.imbalance_charge.sum()),
+            "pnl": float(self.result.pnl.sum()),
+            "exposure": float(self.result.exposure.sum()),
+            "final_periods": int(self.prices.final.sum()),
+        }
+
+    def save(self, path: str) -> None:
+        np.savez_compressed(
+            path,
+            unit_ids=np.array(self.positions.unit_ids),
+            period_start=self.positions.period_start,
+            contracted_mwh=self.positions.contracted_mwh,
+            traded_price=self.positions.traded_price,
+            metered_mwh=self.positions.metered_mwh,
+            forecast_mwh=self.positions.forecast_mwh if self.positions.forecast_mwh is not None else np.empty(0),
+            price=self.prices.price,
+            final=self.prices.final,
+            version=self.prices.version,
+            **{name: getattr(self.result, name) for name in SettlementResult.__dataclass_fields__},
+        )
+
+    @classmethod
+    def load(cls, path: str, fleet: Optional[Fleet] = None) -> "SettlementLedger":
+        data = np.load(path)
+        positions = Positions(
+            unit_ids=data["unit_ids"].tolist(),
+            period_start=data["period_start"],
+            contracted_mwh=data["contracted_mwh"],
+            traded_price=data["traded_price"],
+            metered_mwh=data["metered_mwh"],
+            forecast_mwh=data["forecast_mwh"] if data["forecast_mwh"].size else None,
+        )
+        ledger = cls(positions, fleet)
+        ledger.prices = PeriodPrices(data["price"], data["final"], data["version"])
+        ledger.result = SettlementResult(
+            *(data[name] for name in SettlementResult.__dataclass_fields__)
+        )
+        return ledger
+
+
+class SettlementService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _price_rows(self, start: datetime, end: datetime, changed_since: Optional[datetime] = None):
+        stmt = select(
+            PriceForecast.forecast_time,
+            PriceForecast.source,
+            PriceForecast.predicted_price,
+            PriceForecast.timestamp,
+        ).where(
+            PriceForecast.market_type == MarketTypeEnum.BM,
+            PriceForecast.region == "ALL",
+            PriceForecast.forecast_time >= start,
+            PriceForecast.forecast_time < end,
+        )
+        if changed_since is not None:
+            stmt = stmt.where(PriceForecast.timestamp > changed_since)
+        return self.db.execute(stmt).all()
+
+    @db_operation("settlement.load_prices")
+    def load_prices(self, start: datetime, n_periods: int) -> PeriodPrices:
+        """BM-025 where published, else BM-026, else the mean of model BM forecasts"""
+        rows = self._price_rows(start, start + n_periods * PERIOD)
+        price = np.full(n_periods, np.nan)
+        final = np.zeros(n_periods, dtype=bool)
+        version = np.full(n_periods, np.datetime64("NaT"), dtype="datetime64[us]")
+        if not rows:
+            return PeriodPrices(price, final, version)
+
+        times, sources, values, stamps = zip(*rows)
+        times = np.array(times, dtype="datetime64[s]")
+        sources = np.array(sources)
+        values = np.array(values, dtype=np.float64)
+        stamps = np.array(stamps, dtype="datetime64[us]")
+
+        is_model = ~np.isin(sources, [FINAL_PRICE_SOURCE, SYSTEM_PRICE_SOURCE])
+        # Lowest priority first, so each later source overwrites where it has a price
+        for mask, is_final in (
+            (is_model, False),
+            (sources == SYSTEM_PRICE_SOURCE, False),
+            (sources == FINAL_PRICE_SOURCE, True),
+        ):
+            means = period_means(times[mask], values[mask], start, n_periods)
+            found = ~np.isnan(means)
+            price[found] = means[found]
+            final[found] = is_final
+
+        # Newest contributing row per period, from any source
+        offsets = (times - np.datetime64(start, "s")) // _PERIOD_SECONDS
+        valid = (offsets >= 0) & (offsets < n_periods)
+        newest = np.full(n_periods, np.iinfo(np.int64).min)
+        np.maximum.at(newest, offsets[valid].astype(np.int64), stamps[valid].view(np.int64))
+        found = newest != np.iinfo(np.int64).min
+        version[found] = newest[found].view("datetime64[us]")
+        return PeriodPrices(price, final, version)
+
+    @db_operation("settlement.changed_periods")
+    def changed_periods(self, ledger: SettlementLedger) -> np.ndarray:
+        """Indices of ledger periods with price rows newer than its watermark"""
+        positions = ledger.positions
+        n_periods = len(positions.period_start)
+        rows = self._price_rows(positions.start, positions.start + n_periods * PERIOD, ledger.watermark)
+        if not rows:
+            return np.empty(0, dtype=np.int64)
+        times = np.array([row[0] for row in rows], dtype="datetime64[s]")
+        offsets = (times - positions.period_start[0].astype("datetime64[s]")) // _PERIOD_SECONDS
+        return np.unique(offsets[(offsets >= 0) & (offsets < n_periods)].astype(np.int64))
+
+    def settle(self, ledger: SettlementLedger) -> Dict[str, float]:
+        """Settle every period of the ledger from the stored prices"""
+        prices = self.load_prices(ledger.positions.start, len(ledger.positions.period_start))
+        ledger.apply_prices(prices)
+        logger.info(f"Settled {len(prices.price)} periods, {int(prices.final.sum())} final")
+        return ledger.totals()
+
+    def resettle(self, ledger: SettlementLedger) -> np.ndarray:
+        """
+        Re-settle only periods whose prices were (re)published since the
+        last run; returns the indices that were recomputed.
+        """
+        touched = self.changed_periods(ledger)
+        if not len(touched):
+            return touched
+
+        # Reload just the span covering the touched periods
+        first, last = int(touched.min()), int(touched.max())
+        span_start = ledger.positions.start + first * PERIOD
+        span = self.load_prices(span_start, last - first + 1)
+        n_periods = len(ledger.positions.period_start)
+        prices = PeriodPrices(
+            price=np.full(n_periods, np.nan),
+            final=np.zeros(n_periods, dtype=bool),
+            version=np.full(n_periods, np.datetime64("NaT"), dtype="datetime64[us]"),
+        )
+        prices.price[first : last + 1] = span.price
+        prices.final[first : last + 1] = span.final
+        prices.version[first : last + 1] = span.version
+
+        changed = ledger.apply_prices(prices, touched)
+        logger.info(f"Re-settled {len(changed)} of {len(touched)} republished periods")
+        return changed
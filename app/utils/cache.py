@@ -0,0 +1,247 @@
+"""
+Two-tier response cache for read endpoints.
+
+L1 is an in-process TTL/LRU dict; L2 is shared between workers (Redis when
+REDIS_URL is set, otherwise an in-process stand-in with the same interface).
+Entries are stored as pre-serialized bytes with an ETag, so a hit costs
+neither a database query nor a JSON encode.
+
+Invalidation is by generation: every key in a namespace embeds the
+namespace's current generation, and a write bumps it in L2 so all workers
+stop serving the old entries. Each process re-reads a group's generation
+at most every CACHE_GENERATION_CHECK_SECONDS, so other workers follow a
+write within that interval while L1 hits stay free of L2 round trips.
+
+Without REDIS_URL the generations are per-process too, so writes from
+other processes (scrapers, Lambdas, other API workers) never invalidate
+this one: its entries are then only bounded by CACHE_TTL_SECONDS. The API
+logs a warning at startup in that case (warn_if_not_shared).
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "60"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+REDIS_URL = os.getenv("REDIS_URL")
+CACHE_GENERATION_CHECK_SECONDS = float(os.getenv("CACHE_GENERATION_CHECK_SECONDS", "1"))
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    etag: str
+
+
+def make_etag(body: bytes) -> str:
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+class TTLCache:
+    """Thread-safe LRU with a per-entry expiry"""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + (ttl or self.ttl), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class LocalSharedCache:
+    """In-process stand-in for the shared tier when Redis is not configured"""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self._values = TTLCache(max_entries)
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._values.get(key)
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._values.set(key, value, ttl)
+
+    def get_counter(self, key: str) -> int:
+        return self._counters.get(key, 0)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+
+class RedisSharedCache:
+    """Shared tier backed by Redis; errors degrade to a cache miss"""
+
+    def __init__(self, url: str):
+        import redis
+
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            return self._client.get(key)
+        except Exception as e:
+            logger.warning(f"Redis get failed for {key}: {e}")
+            return None
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        try:
+            self._client.set(key, value, px=int(ttl * 1000))
+        except Exception as e:
+            logger.warning(f"Redis set failed for {key}: {e}")
+
+    def get_counter(self, key: str) -> int:
+        try:
+            return int(self._client.get(key) or 0)
+        except Exception as e:
+            logger.warning(f"Redis get failed for {key}: {e}")
+            return 0
+
+    def incr(self, key: str) -> int:
+        try:
+            return int(self._client.incr(key))
+        except Exception as e:
+            logger.warning(f"Redis incr failed for {key}: {e}")
+            return 0
+
+
+def create_shared_cache():
+    if REDIS_URL:
+        logger.info("Using Redis for the shared response cache")
+        return RedisSharedCache(REDIS_URL)
+    return LocalSharedCache()
+
+
+def warn_if_not_shared() -> None:
+    """Warn when invalidations from other processes cannot reach this one"""
+    if not REDIS_URL:
+        logger.warning(
+            "REDIS_URL is not set: the response cache is per-process, so writes by the scrapers, "
+            f"Lambdas and other workers only show up here after CACHE_TTL_SECONDS ({CACHE_TTL_SECONDS:g}s)"
+        )
+
+
+class TieredCache:
+    def __init__(
+        self,
+        namespace: str,
+        ttl: float = CACHE_TTL_SECONDS,
+        shared=None,
+        generation_check_seconds: float = CACHE_GENERATION_CHECK_SECONDS,
+    ):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.local = TTLCache(ttl=ttl)
+        self.shared = shared if shared is not None else create_shared_cache()
+        # Staleness bound for writes made in other processes, when they share
+        # `shared` (Redis); with LocalSharedCache only the TTL bounds it
+        self.generation_check_seconds = generation_check_seconds
+        self.hits = {"local": 0, "shared": 0, "miss": 0}
+        # group -> (checked at, generation) as last read from L2
+        self._generations: Dict[str, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+
+    def _generation_key(self, group: str) -> str:
+        return f"{self.namespace}:gen:{group}"
+
+    def _generation(self, group: str) -> int:
+        now = time.monotonic()
+        checked = self._generations.get(group)
+        if checked is not None and now - checked[0] < self.generation_check_seconds:
+            return checked[1]
+        generation = self.shared.get_counter(self._generation_key(group))
+        self._generations[group] = (now, generation)
+        return generation
+
+    def key(self, group: str, params: str) -> str:
+        return f"{self.namespace}:{group}:v{self._generation(group)}:{params}"
+
+    def _count(self, outcome: str) -> None:
+        with self._lock:
+            self.hits[outcome] += 1
+
+    def _lookup(self, key: str):
+        cached = self.local.get(key)
+        if cached is not None:
+            self._count("local")
+            return cached
+        body = self.shared.get(key)
+        if body is not None:
+            self._count("shared")
+            return self._fill_local(key, body)
+        self._count("miss")
+        return None
+
+    def _fill_local(self, key: str, body: bytes) -> CachedResponse:
+        cached = CachedResponse(body, make_etag(body))
+        self.local.set(key, cached)
+        return cached
+
+    def _store(self, key: str, body: bytes) -> CachedResponse:
+        self.shared.set(key, body, self.ttl)
+        return self._fill_local(key, body)
+
+    def get_or_load(self, group: str, params: str, load: Callable[[], bytes]) -> CachedResponse:
+        """Serve from L1, then L2, else call `load` (which returns the body) and fill both"""
+        key = self.key(group, params)
+        return self._lookup(key) or self._store(key, load())
+
+    async def aget_or_load(
+        self, group: str, params: str, load: Callable[[], Awaitable[bytes]]
+    ) -> CachedResponse:
+        """get_or_load for an async loader"""
+        key = self.key(group, params)
+        return self._lookup(key) or self._store(key, await load())
+
+    def invalidate(self, group: str) -> None:
+        """Drop every entry in a group, in this process and (via L2) in all others"""
+        generation = self.shared.incr(self._generation_key(group))
+        # This process sees its own write at once; 0 means L2 failed, so re-read next time
+        if generation:
+            self._generations[group] = (time.monotonic(), generation)
+        else:
+            self._generations.pop(group, None)
+        logger.info(f"Invalidated {self.namespace}:{group}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = dict(self.hits)
+        return {**hits, "local_entries": len(self.local)}
+
+
+# Served forecasts, grouped by forecast type
+forecast_cache = TieredCache("forecasts")
@@ -0,0 +1,170 @@
+"""
+Shared instrumentation: Prometheus counters/histograms, timing helpers and
+structured, sampled log events.
+
+Metrics are prometheus_client objects when it is installed (the API image)
+and no-ops otherwise (the Lambda packages), so hot paths can be
+instrumented unconditionally. Under gunicorn, PROMETHEUS_MULTIPROC_DIR
+makes every worker write to shared files and /metrics aggregates them.
+
+    with timer(MODEL_PREDICT_SECONDS, model=name):
+        values = model.predict(rows)
+
+    @db_operation("prediction.create_forecasts")
+    def create_forecasts(...): ...
+
+    log_event("prediction.invocation", rows=saved, seconds=elapsed)
+"""
+import contextvars
+import functools
+import json
+import logging
+import os
+import random
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+try:
+    import prometheus_client
+except ImportError:  # Lambda packages ship without it
+    prometheus_client = None
+
+logger = logging.getLogger(__name__)
+
+# Fraction of sampled log events that are emitted (errors are always emitted)
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SLOW_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+class _NoopMetric:
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+    def observe(self, value: float) -> None:
+        pass
+
+
+def _counter(name: str, documentation: str, labelnames=()):
+    if prometheus_client is None:
+        return _NoopMetric()
+    return prometheus_client.Counter(name, documentation, labelnames)
+
+
+def _histogram(name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+    if prometheus_client is None:
+        return _NoopMetric()
+    return prometheus_client.Histogram(name, documentation, labelnames, buckets=buckets)
+
+
+SCRAPER_FETCH_SECONDS = _histogram(
+    "scraper_fetch_seconds", "Latency of one upstream fetch", ("source", "report"), SLOW_BUCKETS
+)
+SCRAPER_FETCH_ERRORS = _counter("scraper_fetch_errors_total", "Upstream fetches that failed", ("source", "report"))
+ROWS_INGESTED = _counter("rows_ingested_total", "Rows bulk-written to the database", ("table",))
+DB_ROUND_TRIPS = _counter("db_round_trips_total", "Statements sent to the database", ("operation",))
+DB_OPERATION_SECONDS = _histogram("db_operation_seconds", "Wall time of a database operation", ("operation",))
+MODEL_LOAD_SECONDS = _histogram("model_load_seconds", "Model artifact load time", ("model",), SLOW_BUCKETS)
+MODEL_PREDICT_SECONDS = _histogram("model_predict_seconds", "Model predict call time", ("model",))
+HTTP_REQUEST_SECONDS = _histogram(
+    "http_request_seconds", "API request latency", ("method", "route", "status")
+)
+
+# The logical operation statements are attributed to (see db_operation)
+_current_operation: contextvars.ContextVar[str] = contextvars.ContextVar("db_operation", default="other")
+
+
+def current_operation() -> str:
+    return _current_operation.get()
+
+
+@contextmanager
+def timer(metric, **labels):
+    """Observe the block's wall time on a histogram"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metric.labels(**labels).observe(time.perf_counter() - started)
+
+
+def db_operation(name: str):
+    """Time a function and attribute the statements it runs to `name`"""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            token = _current_operation.set(name)
+            try:
+                with timer(DB_OPERATION_SECONDS, operation=name):
+                    return func(*args, **kwargs)
+            finally:
+                _current_operation.reset(token)
+
+        return wrapper
+
+    return decorator
+
+
+def log_event(event: str, sample_rate: Optional[float] = None, level: int = logging.INFO, **fields) -> None:
+    """
+    Emit one JSON log line, e.g. a per-invocation summary. Routine events
+    are kept with probability `sample_rate` (LOG_SAMPLE_RATE by default);
+    warnings and errors are never dropped.
+    """
+    rate = LOG_SAMPLE_RATE if sample_rate is None else sample_rate
+    if level < logging.WARNING and rate < 1.0 and random.random() >= rate:
+        return
+    record = {"event": event, **fields}
+    if rate < 1.0:
+        record["sample_rate"] = rate
+    logger.log(level, json.dumps(record, default=str))
+
+
+def render_metrics():
+    """(body, content type) in the Prometheus text format, aggregated across workers"""
+    if prometheus_client is None:
+        return b"", "text/plain; version=0.0.4; charset=utf-8"
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """ASGI middleware observing request latency by route template and status"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router records the matched route; templates keep label cardinality bounded
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.labels(
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=str(status["code"]),
+            ).observe(time.perf_counter() - started)
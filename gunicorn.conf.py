@@ -0,0 +1,63 @@
+"""
+Production serving: gunicorn managing uvicorn workers (uvloop + httptools).
+
+The app is imported and models/clients are preloaded in the master, then
+workers fork and share that memory copy-on-write. On SIGTERM workers stop
+accepting connections and get `graceful_timeout` seconds to finish
+in-flight requests.
+
+    gunicorn -c gunicorn.conf.py app.main:app
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+# Workers write metrics to files here so /metrics aggregates all of them.
+# Set before the app (and prometheus_client) is imported; cleared per start.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "prometheus_multiproc"))
+shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+bind = os.getenv("BIND", f"0.0.0.0:{os.getenv('PORT', '8000')}")
+# Async workers: one per core is enough, each serves many connections
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+# Recycle workers now and then to bound slow leaks; jitter avoids restarting together
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "1000"))
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG") or None
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info")
+
+
+def when_ready(server):
+    # Runs in the master after the app is imported and before any worker forks
+    from app.main import preload
+
+    preload()
+    server.log.info(f"Preloaded models and clients; starting {workers} workers")
+
+
+def post_fork(server, worker):
+    from app.api.routes.forecast import reset_lambda_client
+    from app.database.database import reset_engines_after_fork
+    from app.ml_models.registry import get_registry
+
+    reset_engines_after_fork()
+    # preload() built boto3 clients in the master; their connection pools
+    # must not be shared between workers
+    get_registry().reset_after_fork()
+    reset_lambda_client()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
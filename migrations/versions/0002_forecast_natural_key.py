@@ -0,0 +1,47 @@
+"""Unique natural key on forecast tables for bulk upserts
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+FORECAST_TABLES = (
+    'demand_forecasts',
+    'price_forecasts',
+    'generation_forecasts',
+    'imbalance_forecasts',
+)
+NATURAL_KEY = ['forecast_time', 'market_type', 'region', 'source']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in FORECAST_TABLES:
+        # Keep the newest row per natural key so the constraint can be created
+        op.execute(
+            sa.text(
+                f"DELETE FROM {table} WHERE id NOT IN ("
+                f"SELECT MAX(id) FROM {table} GROUP BY {', '.join(NATURAL_KEY)})"
+            )
+        )
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.create_unique_constraint(f'uq_{table}_natural_key', NATURAL_KEY)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in FORECAST_TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_constraint(f'uq_{table}_natural_key', type_='unique')
@@ -0,0 +1,36 @@
+"""Windowed metrics columns on forecast_evaluations
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('forecast_evaluations') as batch_op:
+        batch_op.add_column(sa.Column('market_type', sa.String(), nullable=True))
+        batch_op.add_column(sa.Column('window_end', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('sample_count', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('mape', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('forecast_evaluations') as batch_op:
+        batch_op.drop_column('mape')
+        batch_op.drop_column('sample_count')
+        batch_op.drop_column('window_end')
+        batch_op.drop_column('market_type')
@@ -0,0 +1,50 @@
+"""Composite market/region/time indexes and optional monthly partitioning
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from app.database import partitions
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+FORECAST_TABLES = (
+    'demand_forecasts',
+    'price_forecasts',
+    'generation_forecasts',
+    'imbalance_forecasts',
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in FORECAST_TABLES:
+        op.create_index(
+            f'ix_{table}_market_region_time',
+            table,
+            ['market_type', 'region', 'forecast_time'],
+            unique=False,
+        )
+
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql' and partitions.partitioning_enabled():
+        for table in partitions.partitioned_tables():
+            partitions.convert_to_partitioned(bind, table)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Partitioned tables are left partitioned; the parent keeps the same
+    # columns and constraints, so earlier revisions still apply to it.
+    for table in FORECAST_TABLES:
+        op.drop_index(f'ix_{table}_market_region_time', table_name=table)
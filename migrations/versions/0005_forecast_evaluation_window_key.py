@@ -0,0 +1,42 @@
+"""Unique window key on forecast_evaluations for upserted metrics
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+WINDOW_KEY = ['forecast_type', 'model_name', 'market_type', 'forecast_time', 'window_end']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Keep the newest evaluation per window; single-timestamp rows (no
+    # window_end) never conflict, and rows with history are left alone
+    op.execute(
+        sa.text(
+            "DELETE FROM forecast_evaluations WHERE window_end IS NOT NULL "
+            "AND id NOT IN (SELECT forecast_id FROM forecast_history) "
+            "AND id NOT IN (SELECT MAX(id) FROM forecast_evaluations "
+            f"WHERE window_end IS NOT NULL GROUP BY {', '.join(WINDOW_KEY)})"
+        )
+    )
+    with op.batch_alter_table('forecast_evaluations') as batch_op:
+        batch_op.create_unique_constraint('uq_forecast_evaluations_window', WINDOW_KEY)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('forecast_evaluations') as batch_op:
+        batch_op.drop_constraint('uq_forecast_evaluations_window', type_='unique')
@@ -6,5 +6,10 @@ sleep 5
 echo "Running Alembic migrations..."
 alembic upgrade head
 
-echo "Starting FastAPI..."
-exec uvicorn app.main:app --host 0.0.0.0 --port 8000 --reload
+if [ "${APP_ENV:-production}" = "development" ]; then
+    echo "Starting FastAPI (development, auto-reload)..."
+    exec uvicorn app.main:app --host 0.0.0.0 --port 8000 --reload
+fi
+
+echo "Starting FastAPI (production, gunicorn + uvicorn workers)..."
+exec gunicorn -c gunicorn.conf.py app.main:app
@@ -0,0 +1,54 @@
+"""Leakage checks for the backtest feature frame"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.ml_models.backtest import TARGET_COLUMN, build_backtest_frame, run_backtest
+
+START = datetime(2024, 1, 1)
+END = datetime(2024, 3, 1)
+
+
+def _history(seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(START - timedelta(days=10), END, freq="15min", inclusive="left")
+    slot = np.arange(len(index)) % 96
+    demand = 4500 + 800 * np.sin(2 * np.pi * slot / 96) + rng.normal(0, 50, len(index))
+    # AR(1) noise: only the actual itself (or a forecast of it) could predict it
+    noise = rng.normal(0, 40, len(index))
+    wind = np.empty(len(index))
+    level = 0.0
+    for i, step in enumerate(noise):
+        level = 0.99 * level + step
+        wind[i] = level
+    wind = np.clip(1500 + wind, 0, None)
+    return pd.DataFrame({"demand": demand, "wind_actual": wind}, index=index)
+
+
+@pytest.mark.parametrize("target", ["demand", "wind_actual"])
+def test_features_ignore_actuals_from_the_last_day(target):
+    history = _history()
+    origin = pd.Timestamp("2024-02-01")
+    frame = build_backtest_frame(START, END, target, history)
+
+    perturbed = history.copy()
+    perturbed.loc[origin:, ["demand", "wind_actual"]] *= 3
+    changed = build_backtest_frame(START, END, target, perturbed)
+
+    known = frame.index < origin + pd.Timedelta(days=1)
+    features = frame.columns.drop(TARGET_COLUMN)
+    pd.testing.assert_frame_equal(frame.loc[known, features], changed.loc[known, features])
+    assert not frame.loc[frame.index >= origin, TARGET_COLUMN].equals(
+        changed.loc[changed.index >= origin, TARGET_COLUMN]
+    )
+
+
+def test_wind_backtest_without_forecast_cannot_see_target():
+    frame = build_backtest_frame(START, END, "wind_actual", _history(seed=1))
+    result = run_backtest(START, END, "ridge", "wind_actual", horizon_hours=24, workers=1, frame=frame)
+    forecasts = result.forecasts
+    mae = np.abs(forecasts["predicted"] - forecasts["actual"]).mean()
+    # With wind_actual leaking into the features this was a fraction of a MW
+    assert mae > 30
@@ -0,0 +1,57 @@
+import asyncio
+import threading
+
+import numpy as np
+
+from app.ml_models.inference.batching import MicroBatcher
+
+
+def test_requests_of_two_widths_count_two_predict_calls():
+    async def run():
+        batcher = MicroBatcher(lambda rows: rows.sum(axis=1), max_batch_size=8, max_wait_ms=50)
+        results = await asyncio.gather(
+            batcher.submit(np.ones((2, 3))), batcher.submit(np.ones((1, 2))), batcher.submit(np.ones((1, 3)))
+        )
+        await batcher.stop()
+        return results, batcher.metrics()
+
+    results, metrics = asyncio.run(run())
+    assert [r.tolist() for r in results] == [[3.0, 3.0], [2.0], [3.0]]
+    assert (metrics["collections"], metrics["batches"], metrics["avg_batch_size"]) == (1, 2, 2.0)
+
+
+def test_stop_fails_queued_and_in_flight_requests():
+    release = threading.Event()
+
+    def predict(rows):
+        release.wait(5)
+        return rows[:, 0]
+
+    async def run():
+        batcher = MicroBatcher(predict, max_batch_size=1, max_wait_ms=0)
+        in_flight = asyncio.ensure_future(batcher.submit(np.ones((1, 1))))
+        await asyncio.sleep(0.05)
+        queued = asyncio.ensure_future(batcher.submit(np.ones((1, 1))))
+        await asyncio.sleep(0.05)
+        await batcher.stop()
+        release.set()
+        return await asyncio.wait_for(asyncio.gather(in_flight, queued, return_exceptions=True), 1)
+
+    for result in asyncio.run(run()):
+        assert isinstance(result, RuntimeError)
+
+
+def test_worker_failure_fails_pending_requests(monkeypatch):
+    async def run():
+        batcher = MicroBatcher(lambda rows: rows[:, 0], max_batch_size=4, max_wait_ms=50)
+
+        async def broken(batch):
+            raise ValueError("worker bug")
+
+        monkeypatch.setattr(batcher, "_execute", broken)
+        first = asyncio.ensure_future(batcher.submit(np.ones((1, 1))))
+        second = asyncio.ensure_future(batcher.submit(np.ones((1, 1))))
+        return await asyncio.wait_for(asyncio.gather(first, second, return_exceptions=True), 1)
+
+    results = asyncio.run(run())
+    assert [repr(r) for r in results] == [repr(ValueError("worker bug"))] * 2
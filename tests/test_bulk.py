@@ -0,0 +1,66 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app.database import bulk
+from app.database.database import Base
+from app.database.models import DemandForecast, MarketTypeEnum, PriceForecast
+
+T0, T1 = datetime(2024, 1, 1, 0), datetime(2024, 1, 1, 1)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def _row(forecast_time, value):
+    return {
+        "timestamp": datetime(2024, 1, 1),
+        "forecast_time": forecast_time,
+        "market_type": MarketTypeEnum.DAM,
+        "region": "ALL",
+        "source": "LSTM",
+        "predicted_demand_mw": value,
+    }
+
+
+def test_upsert_rows_sends_each_key_once_per_statement(db, monkeypatch):
+    statements = []
+    execute = bulk._execute_upsert
+
+    def recording(db, insert, table, chunk, *args):
+        statements.append([row["forecast_time"] for row in chunk])
+        return execute(db, insert, table, chunk, *args)
+
+    monkeypatch.setattr(bulk, "_execute_upsert", recording)
+    rows = [_row(T0, 1.0), _row(T0, 3.0), _row(T1, 2.0), _row(T0, 5.0)]
+    written = bulk.upsert_rows(
+        db, DemandForecast, rows, DemandForecast.NATURAL_KEY, ("timestamp", "predicted_demand_mw"), chunk_size=2
+    )
+    assert statements == [[T0, T1], [T0]]
+    assert written == 3
+    stored = dict(db.execute(select(DemandForecast.forecast_time, DemandForecast.predicted_demand_mw)).all())
+    assert stored == {T0: 5.0, T1: 2.0}
+
+
+def test_bulk_load_keeps_the_last_duplicate(db):
+    columns = {
+        "timestamp": [datetime(2024, 1, 1)] * 3,
+        "forecast_time": [T0, T1, T0],
+        "market_type": ["BM"] * 3,
+        "region": ["ALL"] * 3,
+        "source": ["SEMO-BM025"] * 3,
+        "predicted_price": [10.0, 20.0, 30.0],
+    }
+    assert bulk._keep_last(columns, PriceForecast.NATURAL_KEY)["predicted_price"] == [20.0, 30.0]
+    written = bulk.bulk_load(db, PriceForecast, columns, PriceForecast.NATURAL_KEY, ("predicted_price",))
+    assert written == 2
+    stored = dict(db.execute(select(PriceForecast.forecast_time, PriceForecast.predicted_price)).all())
+    assert stored == {T0: 30.0, T1: 20.0}
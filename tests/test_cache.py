@@ -0,0 +1,68 @@
+import logging
+import threading
+
+from app.utils import cache
+from app.utils.cache import LocalSharedCache, TieredCache
+
+
+class CountingShared(LocalSharedCache):
+    def __init__(self):
+        super().__init__()
+        self.counter_reads = 0
+
+    def get_counter(self, key):
+        self.counter_reads += 1
+        return super().get_counter(key)
+
+
+def _body(value):
+    return lambda: value
+
+
+def test_generation_read_at_most_once_per_interval():
+    shared = CountingShared()
+    cache = TieredCache("t", shared=shared, generation_check_seconds=60)
+    for _ in range(100):
+        assert cache.get_or_load("DEMAND", "a", _body(b"1")).body == b"1"
+    assert shared.counter_reads == 1
+    assert cache.stats()["local"] == 99
+
+
+def test_invalidation_is_immediate_here_and_within_interval_elsewhere():
+    shared = CountingShared()
+    writer = TieredCache("t", shared=shared, generation_check_seconds=60)
+    reader = TieredCache("t", shared=shared, generation_check_seconds=0)
+    writer.get_or_load("DEMAND", "a", _body(b"old"))
+    reader.get_or_load("DEMAND", "a", _body(b"old"))
+
+    writer.invalidate("DEMAND")
+    assert writer.get_or_load("DEMAND", "a", _body(b"new")).body == b"new"
+    assert reader.get_or_load("DEMAND", "a", _body(b"unused")).body == b"new"
+
+
+def test_hit_counters_are_exact_under_threads():
+    cache = TieredCache("t", shared=LocalSharedCache())
+    cache.get_or_load("DEMAND", "a", _body(b"1"))
+
+    def hit():
+        for _ in range(2000):
+            cache.get_or_load("DEMAND", "a", _body(b"1"))
+
+    threads = [threading.Thread(target=hit) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.stats()["local"] == 8000
+
+
+def test_warns_when_invalidations_cannot_reach_other_processes(monkeypatch, caplog):
+    monkeypatch.setattr(cache, "REDIS_URL", None)
+    with caplog.at_level(logging.WARNING, logger=cache.__name__):
+        cache.warn_if_not_shared()
+    assert "REDIS_URL is not set" in caplog.text
+
+    caplog.clear()
+    monkeypatch.setattr(cache, "REDIS_URL", "redis://cache:6379/0")
+    cache.warn_if_not_shared()
+    assert not caplog.records
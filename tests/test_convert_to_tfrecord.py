@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from app.ml_models.utils.convert_to_tfrecord import file_offsets, load_rows
+
+
+@pytest.fixture
+def files(tmp_path):
+    paths, frames = [], []
+    for i, n_rows in enumerate([250, 7, 400]):
+        frame = pd.DataFrame({"a": np.arange(n_rows) + 1000 * i, "Value": np.arange(n_rows) * 0.5})
+        path = str(tmp_path / f"part{i}.parquet")
+        pq.write_table(pa.Table.from_pandas(frame, preserve_index=False), path, row_group_size=64)
+        paths.append(path)
+        frames.append(frame)
+    return paths, pd.concat(frames, ignore_index=True)
+
+
+@pytest.mark.parametrize("start, stop", [(0, 657), (100, 260), (250, 257), (255, 300), (640, 657)])
+def test_load_rows_matches_full_read(files, start, stop):
+    paths, expected = files
+    offsets = file_offsets(paths)
+    assert offsets.tolist() == [0, 250, 257, 657]
+
+    features, targets = load_rows(paths, offsets, start, stop, "Value", ["a"])
+    np.testing.assert_array_equal(features[:, 0], expected["a"].to_numpy()[start:stop])
+    np.testing.assert_array_equal(targets, expected["Value"].to_numpy(dtype=np.float32)[start:stop])
+
+
+def test_written_records_parse_back_to_windows(files, tmp_path):
+    tf = pytest.importorskip("tensorflow")
+    from app.ml_models.utils import convert_to_tfrecord as converter
+
+    paths, expected = files
+    window, horizon = 5, 2
+    meta = converter.convert_to_tfrecord(
+        paths, str(tmp_path / "out" / "train"), window=window, horizon=horizon, num_shards=3, workers=1
+    )
+    # The target is the label, not an input
+    assert meta["feature_columns"] == ["a"]
+
+    spec = {
+        "sequence": tf.io.FixedLenFeature([window], tf.float32),
+        "label": tf.io.FixedLenFeature([], tf.float32),
+    }
+    records = []
+    for shard in meta["shards"]:
+        for record in tf.data.TFRecordDataset(str(tmp_path / "out" / shard), compression_type="GZIP"):
+            parsed = tf.io.parse_single_example(record, spec)
+            records.append((parsed["sequence"].numpy(), float(parsed["label"].numpy())))
+
+    a, value = expected["a"].to_numpy(np.float32), expected["Value"].to_numpy(np.float32)
+    starts = [s for lo, hi in [(0, 250), (250, 257), (257, 657)] for s in range(lo, hi - window - horizon + 1)]
+    assert len(records) == meta["num_examples"] == len(starts)
+    for (sequence, label), start in zip(records, starts):
+        np.testing.assert_array_equal(sequence, a[start : start + window])
+        assert label == value[start + window + horizon - 1]
+
+
+def test_convert_csv_to_tfrecord_keeps_row_format(tmp_path):
+    tf = pytest.importorskip("tensorflow")
+    from app.ml_models.utils.convert_to_tfrecord import convert_csv_to_tfrecord
+
+    csv_path = tmp_path / "raw.csv"
+    pd.DataFrame(
+        {
+            "Rows": ["{'EffectiveTime': '01-Jan-2024 00:00:00', 'Value': 4.5}", None],
+            "Status": ["Success", "Error"],
+        }
+    ).to_csv(csv_path, index=False)
+    output = str(tmp_path / "raw.tfrecord")
+    assert convert_csv_to_tfrecord(str(csv_path), output) == 2
+
+    spec = {"feature": tf.io.FixedLenFeature([1], tf.float32), "label": tf.io.FixedLenFeature([], tf.int64)}
+    parsed = [tf.io.parse_single_example(r, spec) for r in tf.data.TFRecordDataset(output)]
+    assert [(float(p["feature"][0]), int(p["label"])) for p in parsed] == [(4.5, 1), (0.0, 0)]
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+from app.ml_models.utils.data_processing import _MedianSample, _SeenHashes
+
+
+def test_seen_hashes_drop_duplicates_across_chunks():
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({"a": rng.integers(0, 300, 5000), "b": rng.integers(0, 5, 5000)})
+    seen = _SeenHashes()
+    sizes = rng.integers(1, 400, 100)
+    bounds = np.concatenate([[0], np.cumsum(sizes)])
+    bounds = bounds[bounds < len(frame)].tolist() + [len(frame)]
+    keep = np.concatenate([seen.keep_mask(frame.iloc[lo:hi]) for lo, hi in zip(bounds[:-1], bounds[1:])])
+
+    np.testing.assert_array_equal(keep, ~frame.duplicated().to_numpy())
+    assert len(seen) == keep.sum()
+    # Runs stay few and ordered largest first
+    assert len(seen._runs) <= np.log2(len(seen)) + 1
+    assert all(np.all(np.diff(run.astype(np.float64)) >= 0) for run in seen._runs)
+
+
+def test_median_sample_error_is_bounded():
+    rng = np.random.default_rng(1)
+    values = rng.lognormal(size=1_000_000)
+    sample = _MedianSample(size=10_000)
+    for chunk in np.array_split(values, 37):
+        sample.update(chunk, rng)
+
+    # Quantile of the estimate in the full data; its standard error is 0.5/sqrt(size)
+    quantile = np.mean(values < sample.median())
+    assert abs(quantile - 0.5) < 4 * 0.5 / np.sqrt(sample.size)
+
+    exact = _MedianSample(size=10_000)
+    exact.update(np.append(values[:999], np.nan), rng)
+    assert exact.median() == np.median(values[:999])
@@ -0,0 +1,114 @@
+"""fetch_area / backfill against a local stub of the EirGrid API"""
+import json
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import requests
+
+from app.data_sources import eirgrid_scraper
+
+DAY = date(2024, 1, 5)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # area -> list of (status, body, delay seconds) served in turn; the last one repeats
+    responses = {}
+    requests = []
+
+    def do_GET(self):
+        query = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+        type(self).requests.append(query)
+        script = self.responses.get(query["area"], [(200, {"Rows": []}, 0)])
+        seen = sum(r["area"] == query["area"] for r in self.requests)
+        status, body, delay = script[min(seen, len(script)) - 1]
+        time.sleep(delay)
+        payload = body.encode() if isinstance(body, str) else json.dumps(body).encode()
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):  # the client timed out
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    _Handler.responses, _Handler.requests = {}, []
+    monkeypatch.setattr(eirgrid_scraper, "EIRGRID_API_URL", f"http://127.0.0.1:{server.server_port}/api/graph-data")
+    monkeypatch.setattr(eirgrid_scraper, "_session", None)
+    monkeypatch.setattr(eirgrid_scraper, "_backoff", lambda attempt: 0)
+    yield _Handler
+    server.shutdown()
+    server.server_close()
+
+
+def _fetch(area):
+    return eirgrid_scraper.fetch_area(requests.Session(), "label", area, DAY)[2]
+
+
+def test_retries_transient_errors_then_succeeds(stub):
+    stub.responses["demandactual"] = [(503, "", 0), (502, "", 0), (200, {"Rows": [{"Value": 1}]}, 0)]
+    assert _fetch("demandactual") == {"Rows": [{"Value": 1}]}
+    assert len(stub.requests) == 3
+    assert stub.requests[0]["date"] == "05 Jan 2024"
+
+
+def test_gives_up_after_max_retries(stub, monkeypatch):
+    monkeypatch.setattr(eirgrid_scraper, "MAX_RETRIES", 2)
+    stub.responses["demandactual"] = [(503, "", 0)]
+    assert _fetch("demandactual") is None
+    assert len(stub.requests) == 3
+
+
+def test_client_errors_and_malformed_json_fail_fast(stub):
+    stub.responses["demandactual"] = [(404, "", 0)]
+    stub.responses["windactual"] = [(200, "{not json", 0)]
+    assert _fetch("demandactual") is None
+    assert _fetch("windactual") is None
+    assert [r["area"] for r in stub.requests] == ["demandactual", "windactual"]
+
+
+def test_per_area_read_timeout(stub, monkeypatch):
+    monkeypatch.setattr(eirgrid_scraper, "MAX_RETRIES", 0)
+    monkeypatch.setattr(eirgrid_scraper, "DEFAULT_TIMEOUT", 2)
+    monkeypatch.setattr(eirgrid_scraper, "AREA_TIMEOUTS", {"fuelmix": 0.2})
+    for area in ("fuelmix", "demandactual"):
+        stub.responses[area] = [(200, {"Rows": []}, 0.6)]
+
+    started = time.perf_counter()
+    assert _fetch("fuelmix") is None
+    assert time.perf_counter() - started < 0.6
+    assert _fetch("demandactual") == {"Rows": []}
+
+
+def test_backfill_fetches_in_batches_and_uploads_each_day(stub, monkeypatch):
+    batches, uploads = [], []
+    fetch = eirgrid_scraper.fetch_data_for_range
+
+    def recording_fetch(endpoints, start, end, max_workers):
+        batches.append((start.day, end.day))
+        return fetch(endpoints, start, end, max_workers)
+
+    monkeypatch.setattr(eirgrid_scraper, "fetch_data_for_range", recording_fetch)
+    monkeypatch.setattr(
+        eirgrid_scraper, "upload_to_s3", lambda bucket, data, region, data_date: uploads.append(data_date) or "key"
+    )
+    keys = eirgrid_scraper.backfill(
+        "bucket", date(2024, 1, 1), date(2024, 1, 7), {"demand": "demandactual"}, days_per_batch=3, max_workers=2
+    )
+    assert batches == [(1, 3), (4, 6), (7, 7)]
+    assert sorted(uploads) == [date(2024, 1, day) for day in range(1, 8)]
+    assert len(keys) == 7
+    assert len(stub.requests) == 7
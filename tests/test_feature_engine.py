@@ -0,0 +1,37 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+
+from app.feature_engineering.engine import (
+    DEFAULT_FEATURES,
+    LEGACY_FEATURES,
+    build_features,
+    horizon_index,
+    model_columns,
+)
+
+
+def _features():
+    return build_features(None, horizon_index(datetime(2024, 1, 5), hours=24, freq="h"))
+
+
+def test_default_features_skip_unsupplied_temperature():
+    assert "temperature" not in DEFAULT_FEATURES
+    assert "temperature" not in _features()
+
+
+def test_model_columns_match_training():
+    features = _features()
+    target = np.arange(len(features), dtype=np.float64)
+
+    # Artifacts from before the engine were fitted on the three calendar columns as an array
+    legacy = LinearRegression().fit(features[list(LEGACY_FEATURES)].to_numpy(dtype=np.float64), target)
+    assert list(model_columns(legacy, features).columns) == list(LEGACY_FEATURES)
+    assert legacy.predict(model_columns(legacy, features).to_numpy(dtype=np.float64)).shape == target.shape
+
+    current = LinearRegression().fit(features[["hour", "month"]], target)
+    assert list(model_columns(current, features).columns) == ["hour", "month"]
+
+    assert model_columns(object(), features) is features
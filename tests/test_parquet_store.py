@@ -0,0 +1,32 @@
+from datetime import date, datetime
+
+import numpy as np
+import pyarrow.parquet as pq
+
+from app.data_sources import parquet_store
+
+
+def _write_day(base_uri: str, hours) -> None:
+    times = np.array([np.datetime64(datetime(2024, 1, 5, hour), "us") for hour in hours])
+    parsed = {"forecast_time": times, "value": np.arange(len(hours), dtype=np.float64)}
+    parquet_store.write_table(parquet_store.semo_to_table(parsed, "BM-084"), parquet_store.SEMO_DATASET, base_uri)
+
+
+def test_compact_twice_keeps_rows_and_schema(tmp_path):
+    base_uri = str(tmp_path)
+    _write_day(base_uri, [3, 1])
+    _write_day(base_uri, [2])
+    assert parquet_store.compact(parquet_store.SEMO_DATASET, date(2024, 1, 5), base_uri) == 2
+
+    # A second round merges the compacted file with new ones
+    _write_day(base_uri, [0])
+    assert parquet_store.compact(parquet_store.SEMO_DATASET, date(2024, 1, 5), base_uri) == 2
+    (compacted,) = (tmp_path / "semo" / "yyyy=2024" / "mm=1" / "dd=5").glob("*.parquet")
+    # No partition columns inside the file
+    assert pq.read_schema(compacted).names == parquet_store.SEMO_SCHEMA.names
+
+    frame = parquet_store.read_frame(
+        parquet_store.SEMO_DATASET, datetime(2024, 1, 5), datetime(2024, 1, 6), base_uri=base_uri
+    )
+    assert frame["effective_time"].dt.hour.tolist() == [0, 1, 2, 3]
+    assert set(frame["report"]) == {"BM-084"}
@@ -0,0 +1,108 @@
+import warnings
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app.database.database import Base
+from app.database.models import DemandForecast, ForecastEvaluation, ForecastTypeEnum, MarketTypeEnum
+from app.ml_models.inference.predict import PredictionService
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def test_bulk_actuals_normalise_times_to_naive_utc(db):
+    service = PredictionService(db)
+    service.create_forecasts(
+        ForecastTypeEnum.DEMAND,
+        [
+            (datetime(2024, 6, 1, 12), MarketTypeEnum.DAM, 4000.0, "LSTM", "ALL"),
+            (datetime(2024, 6, 1, 13), MarketTypeEnum.DAM, 4100.0, "LSTM", "ALL"),
+        ],
+    )
+    aware = pd.DataFrame(
+        {
+            # 13:00 Irish summer time is 12:00 UTC
+            "forecast_time": pd.to_datetime(["2024-06-01 13:00"]).tz_localize("Europe/Dublin"),
+            "value": [4050.0],
+        }
+    )
+    naive = pd.DataFrame({"forecast_time": [datetime(2024, 6, 1, 13)], "value": [4000.0]})
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", FutureWarning)
+        assert service.update_actual_values_bulk(ForecastTypeEnum.DEMAND, aware) == 1
+        assert service.update_actual_values_bulk(ForecastTypeEnum.DEMAND, naive) == 1
+
+    stored = db.execute(
+        select(DemandForecast.forecast_time, DemandForecast.actual_demand_mw, DemandForecast.demand_error)
+    ).all()
+    assert sorted(stored) == [(datetime(2024, 6, 1, 12), 4050.0, 50.0), (datetime(2024, 6, 1, 13), 4000.0, 100.0)]
+
+
+def test_reconciling_twice_updates_evaluations_in_place(db):
+    service = PredictionService(db)
+    service.create_forecasts(
+        ForecastTypeEnum.DEMAND,
+        [(datetime(2024, 6, 1, h), MarketTypeEnum.DAM, 4000.0, "LSTM", "ALL") for h in (12, 13)],
+    )
+    actuals = pd.DataFrame({"forecast_time": [datetime(2024, 6, 1, 12)], "value": [4100.0]})
+    assert service.reconcile_actuals(ForecastTypeEnum.DEMAND, actuals) == 1
+
+    actuals = pd.DataFrame(
+        {"forecast_time": [datetime(2024, 6, 1, 12), datetime(2024, 6, 1, 13)], "value": [4100.0, 3900.0]}
+    )
+    assert service.reconcile_actuals(ForecastTypeEnum.DEMAND, actuals) == 1
+
+    stored = db.execute(
+        select(ForecastEvaluation.forecast_time, ForecastEvaluation.sample_count, ForecastEvaluation.mae)
+    ).all()
+    assert stored == [(datetime(2024, 6, 1), 2, 100.0)]
+
+
+def test_evaluate_forecast_ignores_model_name_when_matching(db):
+    service = PredictionService(db)
+    when = datetime(2024, 6, 1, 12)
+    service.create_forecasts(ForecastTypeEnum.DEMAND, [(when, MarketTypeEnum.DAM, 4000.0, "BASELINE", "ALL")])
+    service.update_actual_values_bulk(
+        ForecastTypeEnum.DEMAND, pd.DataFrame({"forecast_time": [when], "value": [4100.0]})
+    )
+
+    evaluation = service.evaluate_forecast(when, MarketTypeEnum.DAM, ForecastTypeEnum.DEMAND)
+    assert (evaluation.model_name, evaluation.error) == ("LSTM", 100.0)
+
+
+def test_forecast_cycle_opens_a_session_and_shares_the_source_convention(db, monkeypatch):
+    from app.database import database
+    from app.feature_engineering import demand_features
+    from app.ml_models import registry
+    from app.services.forecasting import ForecastJob, run_forecast_cycle
+
+    class Baseline:
+        def predict(self, features):
+            return np.full(len(features), 4000.0)
+
+    def load_model(name):
+        if name != "demand_baseline":
+            raise FileNotFoundError(name)
+        return Baseline()
+
+    index = pd.date_range("2024-06-01", periods=3, freq="h")
+    features = pd.DataFrame({"hour": [0, 1, 2]}, index=index)
+    monkeypatch.setattr(demand_features, "generate_features", lambda *args, **kwargs: features)
+    monkeypatch.setattr(registry, "load_model", load_model)
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(bind=db.get_bind()))
+
+    report = run_forecast_cycle(jobs=[ForecastJob("DEMAND", "DAM", "ALL", 2)], workers=1)
+    assert report.rows_written == {"DEMAND": 2}
+    assert db.execute(select(DemandForecast.source).distinct()).scalars().all() == ["BASELINE"]
@@ -0,0 +1,115 @@
+"""raw_store against a moto S3 bucket"""
+import json
+from datetime import date, datetime
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from app.data_sources.raw_store import (
+    Manifest,
+    discover_new_objects,
+    download_objects,
+    key_day,
+    list_raw_objects,
+    raw_key,
+)
+
+BUCKET = "market-data"
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "eu-west-1")
+    with mock_aws():
+        client = boto3.client("s3", region_name="eu-west-1")
+        client.create_bucket(Bucket=BUCKET, CreateBucketConfiguration={"LocationConstraint": "eu-west-1"})
+        yield client
+
+
+def _put(s3, key, body=None):
+    s3.put_object(Bucket=BUCKET, Key=key, Body=json.dumps(body or {"key": key}))
+
+
+def test_raw_key_layout():
+    collected_at = datetime(2024, 3, 7, 14, 5, 9)
+    assert raw_key(collected_at) == "raw/yyyy=2024/mm=03/dd=07/market_data_20240307_140509.json"
+    # Backfills are keyed by the day the data is for, not when it was fetched
+    assert raw_key(collected_at, data_date=date(2023, 12, 31)) == (
+        "raw/yyyy=2023/mm=12/dd=31/market_data_20231231_backfill.json"
+    )
+    assert key_day("raw/yyyy=2023/mm=12/dd=31/market_data_20231231_backfill.json") == date(2023, 12, 31)
+    assert key_day("raw/market_data_20230102_101500.json") == date(2023, 1, 2)
+    assert key_day("raw/readme.txt") is None
+
+
+def test_lists_partitions_and_legacy_keys_in_range(s3):
+    _put(s3, raw_key(datetime(2024, 1, 1, 12)))
+    _put(s3, raw_key(datetime(2024, 1, 2, 12)))
+    _put(s3, raw_key(datetime(2024, 1, 4, 12)))
+    _put(s3, "raw/market_data_20240102_101500.json")
+    _put(s3, "raw/market_data_20240105_101500.json")
+    _put(s3, "raw/yyyy=2024/mm=01/dd=02/notes.txt")
+
+    keys = {o["Key"] for o in list_raw_objects(s3, BUCKET, date(2024, 1, 2), date(2024, 1, 4))}
+    assert keys == {
+        "raw/yyyy=2024/mm=01/dd=02/market_data_20240102_120000.json",
+        "raw/yyyy=2024/mm=01/dd=04/market_data_20240104_120000.json",
+        "raw/market_data_20240102_101500.json",
+    }
+
+
+def test_manifest_round_trip(s3, tmp_path):
+    assert Manifest.load_s3(s3, BUCKET, "eirgrid") == Manifest()
+    assert Manifest.load_file(str(tmp_path / "missing.json")) == Manifest()
+
+    manifest = Manifest()
+    manifest.mark([
+        {"Key": "raw/yyyy=2024/mm=01/dd=03/a.json", "ETag": '"1"'},
+        {"Key": "raw/market_data_20240105_101500.json", "ETag": '"2"'},
+    ])
+    assert manifest.watermark == date(2024, 1, 5)
+    assert manifest.start_day(date(2020, 1, 1)) == date(2024, 1, 4)
+
+    manifest.save_s3(s3, BUCKET, "eirgrid")
+    assert Manifest.load_s3(s3, BUCKET, "eirgrid") == manifest
+    manifest.save_file(str(tmp_path / "manifest.json"))
+    assert Manifest.load_file(str(tmp_path / "manifest.json")) == manifest
+
+
+def test_discovery_skips_unchanged_etags(s3, tmp_path):
+    first, second = raw_key(datetime(2024, 1, 1, 12)), raw_key(datetime(2024, 1, 2, 12))
+    _put(s3, first)
+    _put(s3, second)
+    manifest = Manifest()
+    found = discover_new_objects(s3, BUCKET, manifest, date(2024, 1, 1), end_day=date(2024, 1, 2))
+    assert sorted(o["Key"] for o in found) == [first, second]
+
+    paths = download_objects(s3, BUCKET, found, str(tmp_path), max_workers=2)
+    assert sorted(json.load(open(path))["key"] for path in paths) == [first, second]
+    manifest.mark(found)
+    assert discover_new_objects(s3, BUCKET, manifest, date(2024, 1, 1), end_day=date(2024, 1, 2)) == []
+
+    # A rewritten object has a new ETag and is picked up again
+    _put(s3, second, {"key": second, "rewritten": True})
+    found = discover_new_objects(s3, BUCKET, manifest, date(2024, 1, 1), end_day=date(2024, 1, 2))
+    assert [o["Key"] for o in found] == [second]
+
+
+def test_mark_prunes_etags_outside_the_lookback_window():
+    manifest = Manifest()
+    manifest.mark([
+        {"Key": "raw/yyyy=2024/mm=01/dd=01/a.json", "ETag": '"1"'},
+        {"Key": "raw/yyyy=2024/mm=01/dd=02/b.json", "ETag": '"2"'},
+        {"Key": "raw/undated.json", "ETag": '"3"'},
+    ])
+    assert len(manifest.etags) == 3
+
+    manifest.mark([{"Key": "raw/yyyy=2024/mm=01/dd=04/c.json", "ETag": '"4"'}])
+    assert sorted(manifest.etags) == ["raw/undated.json", "raw/yyyy=2024/mm=01/dd=04/c.json"]
+
+    manifest.mark([{"Key": "raw/market_data_20240103_101500.json", "ETag": '"5"'}])
+    assert manifest.watermark == date(2024, 1, 4)
+    assert "raw/market_data_20240103_101500.json" in manifest.etags
@@ -0,0 +1,67 @@
+import threading
+import time
+
+import joblib
+import pytest
+
+from app.ml_models.registry import ModelRegistry
+
+
+@pytest.fixture
+def registry(tmp_path):
+    registry = ModelRegistry(model_dir=str(tmp_path), refresh_seconds=60, mmap_mode=None, s3_bucket="models")
+    registry.syncs = []
+    registry._sync_from_s3 = lambda name, version, path: registry.syncs.append(name)
+    return registry
+
+
+def test_missing_artifact_is_checked_once_per_refresh_interval(registry, tmp_path):
+    for _ in range(3):
+        with pytest.raises(FileNotFoundError):
+            registry.get("demand_model")
+    assert registry.syncs == ["demand_model"]
+
+    # An artifact saved locally is picked up once the miss is invalidated
+    joblib.dump({"weights": [1, 2]}, tmp_path / "demand_model.pkl")
+    registry.invalidate("demand_model")
+    assert registry.get("demand_model") == {"weights": [1, 2]}
+    assert registry.syncs == ["demand_model", "demand_model"]
+
+
+def test_missing_artifact_is_rechecked_after_refresh_interval(registry, tmp_path):
+    registry.refresh_seconds = 0
+    for _ in range(2):
+        with pytest.raises(FileNotFoundError):
+            registry.get("demand_model")
+    assert registry.syncs == ["demand_model", "demand_model"]
+
+
+def test_cold_load_blocks_neither_cache_hits_nor_duplicates_work(registry, tmp_path):
+    joblib.dump("a", tmp_path / "a_model.pkl")
+    joblib.dump("b", tmp_path / "b_model.pkl")
+    assert registry.get("b_model") == "b"
+
+    release, loads = threading.Event(), []
+    load = registry._load
+
+    def slow_load(path):
+        loads.append(path)
+        release.wait(5)
+        return load(path)
+
+    registry._load = slow_load
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get("a_model"))) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+
+    # Served from cache while a_model is still loading
+    assert registry.get("b_model") == "b"
+    assert not results
+
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert results == ["a", "a"]
+    assert len(loads) == 1
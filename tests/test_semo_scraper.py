@@ -0,0 +1,53 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from app.data_sources import semo_scraper
+
+
+class _Session:
+    def commit(self):
+        pass
+
+    rollback = close = commit
+
+
+def _producers():
+    return [t for t in threading.enumerate() if t.name.startswith("semo-")]
+
+
+def test_writer_failure_stops_producers(monkeypatch):
+    monkeypatch.setattr(semo_scraper, "MAX_BUFFERED_PAGES", 2)
+    monkeypatch.setattr(semo_scraper, "PUT_TIMEOUT_SECONDS", 0.05)
+    monkeypatch.setattr(semo_scraper, "SessionLocal", _Session)
+    monkeypatch.setattr(semo_scraper, "iter_report_pages", lambda *args: ([{"page": i}] for i in range(1000)))
+
+    def failing_store(db, name, items, write_parquet):
+        raise RuntimeError("database down")
+
+    monkeypatch.setattr(semo_scraper, "_store_page", failing_store)
+    with pytest.raises(RuntimeError, match="database down"):
+        semo_scraper.run_semo_scraper()
+
+    deadline = time.monotonic() + 5
+    while _producers() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not _producers()
+
+
+def test_fetch_failure_is_raised_after_other_reports_are_written(monkeypatch):
+    monkeypatch.setattr(semo_scraper, "SessionLocal", _Session)
+
+    def pages(endpoint, start, end, page_size):
+        if endpoint == "BM-026":
+            raise requests.HTTPError("503 Server Error")
+        yield from ([{"page": i}] for i in range(3))
+
+    monkeypatch.setattr(semo_scraper, "iter_report_pages", pages)
+    stored = []
+    monkeypatch.setattr(semo_scraper, "_store_page", lambda db, name, items, write_parquet: stored.append(name) or 1)
+    with pytest.raises(requests.HTTPError, match="503"):
+        semo_scraper.run_semo_scraper()
+    assert sorted(stored) == ["bm_025"] * 3 + ["bm_095"] * 3